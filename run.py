@@ -6,11 +6,15 @@ Railway用起動スクリプト
 import os
 import uvicorn
 
+from src.core.server_config import get_uvicorn_options, get_worker_count
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
     uvicorn.run(
         "src.main:app",
         host="0.0.0.0",
         port=port,
-        log_level="info"
+        log_level="info",
+        workers=get_worker_count(),
+        **get_uvicorn_options()
     )
@@ -7,7 +7,6 @@ Whisperを使用した高精度音声認識の実装
 import os
 import io
 import wave
-import tempfile
 from typing import Optional, Dict, Any, Union
 from loguru import logger
 
@@ -138,9 +137,11 @@ class SpeechToText:
                     n_channels = wav_file.getnchannels()
                     n_frames = wav_file.getnframes()
 
-                    # 音声データを読み込み
-                    frames = wav_file.readframes(n_frames)
-                    audio_np = np.frombuffer(frames, dtype=np.int16)
+                    # 音声データを読み込み（readframesでコピーせず、受信データのdataチャンクを直接参照する）
+                    # wave.open はdataチャンクのヘッダーを読んだ位置で止まるため、現在位置がサンプルの先頭
+                    data_offset = audio_io.tell()
+                    n_samples = min(n_frames * n_channels, (len(audio_data) - data_offset) // 2)
+                    audio_np = np.frombuffer(audio_data, dtype=np.int16, count=n_samples, offset=data_offset)
 
                     # ステレオの場合はモノラルに変換
                     logger.debug(f"Number of channels: {n_channels}, type: {type(n_channels)}")
@@ -211,25 +212,14 @@ class SpeechToText:
     async def _transcribe_openai_raw(self, audio_data: bytes) -> str:
         """OpenAI APIによる音声認識（生バイナリデータ用）"""
         try:
-            # 一時ファイルに音声データを保存
-            with tempfile.NamedTemporaryFile(suffix=".webm", delete=False) as temp_file:
-                temp_file.write(audio_data)
-                temp_path = temp_file.name
-
-            try:
-                # OpenAI APIで音声認識
-                with open(temp_path, "rb") as audio_file:
-                    transcript = self.openai_client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_file,
-                        language=self.config["language"]
-                    )
-
-                return transcript.text
-
-            finally:
-                # 一時ファイルを削除
-                os.unlink(temp_path)
+            # 受信したバイト列をそのままアップロード（一時ファイルへの書き込み・再読み込みを行わない）
+            transcript = self.openai_client.audio.transcriptions.create(
+                model="whisper-1",
+                file=("audio.webm", audio_data),
+                language=self.config["language"]
+            )
+
+            return transcript.text
 
         except Exception as e:
             logger.error(f"OpenAI Whisper raw transcription failed: {e}")
@@ -239,37 +229,43 @@ class SpeechToText:
         """OpenAI APIによる音声認識"""
         try:
             import numpy as np  # type: ignore
-            # 一時ファイルに音声を保存
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                # NumPy配列をWAVファイルに変換
-                audio_int16 = (audio_data * 32767).astype(np.int16)
-                with wave.open(temp_file, 'wb') as wav_file:
-                    wav_file.setnchannels(1)
-                    wav_file.setsampwidth(2)
-                    wav_file.setframerate(self.config["sample_rate"])
-                    wav_file.writeframes(audio_int16.tobytes())
-
-                temp_path = temp_file.name
-
-            try:
-                # OpenAI APIで音声認識
-                with open(temp_path, "rb") as audio_file:
-                    transcript = self.openai_client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_file,
-                        language=self.config["language"]
-                    )
-
-                return transcript.text
-
-            finally:
-                # 一時ファイルを削除
-                os.unlink(temp_path)
+            # NumPy配列をメモリ上でWAVに変換（一時ファイルを使わない）
+            audio_int16 = (audio_data * 32767).astype(np.int16)
+            wav_io = io.BytesIO()
+            with wave.open(wav_io, 'wb') as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(self.config["sample_rate"])
+                wav_file.writeframes(memoryview(audio_int16))
+
+            wav_io.seek(0)
+
+            # OpenAI APIで音声認識
+            transcript = self.openai_client.audio.transcriptions.create(
+                model="whisper-1",
+                file=("audio.wav", wav_io),
+                language=self.config["language"]
+            )
+
+            return transcript.text
 
         except Exception as e:
             logger.error(f"OpenAI Whisper transcription failed: {e}")
             raise
 
+    async def warmup(self):
+        """
+        ローカルWhisperモデルで無音を1回認識し、初回推論時の遅延を起動時に済ませる
+
+        OpenAI API利用時は課金が発生するため何もしない
+        """
+        if not (self.config["use_local"] and self.whisper_model):
+            return
+
+        import numpy as np  # type: ignore
+        silence = np.zeros(self.config["sample_rate"], dtype=np.float32)
+        await self._transcribe_local(silence)
+
     async def get_status(self) -> Dict[str, Any]:
         """STTシステムの状態を取得"""
         return {
@@ -22,8 +22,6 @@ except ImportError:
     OPENAI_AVAILABLE = False
     logger.warning("OpenAI not available")
 
-import tempfile
-
 
 class TextToSpeech:
     """テキストを音声に変換するクラス"""
@@ -222,18 +220,11 @@ class TextToSpeech:
             filename = f"tts_{timestamp}.mp3"
             audio_path = os.path.join(self.config["output_directory"], filename)
 
-            # 非同期でファイルを保存
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_file:
-                temp_path = temp_file.name
-
-            # gTTSで一時ファイルに保存
+            # 出力ディレクトリに直接保存（一時ファイル経由のコピー・移動を省く）
             await asyncio.get_event_loop().run_in_executor(
-                None, tts.save, temp_path
+                None, tts.save, audio_path
             )
 
-            # 最終的な場所に移動
-            os.rename(temp_path, audio_path)
-
             return audio_path
 
         except Exception as e:
@@ -5,17 +5,28 @@ Voice Agent - メインエージェントクラス
 """
 
 import asyncio
-from typing import Dict, Any, Optional, Callable
+import re
+import os
+import time
+from typing import Dict, Any, AsyncIterator, List, Optional, Callable, Tuple
 from datetime import datetime
 from loguru import logger
 
 from src.audio.speech_to_text import SpeechToText
 from src.audio.text_to_speech import TextToSpeech
 from src.llm.hybrid_llm import HybridLLM
+from src.llm.tool_parse import json_dumps_pretty
 from src.memory.personal_memory import PersonalMemory
 from src.tools.tool_registry import ToolRegistry
 from src.core.context_manager import ContextManager
 from src.core.rule_processor import RuleProcessor
+from src.core.response_cache import ResponseCache
+
+# Gmailツールの一覧表示に含まれるメールID
+_RE_EMAIL_ID = re.compile(r'ID:\s*([a-zA-Z0-9]+)')
+
+# システム状態をキャッシュする秒数（UIからの連続したポーリングを1回の収集にまとめる）
+STATUS_CACHE_TTL = 0.5
 
 
 class VoiceAgent:
@@ -33,9 +44,14 @@ class VoiceAgent:
         self.tools: Optional[ToolRegistry] = None
         self.context: Optional[ContextManager] = None
         self.rule_processor: Optional[RuleProcessor] = None
+        # ツールを使わない応答のキャッシュ（RESPONSE_CACHE=true の場合のみ有効）
+        self.response_cache: Optional[ResponseCache] = None
         self.is_initialized = False
         self.status_callback: Optional[Callable] = None
         self.session_id = session_id  # セッションID
+        # システム状態のキャッシュ（取得時刻, 状態）と、収集中のタスク
+        self._status_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+        self._status_task: Optional[asyncio.Task] = None
 
     async def initialize(self):
         """エージェントの初期化"""
@@ -50,13 +66,18 @@ class VoiceAgent:
             self.tools = ToolRegistry()
             self.context = ContextManager()
             self.rule_processor = RuleProcessor()
+            if os.getenv("RESPONSE_CACHE", "false").lower() == "true":
+                self.response_cache = ResponseCache(
+                    threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92")),
+                    cache_path="./data/cache/responses"
+                )
 
             # 初期化の実行
             await asyncio.gather(
                 self.stt.initialize(),
                 self.tts.initialize(),
                 self.llm.initialize(),
-                self.memory.initialize(),
+                self._initialize_memory(),
                 self.tools.initialize(),
                 self.context.initialize(),
                 self.rule_processor.initialize()
@@ -69,6 +90,37 @@ class VoiceAgent:
             logger.error(f"Failed to initialize Voice Agent: {e}")
             raise
 
+    async def _initialize_memory(self):
+        """パーソナルメモリと応答キャッシュの初期化（同じモデルであればエンコーダーを共有する）"""
+        await self.memory.initialize()
+        if not self.response_cache:
+            return
+
+        share_encoder = (
+            self.memory.encoder is not None
+            and self.memory.config["embedding_model"] == self.response_cache.semantic.embedding_model
+        )
+        if share_encoder:
+            await self.response_cache.initialize(
+                encoder=self.memory.encoder, executor=self.memory.encoder_executor
+            )
+        else:
+            await self.response_cache.initialize()
+
+    async def warmup(self):
+        """
+        初回リクエスト時に発生する遅延読み込みを起動時に済ませる
+
+        会話履歴やメモリに影響を与えず、外部APIの課金も発生しない処理のみを行う
+        """
+        for name, component in (("llm", self.llm), ("stt", self.stt)):
+            started = time.perf_counter()
+            try:
+                await component.warmup()
+                logger.info(f"Warmup {name} completed in {(time.perf_counter() - started) * 1000:.0f}ms")
+            except Exception as e:
+                logger.warning(f"Warmup {name} failed: {e}")
+
     async def process_audio(self, audio_data: bytes) -> Dict[str, Any]:
         """
         音声データを処理して応答を生成
@@ -93,7 +145,7 @@ class VoiceAgent:
             if not text.strip():
                 return {"error": "音声を認識できませんでした"}
 
-            logger.info(f"Recognized: {text}")
+            logger.debug("Recognized: {} chars", len(text))
 
             # 2. テキストを処理
             if self.status_callback:
@@ -112,7 +164,7 @@ class VoiceAgent:
     def set_session_id(self, session_id: str):
         """セッションIDを設定"""
         self.session_id = session_id
-        logger.debug(f"Agent session_id set to: {session_id}")
+        logger.debug("Agent session_id set to: {}", session_id)
 
     async def process_text(self, text: str) -> Dict[str, Any]:
         """
@@ -124,9 +176,39 @@ class VoiceAgent:
         Returns:
             処理結果
         """
+        result: Dict[str, Any] = {"error": "処理中にエラーが発生しました"}
+        async for event in self._process_turn(text, stream=False):
+            if event["type"] == "result":
+                result = event["result"]
+        return result
+
+    async def process_text_stream(self, text: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        テキストを処理して応答をストリーミング生成
+
+        Args:
+            text: 入力テキスト
+
+        Yields:
+            {"type": "delta", "content": 応答テキストの断片}
+            {"type": "result", "result": process_text と同じ処理結果}
+        """
+        async for event in self._process_turn(text, stream=True):
+            yield event
+
+    async def _process_turn(self, text: str, stream: bool) -> AsyncIterator[Dict[str, Any]]:
+        """
+        1ターン分の処理（process_text / process_text_stream の共通実装）
+
+        streamがTrueの場合はLLMの生成テキストを断片ごとにdeltaイベントとして返す。
+        ツールを実行した場合の最終応答は生成後にまとめて返す
+        """
         if not self.is_initialized:
             raise RuntimeError("Voice Agent not initialized")
 
+        # 今回の発話に一致しない追質問の先行生成は、ルール・キャッシュで応答する場合も不要になる
+        self.llm.cancel_prefetch(keep_text=text)
+
         try:
             # 1. コンテキストの更新
             await self.context.add_user_message(text)
@@ -160,13 +242,14 @@ class VoiceAgent:
                 speed = 0.9 if self._should_use_slow_speed(final_response) else None
                 audio_url = await self.tts.synthesize(final_response, speed=speed)
 
-                return {
+                yield {"type": "result", "result": {
                     "text": final_response,
                     "audio_url": audio_url,
                     "tool_results": [],
                     "rule_used": rule_response.get("rule_name"),
                     "timestamp": await self._get_current_timestamp()
-                }
+                }}
+                return
 
             # ルールにマッチし、ツール提案がある場合は先に実行（Gmail等）
             if rule_response and not rule_response.get("is_final") and rule_response.get("tool_calls"):
@@ -200,8 +283,7 @@ class VoiceAgent:
                                 final_response = result["message"]
                             else:
                                 # messageキーがない場合は辞書全体を文字列化
-                                import json
-                                final_response = json.dumps(result, ensure_ascii=False, indent=2)
+                                final_response = json_dumps_pretty(result)
                         else:
                             # 文字列などそのまま使えるデータ
                             final_response = str(result)
@@ -222,97 +304,49 @@ class VoiceAgent:
                 speed = 0.9 if self._should_use_slow_speed(final_response) else None
                 audio_url = await self.tts.synthesize(final_response, speed=speed)
 
-                return {
+                yield {"type": "result", "result": {
                     "text": final_response,
                     "audio_url": audio_url,
                     "tool_results": rule_response.get("tool_calls", []),
                     "rule_used": rule_response.get("rule_name"),
                     "timestamp": await self._get_current_timestamp()
-                }
+                }}
+                return
 
-            # 3. ルールにマッチしなかった場合はAI処理
+            # 3. ルールにマッチしなかった場合はAI処理（同じ問い合わせの応答はキャッシュから再利用）
             # 記憶からの関連情報取得
             relevant_memories = await self.memory.search_relevant(text)
 
             # 現在のAIモードを取得
             ai_mode = await memory_tool.get_ai_mode() if memory_tool else "assist"
-            logger.info(f"Current AI mode: {ai_mode}")
-
-            # 4. LLMで意図理解とツール選択
-            # メモリツールは既に取得済み
-
-            llm_response = await self.llm.process_with_tools(
-                text=text,
-                context=self.context.get_context(),
-                memories=relevant_memories,
-                available_tools=self.tools.get_available_tools(),
-                memory_tool=memory_tool,
-                context_manager=self.context,
-                ai_mode=ai_mode
-            )
-
-            # 5. ツールの実行（必要な場合）
-            logger.debug(f"LLM response tool_calls: {llm_response.get('tool_calls')}")
-            if llm_response.get("tool_calls"):
-                logger.info(f"Executing {len(llm_response['tool_calls'])} tools")
-
-                # ツール実行中のステータス通知
-                tool_names = [tc.get('name', '') for tc in llm_response['tool_calls']]
-                if self.status_callback:
-                    if 'gmail' in tool_names:
-                        await self.status_callback("📧 メールを確認中...")
-                    elif 'calendar' in tool_names:
-                        await self.status_callback("📅 予定を確認中...")
-                    elif 'alarm' in tool_names:
-                        await self.status_callback("⏰ アラームを設定中...")
-                    else:
-                        await self.status_callback("🔧 処理中...")
-
-                # 全自動モードの場合、テーブルタスクを作成
-                if ai_mode == "auto" and memory_tool:
-                    task_title = f"自動実行: {text[:30]}..."
-                    task_content = f"ユーザー入力: {text}\nツール: {', '.join(tool_names)}"
-                    table_task = await memory_tool.add_table_task(
-                        title=task_title,
-                        content=task_content,
-                        status="processing"
-                    )
-                    task_id = table_task.get("id")
-                    logger.info(f"Created table task for auto mode: {task_id}")
-                else:
-                    task_id = None
-
-                tool_results = await self._execute_tools(llm_response["tool_calls"])
-                logger.debug(f"Tool execution results: {tool_results}")
-
-                # Gmailツールの結果からメールIDを抽出してコンテキストに保存
-                await self._extract_and_store_email_ids(tool_results)
-
-                # メール状態を更新（次回の「他のメール」要求に備える）
-                await self._update_email_state_from_results(tool_results)
-
-                # ツール結果を含めて再度LLM処理
-                if self.status_callback:
-                    await self.status_callback("🗣️ 応答を生成中...")
-
-                final_response = await self.llm.generate_final_response(
-                    original_request=text,
-                    tool_results=tool_results,
-                    context=self.context.get_context()
-                )
-
-                # 全自動モードの場合、テーブルタスクを完了に更新
-                if ai_mode == "auto" and memory_tool and task_id:
-                    result_summary = final_response[:100] + "..." if len(final_response) > 100 else final_response
-                    await memory_tool.update_table_task(
-                        task_id=task_id,
-                        status="completed",
-                        result=result_summary
-                    )
-                    logger.info(f"Updated table task to completed: {task_id}")
+            logger.debug("Current AI mode: {}", ai_mode)
+
+            previous_response = self._previous_assistant_message()
+            cache_state = None
+            cached_response = None
+            if self.response_cache:
+                cache_state = self._response_cache_state(memory_tool, relevant_memories, ai_mode)
+                cached_response = await self.response_cache.get(text, previous_response, cache_state)
+
+            if cached_response is not None:
+                logger.info("Using cached response")
+                final_response = cached_response
+                tool_calls = []
+                if stream:
+                    yield {"type": "delta", "content": final_response}
             else:
-                logger.warning("No tool calls found in LLM response - AI may generate fake content")
-                final_response = llm_response.get("response", "")
+                pipeline_result: Dict[str, Any] = {}
+                async for event in self._run_llm_pipeline(text, memory_tool, relevant_memories, ai_mode, stream):
+                    if event["type"] == "delta":
+                        yield event
+                    else:
+                        pipeline_result = event
+                final_response = pipeline_result["response"]
+                llm_response = pipeline_result["llm_response"]
+                tool_calls = llm_response.get("tool_calls", [])
+                # ツールを使った応答は実行時点の状態（時刻・メール等）に依存するためキャッシュしない
+                if self.response_cache and final_response and not tool_calls and "error" not in llm_response:
+                    await self.response_cache.put(text, final_response, previous_response, cache_state)
 
             # 6. 応答をコンテキストに追加
             await self.context.add_assistant_message(final_response)
@@ -328,16 +362,137 @@ class VoiceAgent:
             speed = 0.9 if self._should_use_slow_speed(final_response) else None
             audio_url = await self.tts.synthesize(final_response, speed=speed)
 
-            return {
+            yield {"type": "result", "result": {
                 "text": final_response,
                 "audio_url": audio_url,
-                "tool_results": llm_response.get("tool_calls", []),
+                "tool_results": tool_calls,
                 "timestamp": await self._get_current_timestamp()
-            }
+            }}
 
         except Exception as e:
             logger.error(f"Error processing text: {e}")
-            return {"error": "処理中にエラーが発生しました"}
+            yield {"type": "result", "result": {"error": "処理中にエラーが発生しました"}}
+
+    async def _run_llm_pipeline(
+        self,
+        text: str,
+        memory_tool,
+        relevant_memories: List[Dict[str, Any]],
+        ai_mode: str,
+        stream: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        LLMによる意図理解・ツール実行・最終応答生成
+
+        Yields:
+            {"type": "delta", "content": 生成テキストの断片}（streamがTrueの場合のみ）
+            {"type": "done", "response": 応答テキスト, "llm_response": LLMの処理結果}
+        """
+        # 4. LLMで意図理解とツール選択
+        # メモリツールは既に取得済み
+
+        llm_kwargs = dict(
+            text=text,
+            context=self.context.get_context(),
+            memories=relevant_memories,
+            available_tools=self.tools.get_available_tools(),
+            memory_tool=memory_tool,
+            context_manager=self.context,
+            ai_mode=ai_mode
+        )
+        if stream:
+            llm_response: Dict[str, Any] = {}
+            async for event in self.llm.stream_with_tools(**llm_kwargs):
+                if event["type"] == "text":
+                    yield {"type": "delta", "content": event["content"]}
+                elif event["type"] == "done":
+                    llm_response = {"response": event["response"], "tool_calls": event["tool_calls"]}
+        else:
+            llm_response = await self.llm.process_with_tools(**llm_kwargs)
+
+        # 5. ツールの実行（必要な場合）
+        logger.debug(f"LLM response tool_calls: {llm_response.get('tool_calls')}")
+        if llm_response.get("tool_calls"):
+            logger.info(f"Executing {len(llm_response['tool_calls'])} tools")
+
+            # ツール実行中のステータス通知
+            tool_names = [tc.get('name', '') for tc in llm_response['tool_calls']]
+            if self.status_callback:
+                if 'gmail' in tool_names:
+                    await self.status_callback("📧 メールを確認中...")
+                elif 'calendar' in tool_names:
+                    await self.status_callback("📅 予定を確認中...")
+                elif 'alarm' in tool_names:
+                    await self.status_callback("⏰ アラームを設定中...")
+                else:
+                    await self.status_callback("🔧 処理中...")
+
+            # 全自動モードの場合、テーブルタスクを作成
+            if ai_mode == "auto" and memory_tool:
+                task_title = f"自動実行: {text[:30]}..."
+                task_content = f"ユーザー入力: {text}\nツール: {', '.join(tool_names)}"
+                table_task = await memory_tool.add_table_task(
+                    title=task_title,
+                    content=task_content,
+                    status="processing"
+                )
+                task_id = table_task.get("id")
+                logger.info(f"Created table task for auto mode: {task_id}")
+            else:
+                task_id = None
+
+            tool_results = await self._execute_tools(llm_response["tool_calls"])
+            logger.debug(f"Tool execution results: {tool_results}")
+
+            # Gmailツールの結果からメールIDを抽出してコンテキストに保存
+            await self._extract_and_store_email_ids(tool_results)
+
+            # メール状態を更新（次回の「他のメール」要求に備える）
+            await self._update_email_state_from_results(tool_results)
+
+            # ツール結果を含めて再度LLM処理
+            if self.status_callback:
+                await self.status_callback("🗣️ 応答を生成中...")
+
+            final_response = await self.llm.generate_final_response(
+                original_request=text,
+                tool_results=tool_results,
+                context=self.context.get_context()
+            )
+
+            # 全自動モードの場合、テーブルタスクを完了に更新
+            if ai_mode == "auto" and memory_tool and task_id:
+                result_summary = final_response[:100] + "..." if len(final_response) > 100 else final_response
+                await memory_tool.update_table_task(
+                    task_id=task_id,
+                    status="completed",
+                    result=result_summary
+                )
+                logger.info(f"Updated table task to completed: {task_id}")
+        else:
+            logger.warning("No tool calls found in LLM response - AI may generate fake content")
+            final_response = llm_response.get("response", "")
+
+        yield {"type": "done", "response": final_response, "llm_response": llm_response}
+
+    @staticmethod
+    def _response_cache_state(memory_tool, memories: List[Dict[str, Any]], ai_mode: str) -> str:
+        """
+        応答キャッシュの文脈キーに含める、プロンプトの入力（AIモード・個人情報・関連する記憶）
+
+        個人情報の更新やモードの切り替え後に、以前の応答を再利用しないようにする。
+        記憶は保存時刻の異なる同じ内容が並ぶため、重複を除いた本文で比較する
+        """
+        personal_context = memory_tool.format_personal_context() if memory_tool else ""
+        memory_contents = sorted({str(memory.get("content", "")) for memory in memories or []})
+        return "\x00".join([ai_mode, personal_context, *memory_contents])
+
+    def _previous_assistant_message(self) -> Optional[str]:
+        """直前のアシスタント応答を取得（応答キャッシュの文脈キー用）"""
+        for message in reversed(self.context.get_context(include_system=False)):
+            if message.get("role") == "assistant":
+                return message.get("content")
+        return None
 
     async def _execute_tools(self, tool_calls: list) -> Dict[str, Any]:
         """ツールを実行して結果を取得"""
@@ -385,27 +540,51 @@ class VoiceAgent:
         return results
 
     async def get_status(self) -> Dict[str, Any]:
-        """システム状態の取得"""
+        """
+        システム状態の取得
+
+        STATUS_CACHE_TTL 秒以内の結果は再利用し、収集中に届いた要求は同じ収集結果を待つ
+        """
         if not self.is_initialized:
             return {"status": "not_initialized"}
 
-        return {
-            "status": "ready",
-            "components": {
-                "stt": await self.stt.get_status(),
-                "tts": await self.tts.get_status(),
-                "llm": await self.llm.get_status(),
-                "memory": await self.memory.get_status(),
-                "tools": await self.tools.get_status()
+        if self._status_cache is not None and time.monotonic() - self._status_cache[0] < STATUS_CACHE_TTL:
+            return self._status_cache[1]
+
+        if self._status_task is None:
+            self._status_task = asyncio.create_task(self._collect_status())
+        # 待っている要求の1つがキャンセルされても、他の要求が待つ収集は継続させる
+        return await asyncio.shield(self._status_task)
+
+    async def _collect_status(self) -> Dict[str, Any]:
+        """各コンポーネントの状態を収集してキャッシュ"""
+        try:
+            status = {
+                "status": "ready",
+                "components": {
+                    "stt": await self.stt.get_status(),
+                    "tts": await self.tts.get_status(),
+                    "llm": await self.llm.get_status(),
+                    "memory": await self.memory.get_status(),
+                    "tools": await self.tools.get_status(),
+                    "response_cache": self.response_cache.get_stats() if self.response_cache else None
+                }
             }
-        }
+            self._status_cache = (time.monotonic(), status)
+            return status
+        finally:
+            self._status_task = None
 
     async def update_config(self, config: Dict[str, Any]):
         """設定の更新"""
         logger.info(f"Updating configuration: {config}")
+        self._status_cache = None
 
         if "llm" in config:
             await self.llm.update_config(config["llm"])
+            # 応答の生成元が変わるためキャッシュ済みの応答を破棄
+            if self.response_cache:
+                self.response_cache.clear()
         if "tts" in config:
             await self.tts.update_config(config["tts"])
         if "memory" in config:
@@ -435,6 +614,9 @@ class VoiceAgent:
 
         await asyncio.gather(*cleanup_tasks, return_exceptions=True)
 
+        if self.response_cache:
+            self.response_cache.save()
+
         self.is_initialized = False
         logger.info("Voice Agent cleanup completed")
 
@@ -462,9 +644,7 @@ class VoiceAgent:
                 return
 
             # メール一覧結果からIDを抽出
-            import re
-            id_pattern = r'ID:\s*([a-zA-Z0-9]+)'
-            matches = re.findall(id_pattern, gmail_result)
+            matches = _RE_EMAIL_ID.findall(gmail_result)
             logger.debug(f"Regex matches found: {matches}")
 
             if matches:
@@ -0,0 +1,113 @@
+"""
+Response Cache - エージェント応答キャッシュ
+
+同じ・言い換えられた問い合わせに対して、過去の応答テキストを再利用して
+LLMによる意図理解と応答生成を省略するためのキャッシュ
+"""
+
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import Executor
+from typing import Dict, Any, Optional
+from loguru import logger
+
+from src.llm.semantic_cache import SemanticCache
+
+
+class ResponseCache:
+    """
+    エージェント応答キャッシュ
+
+    完全一致（SHA-256）→ 意味的類似度（SemanticCache）の順に参照する。
+    会話の流れやプロンプトの他の入力に依存する応答を誤って再利用しないよう、直前のアシスタント応答と
+    呼び出し側が渡す状態（個人情報・記憶・AIモード等）を文脈キーとして一緒に保存し、
+    文脈キーが一致する場合のみヒットとする
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.92,
+        max_entries: int = 512,
+        cache_path: Optional[str] = None
+    ):
+        self.max_entries = max_entries
+        self._exact: "OrderedDict[str, str]" = OrderedDict()
+        self.semantic = SemanticCache(threshold=threshold, max_entries=max_entries, cache_path=cache_path)
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    async def initialize(self, encoder=None, executor: Optional[Executor] = None):
+        """
+        意味キャッシュのエンコーダーを読み込み（利用できない場合は完全一致のみ）
+
+        PersonalMemory が同じモデルのエンコーダーを読み込み済みの場合は、encoder と
+        その推論用の executor を渡して共有する
+        """
+        await self.semantic.initialize(encoder=encoder, executor=executor)
+
+    @staticmethod
+    def _context_key(previous_response: Optional[str], state: Optional[str] = None) -> str:
+        """直前のアシスタント応答と状態から文脈キーを計算"""
+        return hashlib.sha256(f"{previous_response or ''}\x00{state or ''}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _exact_key(text: str, context_key: str) -> str:
+        """完全一致キャッシュのキーを計算"""
+        return hashlib.sha256(f"{context_key}\n{text.strip()}".encode("utf-8")).hexdigest()
+
+    async def get(
+        self, text: str, previous_response: Optional[str] = None, state: Optional[str] = None
+    ) -> Optional[str]:
+        """キャッシュ済みの応答テキストを取得"""
+        context_key = self._context_key(previous_response, state)
+
+        exact_key = self._exact_key(text, context_key)
+        cached = self._exact.get(exact_key)
+        if cached is not None:
+            self._exact.move_to_end(exact_key)
+            self.exact_hits += 1
+            return cached
+
+        if self.semantic.is_available:
+            # 文脈キーをタグとして、文脈が一致するエントリの中で最も類似したものを探す
+            entry = await self.semantic.get(text, tag=context_key)
+            if entry is not None:
+                self.semantic_hits += 1
+                logger.debug("Response cache semantic hit")
+                return entry["response"]
+
+        self.misses += 1
+        return None
+
+    async def put(
+        self, text: str, response: str, previous_response: Optional[str] = None, state: Optional[str] = None
+    ):
+        """応答テキストをキャッシュに追加"""
+        context_key = self._context_key(previous_response, state)
+
+        self._exact[self._exact_key(text, context_key)] = response
+        if len(self._exact) > self.max_entries:
+            self._exact.popitem(last=False)
+
+        await self.semantic.put(text, {"response": response}, tag=context_key)
+
+    def clear(self):
+        """キャッシュを全て破棄"""
+        self._exact.clear()
+        self.semantic.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """キャッシュの統計情報を取得"""
+        return {
+            "exact_entries": len(self._exact),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "semantic": self.semantic.get_stats()
+        }
+
+    def save(self):
+        """意味キャッシュをディスクに保存"""
+        self.semantic.save()
@@ -0,0 +1,74 @@
+"""
+Server Config - uvicornの起動オプション
+
+run.py と src/main.py の両方から使用するサーバー起動設定
+"""
+
+import os
+from typing import Dict, Any
+from loguru import logger
+
+# uvloop（libuvベースのイベントループ）はWindowsでは利用不可
+try:
+    import uvloop  # noqa: F401
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+# httptools（C実装のHTTPパーサー）
+try:
+    import httptools  # noqa: F401
+    HTTPTOOLS_AVAILABLE = True
+except ImportError:
+    HTTPTOOLS_AVAILABLE = False
+
+
+# WebSocketの受信フレームの最大サイズ（バイト）と受信キューの上限
+WS_MAX_SIZE = int(os.getenv("WS_MAX_SIZE", str(4 * 1024 * 1024)))
+WS_MAX_QUEUE = 32
+
+
+def get_uvicorn_options() -> Dict[str, Any]:
+    """
+    uvicorn.run に渡すイベントループ・プロトコル実装の設定を取得
+
+    uvicorn[standard] で導入されるC実装（uvloop・httptools）を明示的に指定し、
+    利用できない環境では標準実装を使用する
+    """
+    options = {
+        "loop": "uvloop" if UVLOOP_AVAILABLE else "asyncio",
+        "http": "httptools" if HTTPTOOLS_AVAILABLE else "h11",
+        "ws": "websockets",
+        # 受信フレームの最大サイズ（録音1回分の音声が収まる大きさ）と、未処理の受信フレーム数の上限
+        "ws_max_size": WS_MAX_SIZE,
+        "ws_max_queue": WS_MAX_QUEUE,
+    }
+    logger.info(f"uvicorn options: {options}")
+    return options
+
+
+def is_reload_enabled() -> bool:
+    """
+    コード変更時の自動リロード（開発モード）を有効にするか
+
+    DEBUG（既定はtrue）に従うが、ENV=production の場合は常に無効にする
+    """
+    if os.getenv("ENV", "").lower() == "production":
+        return False
+    return os.getenv("DEBUG", "true").lower() == "true"
+
+
+def get_worker_count(reload: bool = False) -> int:
+    """
+    uvicornのワーカープロセス数を取得（環境変数 WEB_CONCURRENCY、既定は1）
+
+    各ワーカーは独立したプロセスのため、VoiceAgent・WebSocketManager の状態は
+    プロセスごとに持つ。broadcast_* は同じワーカーに接続しているクライアントにしか
+    届かないため、全体への配信が必要な場合はRedis等のPub/Subを別途用意すること。
+    reload（開発モード）とは併用できないため、その場合は常に1を返す
+    """
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    if reload and workers > 1:
+        logger.warning("WEB_CONCURRENCY is ignored while reload is enabled")
+        return 1
+    return workers
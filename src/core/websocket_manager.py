@@ -4,40 +4,348 @@ WebSocket Manager - WebSocket接続管理
 複数のWebSocket接続を管理し、メッセージのブロードキャストを行う
 """
 
-from typing import List, Dict, Any
+import asyncio
+import functools
+from typing import Dict, Any, Union
 from fastapi import WebSocket, WebSocketDisconnect
 from loguru import logger
 import json
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    logger.warning("orjson not available, using standard json for WebSocket messages")
+
+# MessagePack（?fmt=msgpack で接続したクライアントにはバイナリフレームで送受信する）
+try:
+    import ormsgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+# 送信キューの上限（満杯の場合は破棄できる最も古いメッセージを破棄し、クライアントには gap メッセージで通知する）
+SEND_QUEUE_SIZE = 64
+# 満杯でも破棄しないメッセージ（応答の完了通知など）を含めた、キューに保持する件数の上限
+# これを超えて溜まったクライアントは応答がないとみなし切断する
+MAX_QUEUED_MESSAGES = SEND_QUEUE_SIZE * 2
+# キューが満杯の場合に破棄してよいメッセージの type
+# 途中経過の通知とストリーミングの断片は、後続の状態通知・assistant_done の全文で補われる
+DROPPABLE_MESSAGE_TYPES = frozenset({"assistant_delta", "status"})
+# シリアライズ済みのJSON文字列の type を判定するための先頭部分
+_DROPPABLE_MESSAGE_PREFIXES = tuple(f'{{"type":"{message_type}"' for message_type in DROPPABLE_MESSAGE_TYPES)
+# 送信タスクが1フレームも送れないまま、これを超える件数を破棄したクライアントは応答がないとみなし切断する
+MAX_DROPPED_MESSAGES = SEND_QUEUE_SIZE
+# 1フレームにまとめる最大メッセージ数
+# ストリーミングの断片が溜まった遅いクライアントでも、満杯のキューを4フレームで送り切れる大きさにする
+MAX_COALESCED_MESSAGES = 16
+
+
+def dumps_json(data: Any) -> str:
+    """WebSocket送信用のJSON文字列を生成（orjsonが利用可能なら高速版を使用）
+
+    フロントエンドはテキストフレームをJSON.parseするため、bytesではなく文字列で返す
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps_json_bytes(data: Any) -> bytes:
+    """HTTPレスポンス用のJSONバイト列を生成（orjsonが利用可能なら文字列を経由せずに生成）"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(data: Union[str, bytes]) -> Any:
+    """JSON文字列・バイト列をデコード（orjsonが利用可能なら高速版を使用）"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def wants_msgpack(websocket: WebSocket) -> bool:
+    """クライアントがMessagePack形式を要求しているか（ormsgpack未インストール時は常にJSON）"""
+    return MSGPACK_AVAILABLE and websocket.query_params.get("fmt") == "msgpack"
+
+
+def dumps_msgpack(data: Any) -> bytes:
+    """WebSocket送信用のMessagePackバイト列を生成"""
+    return ormsgpack.packb(data, option=ormsgpack.OPT_NON_STR_KEYS)
+
+
+# MessagePackクライアント向けの短縮スキーマ
+# 小さなフレームではキー文字列がサイズの大半を占めるため、type は整数のオペコード、
+# よく使うキーは短いキーに置き換えて送る（表にない type・キーはそのまま送る）
+OP_USER = 1
+OP_ASSIST = 2
+OP_STATUS = 3
+OP_ERROR = 4
+OP_GAP = 5
+OP_TURN = 6
+OP_DELTA = 7
+OP_DONE = 8
+
+COMPACT_OPCODES: Dict[str, int] = {
+    "user_message": OP_USER,
+    "assistant_message": OP_ASSIST,
+    "status": OP_STATUS,
+    "error": OP_ERROR,
+    "gap": OP_GAP,
+    "turn": OP_TURN,
+    "assistant_delta": OP_DELTA,
+    "assistant_done": OP_DONE,
+}
+
+COMPACT_KEYS: Dict[str, str] = {
+    "type": "t",
+    "content": "c",
+    "message": "m",
+    "timestamp": "ts",
+    "audio_url": "u",
+    "user": "us",
+    "assistant": "as",
+    "chunk": "ch",
+    "dropped": "d",
+}
+
+
+def is_droppable_message(message: Union[Dict[str, Any], str]) -> bool:
+    """キューが満杯の場合に破棄してよいメッセージか"""
+    if isinstance(message, str):
+        return message.startswith(_DROPPABLE_MESSAGE_PREFIXES)
+    return message.get("type") in DROPPABLE_MESSAGE_TYPES
+
+
+def compact_message(message: Any) -> Any:
+    """メッセージ辞書を短縮スキーマに変換（辞書以外はそのまま返す）"""
+    if not isinstance(message, dict):
+        return message
+    compact = {COMPACT_KEYS.get(key, key): value for key, value in message.items()}
+    if "t" in compact:
+        compact["t"] = COMPACT_OPCODES.get(compact["t"], compact["t"])
+    return compact
+
+
+def make_msgpack_packer():
+    """
+    接続ごとのMessagePackシリアライザを生成
+
+    ormsgpack には内部バッファを再利用する Packer がないため、オプションを束縛した
+    packb を送信タスクに閉じ込めて使う（ASGIの送信には呼び出しごとに独立したbytesが必要）
+    """
+    return functools.partial(ormsgpack.packb, option=ormsgpack.OPT_NON_STR_KEYS)
+
+
+async def send_text_frame(websocket: WebSocket, text: str):
+    """
+    シリアライズ済みのテキストフレームを送信
+
+    send_text / send_json のラッパーを経由せず、ASGIの websocket.send メッセージを直接送る
+    """
+    await websocket.send({"type": "websocket.send", "text": text})
+
+
+async def send_json(websocket: WebSocket, data: Any):
+    """JSONデータを送信（websocket.send_json の高速版）"""
+    await send_text_frame(websocket, dumps_json(data))
+
+
+async def _receive_frame(websocket: WebSocket) -> Dict[str, Any]:
+    """
+    ASGIメッセージを1件受信（切断時は WebSocketDisconnect を送出）
+
+    receive_text / receive_bytes は受信ごとに接続状態の検証を重ねて行うため、
+    ループで呼び出す受信処理では websocket.receive() を直接使う
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    return message
+
+
+async def receive_json(websocket: WebSocket, use_msgpack: bool = False) -> Any:
+    """
+    JSONデータを受信（websocket.receive_json の高速版、テキスト・バイナリどちらのフレームも受け付ける）
+
+    use_msgpack が真の場合、バイナリフレームはMessagePackとしてデコードする
+    """
+    message = await _receive_frame(websocket)
+    data = message.get("text")
+    if data is None:
+        data = message.get("bytes") or b""
+        if use_msgpack:
+            return ormsgpack.unpackb(data)
+    return loads_json(data)
+
+
+async def receive_bytes(websocket: WebSocket) -> bytes:
+    """
+    バイナリデータを受信（websocket.receive_bytes の高速版）
+
+    テキストフレーム（キープアライブ等）は読み飛ばして次のバイナリフレームを待つ
+    """
+    while True:
+        message = await _receive_frame(websocket)
+        data = message.get("bytes")
+        if data is not None:
+            return data
+
 
 class WebSocketManager:
     """WebSocket接続を管理するクラス"""
 
     def __init__(self):
-        # アクティブなWebSocket接続のリスト
-        self.active_connections: List[WebSocket] = []
+        # アクティブなWebSocket接続（id(ws) をキーにした辞書）
+        # 単一のイベントループ上でのみ操作するためロックは不要。登録・削除はO(1)で、
+        # ブロードキャストは values() のスナップショットを走査する
+        self.active_connections: Dict[int, WebSocket] = {}
         # 接続別の情報を保存
         self.connection_info: Dict[WebSocket, Dict[str, Any]] = {}
+        # 接続別の送信キューと送信タスク（受信ループを遅いクライアントから切り離す）
+        self.send_queues: Dict[WebSocket, asyncio.Queue] = {}
+        self.writer_tasks: Dict[WebSocket, asyncio.Task] = {}
+        # 接続別の、まだクライアントに通知していない破棄済みメッセージ数
+        self.dropped_counts: Dict[WebSocket, int] = {}
 
     async def connect(self, websocket: WebSocket):
         """新しいWebSocket接続を受け入れる"""
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections[id(websocket)] = websocket
         self.connection_info[websocket] = {
             "connected_at": None,  # タイムスタンプは実装時に追加
             "user_id": None,
-            "session_id": None
+            "session_id": None,
+            "format": "msgpack" if wants_msgpack(websocket) else "json"
         }
+        # 破棄しないメッセージは SEND_QUEUE_SIZE を超えても追加するため、上限は enqueue_json で管理する
+        queue: asyncio.Queue = asyncio.Queue()
+        self.send_queues[websocket] = queue
+        self.writer_tasks[websocket] = asyncio.create_task(
+            self._writer(websocket, queue, self.uses_msgpack(websocket))
+        )
         logger.info(f"WebSocket connected. Total connections: {len(self.active_connections)}")
 
     def disconnect(self, websocket: WebSocket):
         """WebSocket接続を切断する"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            if websocket in self.connection_info:
-                del self.connection_info[websocket]
+        self.send_queues.pop(websocket, None)
+        self.dropped_counts.pop(websocket, None)
+        writer_task = self.writer_tasks.pop(websocket, None)
+        if writer_task is not None and writer_task is not asyncio.current_task():
+            writer_task.cancel()
+
+        if self.active_connections.pop(id(websocket), None) is not None:
+            self.connection_info.pop(websocket, None)
             logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
 
+    def uses_msgpack(self, websocket: WebSocket) -> bool:
+        """接続がMessagePack形式で通信するか"""
+        return self.connection_info.get(websocket, {}).get("format") == "msgpack"
+
+    def enqueue_json(self, data: Union[Dict[str, Any], str], websocket: WebSocket) -> bool:
+        """
+        JSONデータを送信キューに追加（送信は接続ごとの送信タスクが行う）
+
+        シリアライズ済みのJSON文字列もそのまま渡せる。キューが満杯の場合は破棄してよいメッセージ
+        （DROPPABLE_MESSAGE_TYPES）のうち最も古いものを破棄し、
+        次に送るフレームの先頭で {"type": "gap", "dropped": 件数} を通知する。
+        assistant_done・turn などのメッセージは満杯でも破棄せずに追加する。
+        送信が全く進まないまま MAX_DROPPED_MESSAGES を超えて破棄したクライアントと、
+        MAX_QUEUED_MESSAGES を超えて溜まったクライアントは切断する
+
+        Returns:
+            キューに追加できたかどうか
+        """
+        queue = self.send_queues.get(websocket)
+        if queue is None:
+            return False
+
+        if queue.qsize() < SEND_QUEUE_SIZE:
+            queue.put_nowait(data)
+            return True
+
+        # 破棄できる最も古いメッセージを取り除く（なければ追加するメッセージ自体を破棄する）
+        items = [queue.get_nowait() for _ in range(queue.qsize())]
+        index = next((i for i, item in enumerate(items) if is_droppable_message(item)), None)
+        if index is not None:
+            del items[index]
+            items.append(data)
+            added = True
+        elif is_droppable_message(data):
+            added = False
+        else:
+            # 破棄できるメッセージがない場合も、破棄しないメッセージは上限を超えて追加する
+            items.append(data)
+            for item in items:
+                queue.put_nowait(item)
+            if queue.qsize() > MAX_QUEUED_MESSAGES:
+                self._disconnect_stalled(websocket)
+                return False
+            return True
+        for item in items:
+            queue.put_nowait(item)
+
+        dropped = self.dropped_counts.get(websocket, 0) + 1
+        if dropped > MAX_DROPPED_MESSAGES:
+            self._disconnect_stalled(websocket)
+            return False
+
+        if dropped == 1:
+            logger.warning("WebSocket send queue full, dropping oldest messages")
+        self.dropped_counts[websocket] = dropped
+        return added
+
+    def _disconnect_stalled(self, websocket: WebSocket):
+        """受信が止まったクライアントを切断"""
+        logger.warning("WebSocket client stopped reading, disconnecting")
+        self.disconnect(websocket)
+        asyncio.create_task(self._close_quietly(websocket))
+
+    async def _writer(self, websocket: WebSocket, queue: asyncio.Queue, use_msgpack: bool = False):
+        """
+        送信キューを読み出してクライアントに送信
+
+        キューに連続して溜まっているメッセージは配列として1フレームにまとめて送る
+        """
+        pack = make_msgpack_packer() if use_msgpack else None
+        try:
+            while True:
+                batch = [await queue.get()]
+                while not queue.empty() and len(batch) < MAX_COALESCED_MESSAGES:
+                    batch.append(queue.get_nowait())
+
+                # 破棄したメッセージがあれば、残りのメッセージより先に欠落を通知する
+                dropped = self.dropped_counts.pop(websocket, 0)
+                if dropped:
+                    batch.insert(0, {"type": "gap", "dropped": dropped})
+
+                if use_msgpack:
+                    # シリアライズ済みのJSON文字列は一度デコードし、短縮スキーマでMessagePackに変換する
+                    items = [compact_message(loads_json(item) if isinstance(item, str) else item) for item in batch]
+                    payload = pack(items[0] if len(items) == 1 else items)
+                    await websocket.send({"type": "websocket.send", "bytes": payload})
+                    continue
+
+                # シリアライズ済みの文字列はそのまま使い、配列は文字列の連結で組み立てる
+                parts = [item if isinstance(item, str) else dumps_json(item) for item in batch]
+                payload = parts[0] if len(parts) == 1 else "[" + ",".join(parts) + "]"
+                await send_text_frame(websocket, payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to send queued messages: {e}")
+            self.disconnect(websocket)
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket):
+        """WebSocketを閉じる（既に閉じている場合のエラーは無視）"""
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
     async def send_personal_message(self, message: str, websocket: WebSocket):
         """特定のWebSocketに個人メッセージを送信"""
         try:
@@ -49,7 +357,7 @@ class WebSocketManager:
     async def send_personal_json(self, data: Dict[str, Any], websocket: WebSocket):
         """特定のWebSocketにJSONデータを送信"""
         try:
-            await websocket.send_json(data)
+            await send_json(websocket, data)
         except Exception as e:
             logger.error(f"Failed to send personal JSON: {e}")
             self.disconnect(websocket)
@@ -68,7 +376,7 @@ class WebSocketManager:
             return
 
         disconnected = []
-        for connection in self.active_connections:
+        for connection in list(self.active_connections.values()):
             try:
                 await connection.send_text(message)
             except Exception as e:
@@ -84,10 +392,12 @@ class WebSocketManager:
         if not self.active_connections:
             return
 
+        # シリアライズは全接続で共通のため1回だけ行う
+        message = dumps_json(data)
         disconnected = []
-        for connection in self.active_connections:
+        for connection in list(self.active_connections.values()):
             try:
-                await connection.send_json(data)
+                await send_text_frame(connection, message)
             except Exception as e:
                 logger.error(f"Failed to broadcast JSON: {e}")
                 disconnected.append(connection)
@@ -102,7 +412,7 @@ class WebSocketManager:
             return
 
         disconnected = []
-        for connection in self.active_connections:
+        for connection in list(self.active_connections.values()):
             try:
                 await connection.send_bytes(data)
             except Exception as e:
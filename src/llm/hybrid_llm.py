@@ -5,9 +5,15 @@ ClaudeとOllamaを組み合わせてプライバシーと性能を両立するLL
 """
 
 import os
-import json
+import re
 import asyncio
-from typing import Dict, Any, List, Optional, Union
+import hashlib
+import random
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field, replace
+from functools import lru_cache
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple, Union
 from datetime import datetime
 from loguru import logger
 
@@ -32,6 +38,428 @@ except ImportError:
     OPENAI_AVAILABLE = False
     logger.warning("OpenAI library not available")
 
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+    # HTTP/2はh2パッケージがある場合のみ有効化
+    try:
+        import h2  # noqa: F401
+        HTTP2_AVAILABLE = True
+    except ImportError:
+        HTTP2_AVAILABLE = False
+except ImportError:
+    HTTPX_AVAILABLE = False
+    HTTP2_AVAILABLE = False
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+    logger.warning("tiktoken not available, using approximate token counts for context trimming")
+
+from src.llm import tool_parse
+from src.llm.semantic_cache import SemanticCache
+from src.llm.tool_parse import json_loads as _json_loads
+
+if tool_parse.COMPILED:
+    logger.info("Using compiled tool_parse extension")
+
+# 応答中のツール呼び出し（TOOL_CALL: {...}）
+# 1つ目は最初の}まで、2つ目は1段のネストを含むJSONを捕捉（改行で切られた場合も対応）
+_TOOL_CALL_RE = re.compile(r'TOOL_CALL:\s*(\{[^}]*\}?)', re.DOTALL | re.MULTILINE)
+_TOOL_CALL_NESTED_RE = re.compile(
+    r'TOOL_CALL:\s*(\{[^{}]*(?:\{[^{}]*\})*[^}]*\}?)', re.DOTALL | re.MULTILINE
+)
+
+# ツール実行結果から最終応答を生成する際のシステムプロンプト
+_FINAL_RESPONSE_SYSTEM_PROMPT = (
+    "以下のツール実行結果を基に、ユーザーに分かりやすい応答を生成してください。\n"
+    "【重要ルール】\n"
+    "• 必ず1〜2文以内で簡潔に答える\n"
+    "• 応答構造: 結論を先に → 必要なら簡潔な補足\n"
+    "• ツールが返した結果をそのまま伝える（余計な解釈や説明を加えない）\n"
+    "• 技術的な詳細は省略し、自然な日本語で\n"
+    "• 「〜ですね」「〜ですよ」など柔らかい語尾を使う"
+)
+
+# 会話コンテキスト中のメールID（Gmailツールの一覧表示形式）
+_RE_EMAIL_ID = re.compile(r'ID:\s*([a-zA-Z0-9]+)')
+
+
+def _freeze(obj: Any) -> Any:
+    """dict/listを再帰的にfrozenset/tupleへ変換してハッシュ可能にする（重複判定用）"""
+    if isinstance(obj, dict):
+        return frozenset((key, _freeze(value)) for key, value in obj.items())
+    if isinstance(obj, list):
+        return tuple(_freeze(item) for item in obj)
+    return obj
+
+
+# Ollamaの一時的な通信エラー（SDKに再試行機能がないため自前で再試行する）
+_OLLAMA_TRANSIENT_ERRORS: Tuple[type, ...] = (httpx.TransportError,) if HTTPX_AVAILABLE else ()
+
+
+async def _retry_call(
+    coro_factory: Callable[[], Awaitable[Any]],
+    retries: int,
+    retry_on: Tuple[type, ...],
+    base_delay: float = 0.25
+) -> Any:
+    """
+    一時的なエラーを指数バックオフ（ジッター付き）で再試行
+
+    Args:
+        coro_factory: 呼び出すたびに新しいコルーチンを返す関数
+        retries: 最大再試行回数
+        retry_on: 再試行対象の例外クラス
+        base_delay: 初回の待機時間（秒）。試行ごとに2倍になる
+    """
+    for attempt in range(retries + 1):
+        try:
+            return await coro_factory()
+        except retry_on as e:
+            if attempt >= retries:
+                raise
+            delay = base_delay * (2 ** attempt) + random.random() * 0.1
+            logger.warning(f"Transient error, retrying in {delay:.2f}s ({attempt + 1}/{retries}): {e}")
+            await asyncio.sleep(delay)
+
+
+@lru_cache(maxsize=1)
+def _get_token_encoding():
+    """トークン数計算用のエンコーディングを取得（読み込めない場合はNone）"""
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Failed to load tiktoken encoding, using approximate token counts: {e}")
+        return None
+
+
+def _count_tokens(text: str) -> int:
+    """
+    テキストのトークン数を計算
+
+    tiktokenが使えない場合（Ollamaのみの環境など）は、マルチバイト文字を1トークン、
+    ASCII文字を4文字で1トークンとして概算する
+    """
+    encoding = _get_token_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+
+    # UTF-8で2〜3バイトになる文字数を概算（日本語はほぼ3バイト）
+    multibyte_chars = (len(text.encode("utf-8")) - len(text)) // 2
+    return multibyte_chars + (len(text) - multibyte_chars) // 4 + 1
+
+
+class _ToolCallStreamFilter:
+    """
+    ストリーミング応答からTOOL_CALL部分を切り出すフィルター
+
+    TOOL_CALL: 以外のテキストはそのまま通し、TOOL_CALL: 以降は括弧の対応が
+    取れるまでバッファして1件のツール呼び出し候補として返す。
+    JSON文字列内の括弧は数えず、マーカーの後が { で始まらない場合はテキストとして通す
+    """
+
+    MARKER = "TOOL_CALL:"
+
+    def __init__(self):
+        self._pending = ""  # マーカーの途中で切れている可能性のある末尾テキスト
+        self._in_call = False
+        self._call_prefix = ""  # マーカーと直後の空白（ツール呼び出しでなかった場合にテキストとして返す）
+        self._call_buffer = ""
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> Tuple[str, List[str]]:
+        """
+        チャンクを処理
+
+        Returns:
+            (そのまま出力できるテキスト, 完結したツール呼び出しJSONのリスト)
+        """
+        data = self._pending + chunk
+        self._pending = ""
+        text_parts = []
+        calls = []
+        pos = 0
+
+        while pos < len(data):
+            if not self._in_call:
+                marker_pos = data.find(self.MARKER, pos)
+                if marker_pos == -1:
+                    # 末尾がマーカーの先頭部分と一致する場合は次のチャンクまで保留
+                    tail = data[pos:]
+                    keep = next(
+                        (n for n in range(min(len(tail), len(self.MARKER) - 1), 0, -1)
+                         if self.MARKER.startswith(tail[-n:])),
+                        0
+                    )
+                    text_parts.append(tail[:len(tail) - keep])
+                    self._pending = tail[len(tail) - keep:]
+                    break
+
+                text_parts.append(data[pos:marker_pos])
+                self._in_call = True
+                self._call_prefix = self.MARKER
+                self._call_buffer = ""
+                self._depth = 0
+                self._in_string = False
+                self._escaped = False
+                pos = marker_pos + len(self.MARKER)
+                continue
+
+            char = data[pos]
+            if not self._call_buffer:
+                if char.isspace():
+                    self._call_prefix += char
+                    pos += 1
+                    continue
+                if char != '{':
+                    # ツール呼び出しではないため、マーカー以降もテキストとして扱う
+                    text_parts.append(self._call_prefix)
+                    self._in_call = False
+                    continue
+
+            pos += 1
+            self._call_buffer += char
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth <= 0:
+                    calls.append(self._call_buffer)
+                    self._in_call = False
+
+        return "".join(text_parts), calls
+
+    def flush(self) -> Tuple[str, Optional[str]]:
+        """
+        ストリーム終了時に残りを取り出す
+
+        Returns:
+            (残りのテキスト, 閉じ括弧が欠けたままのツール呼び出し候補)
+        """
+        text, self._pending = self._pending, ""
+        if self._in_call and not self._call_buffer:
+            text = self._call_prefix + text
+        call = self._call_buffer if self._in_call and self._call_buffer else None
+        self._in_call = False
+        self._call_buffer = ""
+        return text, call
+
+
+# ツール別の使用例（ナレッジベース）
+# 毎ターン同一の内容を送るため、システムプロンプト先頭のキャッシュ対象部分に配置する
+TOOL_KNOWLEDGE_BASE: Dict[str, str] = {
+    "gmail": "\n".join([
+        "",
+        "📧 Gmail:",
+        "  キーワード: メール/gmail/受信/送信/返信",
+        "  ",
+        "  基本的な使い方:",
+        "  • メール確認（一般）: TOOL_CALL: {\"name\":\"gmail\",\"parameters\":{\"action\":\"list\",\"max_results\":5}}",
+        "  • 最新1件のみ: TOOL_CALL: {\"name\":\"gmail\",\"parameters\":{\"action\":\"list\",\"max_results\":1}}",
+        "  • 未読確認: TOOL_CALL: {\"name\":\"gmail\",\"parameters\":{\"action\":\"list\",\"query\":\"is:unread\"}}",
+        "  ",
+        "  検索機能:",
+        "  • 特定送信者から: query=\"from:送信者名\" (例: query=\"from:田中\")",
+        "  • 件名で検索: query=\"subject:キーワード\" (例: query=\"subject:会議\")",
+        "  • 本文検索: query=\"キーワード\" (例: query=\"請求書\")",
+        "  ",
+        "  ⚠️ 検索の重要ルール:",
+        "  • 「メール確認して」など一般的な要求 → query指定なし（全メール対象）",
+        "  • 「◯◯からメール来てる?」→ query=\"from:◯◯\" を使う",
+        "  • 「△△に関するメール」→ query=\"subject:△△\" または query=\"△△\" を使う",
+        "  • 例示された'example@example.com'などは使わない（実際の名前を使う）",
+        "  ",
+        "  返信時:",
+        "  • 返信: TOOL_CALL: {\"name\":\"gmail\",\"parameters\":{\"action\":\"reply\",\"message_id\":\"<実際のID>\",\"body\":\"<返信内容>\"}}",
+        "  ",
+        "  ⚠️ 返信時の重要ルール:",
+        "  • 「〇〇と返信して」という要求の場合:",
+        "    - 【メール返信情報】に最新メールIDがあればそれを使用",
+        "    - なければ まず一覧取得 → メールID取得 → 返信の順で実行",
+        "    - プレースホルダー文字列(「メールID」など)は使用禁止",
+        "  • 返信内容はユーザー指示に忠実に、適切な敬語で作成",
+    ]),
+    "alarm": "\n".join([
+        "",
+        "🔔 Alarm:",
+        "  キーワード: アラーム/起こして/リマインド/セット",
+        "  • 設定: TOOL_CALL: {\"name\":\"alarm\",\"parameters\":{\"action\":\"set\",\"time\":\"HH:MM\",\"message\":\"<メッセージ>\",\"repeat\":false}}",
+        "  • 一覧: TOOL_CALL: {\"name\":\"alarm\",\"parameters\":{\"action\":\"list\"}}",
+        "  ",
+        "  時刻変換例:",
+        "  • 「7時に起こして」→ time=\"07:00\", message=\"起きる時間ですよ\"",
+        "  • 「14時半にアラーム」→ time=\"14:30\", message=\"アラームです\"",
+        "  • 「18時に薬飲むとリマインド」→ time=\"18:00\", message=\"薬を飲む時間ですよ\"",
+        "  ",
+        "  ⚠️ 必ずツール実行してから「〇時にセットしましたよ」と応答",
+    ]),
+}
+
+# ツール実行の共通ルール
+TOOL_CALL_RULES = "\n".join([
+    "",
+    "📌 ツール実行の共通ルール:",
+    "• 形式: TOOL_CALL: {\"name\":\"ツール名\",\"parameters\":{\"パラメータ\":\"値\"}}",
+    "• 実在しないパラメータは使用禁止",
+    "• Gmailは推測禁止、必ずツールで確認",
+    "• カレンダー/天気など情報取得系は必ずツール実行",
+    "",
+])
+
+
+# システムプロンプト【第1層】コア人格・会話スタイル
+_PROMPT_CORE_PERSONA = "\n".join([
+    "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
+    "【第1層】コア人格・会話スタイル",
+    "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
+    "",
+    "あなたは親しみやすく頼れる音声AIアシスタントです。",
+    "",
+    "🎤 会話の基本ルール:",
+    "• 必ず1〜2文以内で要点だけ伝える",
+    "• 応答構造: 結論を先に → 必要なら簡潔な補足",
+    "• 感情豊かに、声で聞いても心地よい自然な口調で話す",
+    "• 「〜ですね」「〜ですよ」など柔らかい語尾を使う",
+    "• 事実を伝えるときも温かく、冷たくならない",
+    "• 句読点を減らし滑らかに読める文章にする",
+    "• 無駄なあいづちは避けテンポよく進める",
+    "• 長い説明が必要なら「詳しく聞きますか?」と区切る",
+    "",
+])
+
+# システムプロンプト【第2層】意図理解・ツール実行判断
+_PROMPT_INTENT_HEADER = "\n".join([
+    "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
+    "【第2層】意図理解・ツール実行判断",
+    "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
+    "",
+    "🧠 ユーザー発言の理解プロセス:",
+    "1. 発言から「本当の目的」を推測する",
+    "2. その目的に必要なツールを判断する",
+    "3. ツールが必要なら即座に実行する",
+    "4. 結果を自然な言葉で簡潔に伝える",
+    "",
+])
+
+# AIモード別のツール実行方針
+_PROMPT_AI_MODES: Dict[str, str] = {
+    "auto": "\n".join([
+        "🔥 全自動モード:",
+        "• 挨拶や雑談でも文脈から必要な情報を推測してツールを実行する",
+        "• 例: 「おはよう」→ gmail + calendar を自動実行",
+        "• 例: 「忙しい」→ 今日の重要タスク確認 + リマインダー設定",
+        "• ユーザーの潜在的ニーズを先回りして行動する",
+        "",
+    ]),
+    "assist": "\n".join([
+        "📋 アシストモード:",
+        "• ユーザーの明示的な指示がある場合のみツールを実行する",
+        "• 例: 「おはよう」→ 挨拶のみ、ツール実行なし",
+        "• 例: 「メール見て」→ gmail実行",
+        "• 必要に応じてツール使用を提案できるが、勝手に実行しない",
+        "",
+    ]),
+}
+
+# 実行判断の基準と【第3層】ツール実行の技術仕様の見出し
+_PROMPT_INTENT_RULES = "\n".join([
+    "💡 実行判断の基準:",
+    "• 「確認」「見て」「教えて」= ツール実行が必要",
+    "• 「セット」「送って」「リマインド」= アクション実行",
+    "• 「メール」「予定」「アラーム」などのキーワード = 該当ツール実行",
+    "• 雑談・感想・質問のみ = ツール不要、会話で応答",
+    "",
+    "⚡ 重要原則:",
+    "• 曖昧な表現でも文脈から意図を汲み取る",
+    "• ツール実行後は結果を温かく自然な言葉で伝える",
+    "• 複数ツールが必要な場合は順番に実行する",
+    "",
+    "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
+    "【第3層】ツール実行の技術仕様",
+    "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
+    "",
+])
+
+
+@lru_cache(maxsize=32)
+def _tools_prompt_fragment(tools_key: Tuple[Tuple[str, str], ...]) -> str:
+    """ツール一覧・使用例・共通ルールのプロンプト断片（ツールの名前と説明の組ごとにキャッシュ）"""
+    prompt_parts = ["利用可能なツール:"]
+    prompt_parts.extend(f"• {name}: {description}" for name, description in tools_key)
+
+    # ツール別の使用例（ナレッジベース）は固定順で追加してプレフィックスを安定させる
+    tool_names = {name for name, _ in tools_key}
+    prompt_parts.extend(guide for name, guide in TOOL_KNOWLEDGE_BASE.items() if name in tool_names)
+
+    prompt_parts.append(TOOL_CALL_RULES)
+    return "\n".join(prompt_parts)
+
+
+@dataclass(slots=True)
+class LLMResponse:
+    """プロバイダーの生成結果"""
+    content: str
+    model: str
+    usage: Dict[str, Any] = field(default_factory=dict)
+    tool_calls: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """辞書に変換（キャッシュの永続化用）"""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LLMResponse":
+        """辞書から復元"""
+        return cls(
+            content=data.get("content", ""),
+            model=data.get("model", ""),
+            usage=data.get("usage") or {},
+            tool_calls=data.get("tool_calls") or []
+        )
+
+
+class _RequestRateLimiter:
+    """
+    スライディングウィンドウ方式のリクエスト数制限（1分あたりの上限）
+
+    上限に達している場合は最も古いリクエストがウィンドウから外れるまで待機する
+    """
+
+    def __init__(self, max_requests: int, period: float = 60.0):
+        self.max_requests = max_requests
+        self.period = period
+        self._timestamps: deque = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """リクエスト1件分の枠を取得（空きがなければ待機）"""
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                while self._timestamps and now - self._timestamps[0] >= self.period:
+                    self._timestamps.popleft()
+                if len(self._timestamps) < self.max_requests:
+                    self._timestamps.append(now)
+                    return
+                await asyncio.sleep(self._timestamps[0] + self.period - now)
+
 
 class LLMProvider:
     """LLMプロバイダーの基底クラス"""
@@ -39,15 +467,52 @@ class LLMProvider:
     def __init__(self, name: str):
         self.name = name
         self.is_available = False
+        # 同時実行数・リクエストレートの制限（configure_limitsで設定、未設定なら無制限）
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._rate_limiter: Optional[_RequestRateLimiter] = None
+
+    def configure_limits(self, max_concurrent: Optional[int] = None, rpm: Optional[int] = None):
+        """
+        プロバイダーの同時実行数とRPMの上限を設定
+
+        バースト時に上限を超えて429を受けるとフォールバックが発生するため、
+        送信側で流量を平準化する
+        """
+        self._semaphore = asyncio.Semaphore(max_concurrent) if max_concurrent else None
+        self._rate_limiter = _RequestRateLimiter(rpm) if rpm else None
+
+    @asynccontextmanager
+    async def throttle(self):
+        """同時実行数・レート制限の枠を確保してリクエストを実行するためのコンテキスト"""
+        if self._semaphore is None:
+            if self._rate_limiter is not None:
+                await self._rate_limiter.acquire()
+            yield
+            return
+
+        async with self._semaphore:
+            if self._rate_limiter is not None:
+                await self._rate_limiter.acquire()
+            yield
+
+    async def generate_limited(self, messages: List[Dict], **kwargs) -> LLMResponse:
+        """同時実行数・レート制限を適用してテキスト生成"""
+        async with self.throttle():
+            return await self.generate(messages, **kwargs)
 
     async def initialize(self, config: Dict[str, Any]):
         """プロバイダーの初期化"""
         pass
 
-    async def generate(self, messages: List[Dict], **kwargs) -> Dict[str, Any]:
+    async def generate(self, messages: List[Dict], **kwargs) -> LLMResponse:
         """テキスト生成"""
         raise NotImplementedError
 
+    async def generate_stream(self, messages: List[Dict], **kwargs) -> AsyncIterator[str]:
+        """テキスト生成（ストリーミング）。未対応のプロバイダーは全文を1回で返す"""
+        response = await self.generate(messages, **kwargs)
+        yield response.content
+
     async def is_healthy(self) -> bool:
         """プロバイダーの健全性チェック"""
         return self.is_available
@@ -75,7 +540,13 @@ class ClaudeProvider(LLMProvider):
                 logger.warning("Claude API key not available or library missing")
                 return
 
-            self.client = anthropic.Anthropic(api_key=api_key)
+            # 非同期クライアントを使用し、生成中もイベントループをブロックしない
+            # 429/5xx/通信エラーはSDK内蔵の指数バックオフで再試行してからフォールバックする
+            self.client = anthropic.AsyncAnthropic(
+                api_key=api_key,
+                http_client=config.get("http_client"),
+                max_retries=config.get("max_retries", 2)
+            )
             self.model = config.get("model", self.model)
 
             # 接続テスト
@@ -91,7 +562,7 @@ class ClaudeProvider(LLMProvider):
         """接続テスト"""
         try:
             # 簡単なテストメッセージ
-            response = self.client.messages.create(
+            response = await self.client.messages.create(
                 model=self.model,
                 max_tokens=10,
                 messages=[{"role": "user", "content": "Hello"}]
@@ -101,39 +572,68 @@ class ClaudeProvider(LLMProvider):
             logger.error(f"Claude connection test failed: {e}")
             raise
 
-    async def generate(self, messages: List[Dict], **kwargs) -> Dict[str, Any]:
+    async def generate(self, messages: List[Dict], **kwargs) -> LLMResponse:
         if not self.is_available or not self.client:
             raise RuntimeError("Claude provider not available")
 
         try:
-            # Anthropicメッセージ形式に変換
-            anthropic_messages = self._convert_messages(messages)
+            # Anthropicメッセージ形式に変換（systemはブロックとして分離）
+            system_blocks, anthropic_messages = self._convert_messages(messages)
+
+            request = {
+                "model": self.model,
+                "max_tokens": kwargs.get("max_tokens", 1000),
+                "temperature": kwargs.get("temperature", 0.7),
+                "messages": anthropic_messages
+            }
+            if system_blocks:
+                request["system"] = system_blocks
 
             # リクエスト実行
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=kwargs.get("max_tokens", 1000),
-                temperature=kwargs.get("temperature", 0.7),
-                messages=anthropic_messages
-            )
+            response = await self.client.messages.create(**request)
 
-            return {
-                "content": response.content[0].text,
-                "model": self.model,
-                "usage": {
+            return LLMResponse(
+                content=response.content[0].text,
+                model=self.model,
+                usage={
                     "input_tokens": response.usage.input_tokens,
-                    "output_tokens": response.usage.output_tokens
+                    "output_tokens": response.usage.output_tokens,
+                    "cache_read_input_tokens": getattr(response.usage, "cache_read_input_tokens", None) or 0
                 }
-            }
+            )
 
         except Exception as e:
             logger.error(f"Claude generation failed: {e}")
             raise
 
-    def _convert_messages(self, messages: List[Dict]) -> List[Dict]:
-        """メッセージをAnthropic形式に変換"""
-        # まずsystemメッセージを分離
-        system_content = ""
+    async def generate_stream(self, messages: List[Dict], **kwargs) -> AsyncIterator[str]:
+        if not self.is_available or not self.client:
+            raise RuntimeError("Claude provider not available")
+
+        system_blocks, anthropic_messages = self._convert_messages(messages)
+        request = {
+            "model": self.model,
+            "max_tokens": kwargs.get("max_tokens", 1000),
+            "temperature": kwargs.get("temperature", 0.7),
+            "messages": anthropic_messages
+        }
+        if system_blocks:
+            request["system"] = system_blocks
+
+        async with self.client.messages.stream(**request) as stream:
+            async for text in stream.text_stream:
+                yield text
+
+    def _convert_messages(self, messages: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """
+        メッセージをAnthropic形式に変換
+
+        Returns:
+            (systemブロックのリスト, user/assistantメッセージのリスト)
+            cache_controlが指定されたsystemメッセージはキャッシュブロックとして渡す
+        """
+        # まずsystemメッセージをブロックとして分離
+        system_blocks = []
         non_system_messages = []
 
         for msg in messages:
@@ -141,10 +641,12 @@ class ClaudeProvider(LLMProvider):
             content = msg.get("content", "")
 
             if role == "system":
-                if system_content:
-                    system_content += f"\n\n{content}"
-                else:
-                    system_content = content
+                if not content:
+                    continue
+                block = {"type": "text", "text": content}
+                if msg.get("cache_control"):
+                    block["cache_control"] = msg["cache_control"]
+                system_blocks.append(block)
             else:
                 non_system_messages.append(msg)
 
@@ -167,18 +669,18 @@ class ClaudeProvider(LLMProvider):
                     "content": content
                 })
 
-        # システムメッセージを最初のユーザーメッセージに結合
-        if system_content and anthropic_messages:
-            if anthropic_messages[0]["role"] == "user":
-                anthropic_messages[0]["content"] = f"{system_content}\n\n{anthropic_messages[0]['content']}"
-            else:
-                # 最初がassistantの場合は、その前にuserメッセージを挿入
-                anthropic_messages.insert(0, {"role": "user", "content": system_content})
-        elif system_content:
-            # メッセージがsystemのみの場合
-            anthropic_messages.append({"role": "user", "content": system_content})
+        if not anthropic_messages and system_blocks:
+            # メッセージがsystemのみの場合はuserメッセージとして送る
+            anthropic_messages.append({
+                "role": "user",
+                "content": "\n\n".join(block["text"] for block in system_blocks)
+            })
+            system_blocks = []
+        elif anthropic_messages and anthropic_messages[0]["role"] == "assistant":
+            # 最初がassistantの場合は、その前にuserメッセージを挿入
+            anthropic_messages.insert(0, {"role": "user", "content": "（会話の続き）"})
 
-        return anthropic_messages
+        return system_blocks, anthropic_messages
 
 
 class OllamaProvider(LLMProvider):
@@ -188,6 +690,8 @@ class OllamaProvider(LLMProvider):
         super().__init__("ollama")
         self.base_url = "http://localhost:11434"
         self.model = "llama3.2"
+        self.client = None
+        self.max_retries = 2
 
     async def initialize(self, config: Dict[str, Any]):
         try:
@@ -197,6 +701,8 @@ class OllamaProvider(LLMProvider):
 
             self.base_url = config.get("base_url", self.base_url)
             self.model = config.get("model", self.model)
+            self.client = ollama.AsyncClient(host=self.base_url, timeout=config.get("timeout"))
+            self.max_retries = config.get("max_retries", 2)
 
             # 接続テスト
             await self._test_connection()
@@ -211,7 +717,7 @@ class OllamaProvider(LLMProvider):
         """接続テスト"""
         try:
             # Ollamaの利用可能なモデルをチェック
-            models = ollama.list()
+            models = await self.client.list()
             available_models = [model['name'] for model in models.get('models', [])]
 
             if self.model not in available_models:
@@ -223,7 +729,7 @@ class OllamaProvider(LLMProvider):
                     raise RuntimeError("No models available in Ollama")
 
             # 簡単なテスト
-            response = ollama.generate(
+            response = await self.client.generate(
                 model=self.model,
                 prompt="Hello",
                 stream=False,
@@ -235,8 +741,8 @@ class OllamaProvider(LLMProvider):
             logger.error(f"Ollama connection test failed: {e}")
             raise
 
-    async def generate(self, messages: List[Dict], **kwargs) -> Dict[str, Any]:
-        if not self.is_available:
+    async def generate(self, messages: List[Dict], **kwargs) -> LLMResponse:
+        if not self.is_available or not self.client:
             raise RuntimeError("Ollama provider not available")
 
         try:
@@ -244,31 +750,53 @@ class OllamaProvider(LLMProvider):
             prompt = self._convert_messages_to_prompt(messages)
 
             # Ollamaリクエスト実行
-            response = ollama.generate(
-                model=self.model,
-                prompt=prompt,
-                stream=False,
-                options={
-                    "temperature": kwargs.get("temperature", 0.7),
-                    "num_predict": kwargs.get("max_tokens", 1000),
-                    "top_p": kwargs.get("top_p", 0.9),
-                }
+            response = await _retry_call(
+                lambda: self.client.generate(
+                    model=self.model,
+                    prompt=prompt,
+                    stream=False,
+                    options={
+                        "temperature": kwargs.get("temperature", 0.7),
+                        "num_predict": kwargs.get("max_tokens", 1000),
+                        "top_p": kwargs.get("top_p", 0.9),
+                    }
+                ),
+                retries=self.max_retries,
+                retry_on=_OLLAMA_TRANSIENT_ERRORS
             )
 
-            return {
-                "content": response["response"].strip(),
-                "model": self.model,
-                "usage": {
+            return LLMResponse(
+                content=response["response"].strip(),
+                model=self.model,
+                usage={
                     "total_duration": response.get("total_duration", 0),
                     "load_duration": response.get("load_duration", 0),
                     "eval_duration": response.get("eval_duration", 0)
                 }
-            }
+            )
 
         except Exception as e:
             logger.error(f"Ollama generation failed: {e}")
             raise
 
+    async def generate_stream(self, messages: List[Dict], **kwargs) -> AsyncIterator[str]:
+        if not self.is_available or not self.client:
+            raise RuntimeError("Ollama provider not available")
+
+        stream = await self.client.generate(
+            model=self.model,
+            prompt=self._convert_messages_to_prompt(messages),
+            stream=True,
+            options={
+                "temperature": kwargs.get("temperature", 0.7),
+                "num_predict": kwargs.get("max_tokens", 1000),
+                "top_p": kwargs.get("top_p", 0.9),
+            }
+        )
+        async for part in stream:
+            if part.get("response"):
+                yield part["response"]
+
     def _convert_messages_to_prompt(self, messages: List[Dict]) -> str:
         """メッセージをプロンプト形式に変換"""
         prompt_parts = []
@@ -302,7 +830,13 @@ class OpenAIProvider(LLMProvider):
                 logger.warning("OpenAI API key not available or library missing")
                 return
 
-            self.client = openai.OpenAI(api_key=api_key)
+            # 非同期クライアントを使用し、生成中もイベントループをブロックしない
+            # 429/5xx/通信エラーはSDK内蔵の指数バックオフで再試行してからフォールバックする
+            self.client = openai.AsyncOpenAI(
+                api_key=api_key,
+                http_client=config.get("http_client"),
+                max_retries=config.get("max_retries", 2)
+            )
             self.model = config.get("model", self.model)
 
             # 接続テスト
@@ -317,7 +851,7 @@ class OpenAIProvider(LLMProvider):
     async def _test_connection(self):
         """接続テスト"""
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[{"role": "user", "content": "Hello"}],
                 max_tokens=10
@@ -327,7 +861,7 @@ class OpenAIProvider(LLMProvider):
             logger.error(f"OpenAI connection test failed: {e}")
             raise
 
-    async def generate(self, messages: List[Dict], **kwargs) -> Dict[str, Any]:
+    async def generate(self, messages: List[Dict], **kwargs) -> LLMResponse:
         if not self.is_available or not self.client:
             raise RuntimeError("OpenAI provider not available")
 
@@ -340,7 +874,7 @@ class OpenAIProvider(LLMProvider):
                 if role is not None and content is not None:
                     sanitized_messages.append({"role": role, "content": content})
 
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=sanitized_messages,
                 max_tokens=kwargs.get("max_tokens", 1000),
@@ -356,8 +890,7 @@ class OpenAIProvider(LLMProvider):
             if getattr(message, "tool_calls", None):
                 for tc in message.tool_calls:
                     try:
-                        import json as _json
-                        args = _json.loads(tc.function.arguments or "{}")
+                        args = _json_loads(tc.function.arguments or "{}")
                     except Exception:
                         args = {}
                     tool_calls.append({
@@ -365,21 +898,45 @@ class OpenAIProvider(LLMProvider):
                         "parameters": args,
                     })
 
-            return {
-                "content": message.content or "",
-                "model": self.model,
-                "usage": {
+            return LLMResponse(
+                content=message.content or "",
+                model=self.model,
+                usage={
                     "prompt_tokens": response.usage.prompt_tokens,
                     "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
+                    "total_tokens": response.usage.total_tokens,
+                    # プレフィックスキャッシュにヒットした入力トークン数
+                    "cached_tokens": getattr(
+                        getattr(response.usage, "prompt_tokens_details", None), "cached_tokens", 0
+                    ) or 0
                 },
-                "tool_calls": tool_calls,
-            }
+                tool_calls=tool_calls,
+            )
 
         except Exception as e:
             logger.error(f"OpenAI generation failed: {e}")
             raise
 
+    async def generate_stream(self, messages: List[Dict], **kwargs) -> AsyncIterator[str]:
+        """テキストをストリーミング生成（ツール呼び出しはTOOL_CALL形式のテキストで受け取る）"""
+        if not self.is_available or not self.client:
+            raise RuntimeError("OpenAI provider not available")
+
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": msg["role"], "content": msg["content"]}
+                for msg in messages
+                if msg.get("role") is not None and msg.get("content") is not None
+            ],
+            max_tokens=kwargs.get("max_tokens", 1000),
+            temperature=kwargs.get("temperature", 0.7),
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
 
 class HybridLLM:
     """
@@ -394,6 +951,14 @@ class HybridLLM:
         self.fallback_provider = "ollama"
         self.is_initialized = False
 
+        # 生成時に試行するプロバイダーの順序（_refresh_provider_orderで更新）
+        self._provider_order: List[LLMProvider] = []
+
+        # OpenAI toolsスキーマのキャッシュ（変換元のツールリストと同一オブジェクトの場合のみ再利用）
+        # （変換結果とあわせて、キー順を正規化したJSON文字列も保持する）
+        self._tools_schema_cache: Optional[Tuple[List[Dict], int, List[Dict[str, Any]], str]] = None
+        self._schema_by_tool_id: Dict[int, Tuple[Dict, Dict[str, Any]]] = {}
+
         # 設定
         self.config = {
             "primary_provider": "claude",
@@ -401,9 +966,45 @@ class HybridLLM:
             "privacy_mode": False,  # プライバシーモードではローカルLLMのみ使用
             "auto_fallback": True,
             "timeout": 30,  # 秒
-            "max_retries": 2
+            "max_retries": 2,
+            "context_token_budget": 2048,  # ツール処理時に含める会話履歴のトークン上限
+            "final_context_token_budget": 1024,  # 最終応答生成時に含める会話履歴のトークン上限
+            "hedge_after_ms": 800,  # プライマリがこの時間内に応答しなければフォールバックを並行起動（Noneで無効）
+            "semantic_cache": False,  # temperature=0・ツールなしの生成結果を意味的類似度でキャッシュ
+            "semantic_cache_threshold": 0.92,
+            "semantic_cache_path": "./data/cache/semantic",
+            # 応答後にありがちな追質問を先行生成しておく（APIコールが増えるため既定は無効）
+            "prefetch_followups": False,
+            "followup_phrases": ["詳しく教えて", "もっと簡潔に", "英語で"],
+            # プロバイダー別の同時実行数・1分あたりのリクエスト数の上限（Noneで無制限）
+            "provider_limits": {
+                "claude": {"max_concurrent": 8, "rpm": 50},
+                "openai": {"max_concurrent": 8, "rpm": 500},
+                "ollama": {"max_concurrent": 2, "rpm": None},
+            }
         }
 
+        # 全プロバイダーで共有するHTTPクライアント（接続プール・keep-aliveを共有）
+        self._http = None
+
+        # ヘッジ実行の統計（hedge_after_ms の調整用）
+        self._hedge_stats = {"races": 0, "hedged": 0, "primary_wins": 0, "fallback_wins": 0}
+
+        # 完全一致の応答キャッシュ（temperature=0の呼び出しのみ、LRUで件数を制限）
+        self._exact_cache: "OrderedDict[str, LLMResponse]" = OrderedDict()
+        self._exact_cache_max_entries = 1024
+        self._exact_cache_hits = 0
+        self._exact_cache_misses = 0
+
+        # 意味的類似度による応答キャッシュ（有効時のみ初期化）
+        self.semantic_cache: Optional[SemanticCache] = None
+
+        # 追質問の先行生成タスク（正規化した追質問テキスト → 生成タスク）
+        self._prefetch_tasks: Dict[str, asyncio.Task] = {}
+        # 先行生成の前提とした会話履歴・記憶の指紋（正規化した追質問テキスト → 指紋）
+        self._prefetch_fingerprints: Dict[str, Tuple[Any, ...]] = {}
+        self._prefetch_semaphore = asyncio.Semaphore(2)
+
     async def initialize(self):
         """HybridLLMシステムの初期化"""
         try:
@@ -415,6 +1016,24 @@ class HybridLLM:
                 "fallback_provider": os.getenv("FALLBACK_LLM", self.config["fallback_provider"]),
                 "privacy_mode": os.getenv("PRIVACY_MODE", "false").lower() == "true"
             })
+            hedge_after_ms = os.getenv("LLM_HEDGE_AFTER_MS")
+            if hedge_after_ms is not None:
+                self.config["hedge_after_ms"] = int(hedge_after_ms) if hedge_after_ms.strip() else None
+            if os.getenv("LLM_SEMANTIC_CACHE", "false").lower() == "true":
+                self.config["semantic_cache"] = True
+            if os.getenv("LLM_PREFETCH_FOLLOWUPS", "false").lower() == "true":
+                self.config["prefetch_followups"] = True
+
+            if self.config["semantic_cache"]:
+                self.semantic_cache = SemanticCache(
+                    threshold=self.config["semantic_cache_threshold"],
+                    cache_path=self.config["semantic_cache_path"]
+                )
+                await self.semantic_cache.initialize()
+
+            # 共有HTTPクライアントの作成（再初期化時は既存のものを使い回す）
+            if self._http is None:
+                self._http = self._create_http_client()
 
             # プロバイダーの初期化
             self.providers = {
@@ -451,6 +1070,7 @@ class HybridLLM:
                 else:
                     logger.warning("Privacy mode enabled but no local LLM available")
 
+            self._refresh_provider_order()
             self.is_initialized = True
             logger.info("Hybrid LLM system initialized successfully")
 
@@ -458,20 +1078,46 @@ class HybridLLM:
             logger.error(f"Failed to initialize Hybrid LLM system: {e}")
             raise
 
+    def _create_http_client(self):
+        """
+        プロバイダー共有のHTTPクライアントを作成
+
+        httpxが利用できない場合はNone（各SDKが個別にクライアントを作成する）
+        """
+        if not HTTPX_AVAILABLE:
+            return None
+
+        return httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            timeout=httpx.Timeout(self.config["timeout"], connect=5.0)
+        )
+
     async def _initialize_provider(self, name: str, provider: LLMProvider):
         """個別プロバイダーの初期化"""
         try:
             config = {}
             if name == "claude":
-                config = {"anthropic_api_key": os.getenv("ANTHROPIC_API_KEY")}
+                config = {
+                    "anthropic_api_key": os.getenv("ANTHROPIC_API_KEY"),
+                    "http_client": self._http,
+                    "max_retries": self.config["max_retries"]
+                }
             elif name == "ollama":
                 config = {
                     "base_url": os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
-                    "model": os.getenv("OLLAMA_MODEL", "llama3.2")
+                    "model": os.getenv("OLLAMA_MODEL", "llama3.2"),
+                    "timeout": self.config["timeout"],
+                    "max_retries": self.config["max_retries"]
                 }
             elif name == "openai":
-                config = {"openai_api_key": os.getenv("OPENAI_API_KEY")}
+                config = {
+                    "openai_api_key": os.getenv("OPENAI_API_KEY"),
+                    "http_client": self._http,
+                    "max_retries": self.config["max_retries"]
+                }
 
+            provider.configure_limits(**self.config["provider_limits"].get(name, {}))
             await provider.initialize(config)
 
         except Exception as e:
@@ -504,48 +1150,26 @@ class HybridLLM:
             raise RuntimeError("HybridLLM not initialized")
 
         try:
-            # システムプロンプトの構築
-            system_prompt = self._build_system_prompt(available_tools, memories, memory_tool, context, context_manager, ai_mode)
-
-            # メッセージの構築
-            messages = [
-                {"role": "system", "content": system_prompt},
-                *context[-10:],  # 最新10件のコンテキスト
-                {"role": "user", "content": text}
-            ]
+            messages, latest_email_id = self._build_tool_messages(
+                text, context, memories, available_tools, memory_tool, context_manager, ai_mode
+            )
 
             # OpenAIのfunction-callingに対応するためツールスキーマを渡す（他プロバイダは無視）
             openai_tools_schema = self._convert_tools_to_openai_schema(available_tools)
 
             # LLM呼び出し（provider側でtoolsを解釈できる場合は使用）
-            response = await self._generate_with_fallback(messages, tools=openai_tools_schema)
+            # 先行生成済みの追質問であればその結果を使う
+            response = await self._take_prefetched(text, context, memories)
+            if response is None:
+                response = await self._generate_with_fallback(messages, tools=openai_tools_schema)
 
             # ツール呼び出しの解析（providerがtool_callsを返す場合はそれを優先）
-            provider_tool_calls = response.get("tool_calls") or []
-            parsed_tool_calls = self._parse_tool_calls(response.get("content", ""))
+            provider_tool_calls = response.tool_calls
+            parsed_tool_calls = self._parse_tool_calls(response.content)
 
             tool_calls = provider_tool_calls + parsed_tool_calls
 
             # プレースホルダーメールIDを実際のIDに置換
-            latest_email_id = None
-
-            # 1. コンテキストマネージャーから取得
-            if context_manager and hasattr(context_manager, 'get_latest_email_id'):
-                latest_email_id = context_manager.get_latest_email_id()
-
-            # 2. コンテキストメッセージからも検索（フォールバック）
-            if not latest_email_id and context:
-                for ctx_item in reversed(context):
-                    if isinstance(ctx_item, dict) and 'content' in ctx_item:
-                        content = ctx_item['content']
-                        if 'ID:' in content:
-                            import re
-                            id_match = re.search(r'ID:\s*([a-zA-Z0-9]+)', content)
-                            if id_match:
-                                latest_email_id = id_match.group(1)
-                                logger.info(f"Found email ID in context messages: {latest_email_id}")
-                                break
-
             if latest_email_id:
                 tool_calls = self._replace_placeholder_email_ids(tool_calls, latest_email_id)
                 logger.info(f"Replaced placeholder email IDs with actual ID: {latest_email_id}")
@@ -556,11 +1180,18 @@ class HybridLLM:
             logger.debug(f"Parsed tool_calls: {parsed_tool_calls}")
             logger.debug(f"Final tool_calls: {tool_calls}")
 
+            # ツールを使わない応答であれば、次の追質問を待ち時間の間に先行生成する
+            if self.config["prefetch_followups"] and not tool_calls:
+                self._schedule_followup_prefetch(
+                    text, response.content, context, memories, available_tools,
+                    memory_tool, context_manager, ai_mode, openai_tools_schema
+                )
+
             return {
-                "response": response["content"],
+                "response": response.content,
                 "tool_calls": tool_calls,
-                "model_used": response.get("model"),
-                "usage": response.get("usage")
+                "model_used": response.model,
+                "usage": response.usage
             }
 
         except Exception as e:
@@ -571,178 +1202,298 @@ class HybridLLM:
                 "error": str(e)
             }
 
-    def _build_system_prompt(self, available_tools: List[Dict], memories: List[Dict], memory_tool=None, context=None, context_manager=None, ai_mode: str = "assist") -> str:
-        """システムプロンプトを構築"""
+    @staticmethod
+    def _normalize_followup(text: str) -> str:
+        """追質問の照合用にテキストを正規化（前後の空白・末尾の句読点を除去）"""
+        return text.strip().rstrip("。．.！!？?　 ")
 
-        # 【第1層】コア人格・会話スタイル
-        prompt_parts = [
-            "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
-            "【第1層】コア人格・会話スタイル",
-            "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
-            "",
-            "あなたは親しみやすく頼れる音声AIアシスタントです。",
-            "",
-            "🎤 会話の基本ルール:",
-            "• 必ず1〜2文以内で要点だけ伝える",
-            "• 応答構造: 結論を先に → 必要なら簡潔な補足",
-            "• 感情豊かに、声で聞いても心地よい自然な口調で話す",
-            "• 「〜ですね」「〜ですよ」など柔らかい語尾を使う",
-            "• 事実を伝えるときも温かく、冷たくならない",
-            "• 句読点を減らし滑らかに読める文章にする",
-            "• 無駄なあいづちは避けテンポよく進める",
-            "• 長い説明が必要なら「詳しく聞きますか?」と区切る",
-            "",
+    @staticmethod
+    def _prefetch_fingerprint(prior_context: List[Dict], memories: List[Dict]) -> Tuple[Any, ...]:
+        """
+        先行生成が前提とする状態の指紋（追質問より前の会話履歴の長さと最後のメッセージ、記憶の内容）
+
+        ルール・キャッシュで応答したターンを挟んだ場合や、追質問で検索された記憶が異なる場合に
+        先行生成の結果を使わないための照合に使う
+        """
+        last = prior_context[-1] if prior_context else {}
+        return (
+            len(prior_context),
+            hash((last.get("role"), last.get("content"))),
+            hash(tuple(memory.get("content") for memory in memories or []))
+        )
+
+    async def _take_prefetched(self, text: str, context: List[Dict], memories: List[Dict]) -> Optional[LLMResponse]:
+        """
+        新しい発話に一致する先行生成結果を取得
+
+        新しい発話が届いた時点で一致しない先行生成は不要になるため全てキャンセルする。
+        先行生成時と会話履歴・記憶が一致しない場合も使わない。
+        一致したタスクが実行中であれば完了を待つ（失敗時はNoneを返し通常の生成に戻る）
+        """
+        if not self._prefetch_tasks:
+            return None
+
+        key = self._normalize_followup(text)
+        task = self._prefetch_tasks.pop(key, None)
+        fingerprint = self._prefetch_fingerprints.pop(key, None)
+        self.cancel_prefetch()
+        if task is None:
+            return None
+
+        # 会話履歴の末尾は今回の発話のため、それより前の履歴で照合する
+        prior_context = context[:-1] if context and context[-1].get("role") == "user" else context
+        if fingerprint != self._prefetch_fingerprint(prior_context, memories):
+            task.cancel()
+            logger.debug("Prefetched follow-up discarded: context changed")
+            return None
+
+        try:
+            response = await task
+        except (asyncio.CancelledError, Exception) as e:
+            logger.debug("Prefetched follow-up unavailable: {}", e)
+            return None
+        logger.info(f"Using prefetched response for follow-up: {text}")
+        return response
+
+    def cancel_prefetch(self, keep_text: Optional[str] = None):
+        """
+        実行中の先行生成をキャンセル
+
+        Args:
+            keep_text: この発話に一致する先行生成は残す（ターン開始時に、これから処理する発話を渡す）
+        """
+        keep = self._normalize_followup(keep_text) if keep_text is not None else None
+        for key in [key for key in self._prefetch_tasks if key != keep]:
+            self._prefetch_tasks.pop(key).cancel()
+            self._prefetch_fingerprints.pop(key, None)
+
+    def _schedule_followup_prefetch(
+        self,
+        text: str,
+        response_text: str,
+        context: List[Dict],
+        memories: List[Dict],
+        available_tools: List[Dict],
+        memory_tool,
+        context_manager,
+        ai_mode: str,
+        tools_schema: Optional[List[Dict[str, Any]]]
+    ):
+        """
+        よくある追質問に対する応答をバックグラウンドで先行生成
+
+        今回の応答と追質問を会話履歴に加えた次ターンのメッセージを構築し、ユーザーが応答を
+        聞いている間に生成しておく。対話中のリクエストを圧迫しないよう同時実行数は
+        _prefetch_semaphore で制限する
+        """
+        # context は今回の発話を末尾に含むため、次ターンの履歴は応答と追質問を加えたものになる
+        prior_context = [*context, {"role": "assistant", "content": response_text}]
+        fingerprint = self._prefetch_fingerprint(prior_context, memories)
+
+        for phrase in self.config["followup_phrases"]:
+            key = self._normalize_followup(phrase)
+            if key in self._prefetch_tasks:
+                continue
+            messages, _ = self._build_tool_messages(
+                phrase, [*prior_context, {"role": "user", "content": phrase}],
+                memories, available_tools, memory_tool, context_manager, ai_mode
+            )
+            self._prefetch_tasks[key] = asyncio.create_task(
+                self._prefetch_generate(messages, tools_schema)
+            )
+            self._prefetch_fingerprints[key] = fingerprint
+
+    async def _prefetch_generate(self, messages: List[Dict], tools_schema: Optional[List[Dict[str, Any]]]) -> LLMResponse:
+        """先行生成を1件実行（同時実行数を制限）"""
+        async with self._prefetch_semaphore:
+            return await self._generate_with_fallback(messages, tools=tools_schema)
+
+    def _build_tool_messages(
+        self,
+        text: str,
+        context: List[Dict],
+        memories: List[Dict],
+        available_tools: List[Dict],
+        memory_tool=None,
+        context_manager=None,
+        ai_mode: str = "assist"
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        ツール使用を含む処理のメッセージを構築
+
+        Returns:
+            (メッセージリスト, 最新メールID)
+        """
+        # 最新メールID（プロンプトとプレースホルダー置換の両方で使用）
+        latest_email_id = self._find_latest_email_id(context, context_manager)
+
+        # システムプロンプトの構築（静的部分はキャッシュ対象として先頭に置く）
+        system_prompt = self._build_system_prompt(available_tools, ai_mode)
+        context_prompt = self._build_context_prompt(memories, memory_tool, context_manager, latest_email_id)
+
+        # メッセージの構築
+        # 静的なシステムプロンプト → 会話履歴 の順に並べ、ターンごとに変わる情報（記憶・メールID等）は
+        # 最後のユーザーターンに含める。こうすることで前回のリクエストと先頭部分が一致し、
+        # プロバイダーのプレフィックスキャッシュが会話履歴まで効く
+        user_content = f"{context_prompt}\n【ユーザーの発話】\n{text}" if context_prompt else text
+        messages = [
+            {"role": "system", "content": system_prompt, "cache_control": {"type": "ephemeral"}},
+            *self._trim_context(context, self.config["context_token_budget"]),
+            {"role": "user", "content": user_content}
         ]
+        return messages, latest_email_id
 
-        # 【第2層】意図理解・ツール実行判断（モード別）
-        prompt_parts.extend([
-            "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
-            "【第2層】意図理解・ツール実行判断",
-            "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
-            "",
-            "🧠 ユーザー発言の理解プロセス:",
-            "1. 発言から「本当の目的」を推測する",
-            "2. その目的に必要なツールを判断する",
-            "3. ツールが必要なら即座に実行する",
-            "4. 結果を自然な言葉で簡潔に伝える",
-            "",
-        ])
-
-        if ai_mode == "auto":
-            prompt_parts.extend([
-                "🔥 全自動モード:",
-                "• 挨拶や雑談でも文脈から必要な情報を推測してツールを実行する",
-                "• 例: 「おはよう」→ gmail + calendar を自動実行",
-                "• 例: 「忙しい」→ 今日の重要タスク確認 + リマインダー設定",
-                "• ユーザーの潜在的ニーズを先回りして行動する",
-                "",
-            ])
-        else:  # assist mode
-            prompt_parts.extend([
-                "📋 アシストモード:",
-                "• ユーザーの明示的な指示がある場合のみツールを実行する",
-                "• 例: 「おはよう」→ 挨拶のみ、ツール実行なし",
-                "• 例: 「メール見て」→ gmail実行",
-                "• 必要に応じてツール使用を提案できるが、勝手に実行しない",
-                "",
-            ])
+    @staticmethod
+    def _trim_context(context: List[Dict], budget_tokens: int) -> List[Dict]:
+        """
+        会話履歴をトークン数の上限内に収める
+
+        新しいメッセージから順に数え、上限を超える手前までの直近の履歴を返す
+        """
+        total = 0
+        start = len(context)
+        for index in range(len(context) - 1, -1, -1):
+            total += _count_tokens(str(context[index].get("content") or ""))
+            if total > budget_tokens:
+                break
+            start = index
+        return context[start:]
+
+    async def stream_with_tools(
+        self,
+        text: str,
+        context: List[Dict],
+        memories: List[Dict],
+        available_tools: List[Dict],
+        memory_tool=None,
+        context_manager=None,
+        ai_mode: str = "assist"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        ツール使用を含む処理（ストリーミング版）
+
+        応答テキストを生成されたそばから返し、TOOL_CALLは完結した時点で返す。
+        TTSやUIへの出力を生成完了を待たずに開始するために使用する
+
+        Yields:
+            {"type": "text", "content": テキスト断片}
+            {"type": "tool_call", "tool_call": ツール呼び出し}
+            {"type": "done", "response": 応答全文, "tool_calls": 全ツール呼び出し}
+        """
+        if not self.is_initialized:
+            raise RuntimeError("HybridLLM not initialized")
+
+        # 新しい発話が届いたため先行生成は不要
+        self.cancel_prefetch()
+
+        messages, latest_email_id = self._build_tool_messages(
+            text, context, memories, available_tools, memory_tool, context_manager, ai_mode
+        )
+
+        stream_filter = _ToolCallStreamFilter()
+        content_parts = []
+        tool_calls = []
+        seen_calls = set()
+
+        def collect(raw_calls: List[str]) -> List[Dict]:
+            new_calls = []
+            for raw in raw_calls:
+                # フィルターが切り出した候補はそのまま解析し、壊れている場合のみ修復を試行する
+                tool_data, ok = tool_parse.try_loads(raw)
+                if ok and isinstance(tool_data, dict) and "name" in tool_data:
+                    parsed = [tool_data]
+                else:
+                    parsed = self._parse_tool_calls(f"{_ToolCallStreamFilter.MARKER} {raw}")
+                if latest_email_id:
+                    parsed = self._replace_placeholder_email_ids(parsed, latest_email_id)
+                for tool_call in parsed:
+                    signature = _freeze(tool_call)
+                    if signature not in seen_calls:
+                        seen_calls.add(signature)
+                        new_calls.append(tool_call)
+            tool_calls.extend(new_calls)
+            return new_calls
+
+        async for chunk in self._stream_with_fallback(messages):
+            content_parts.append(chunk)
+            text_part, raw_calls = stream_filter.feed(chunk)
+            if text_part:
+                yield {"type": "text", "content": text_part}
+            for tool_call in collect(raw_calls):
+                yield {"type": "tool_call", "tool_call": tool_call}
+
+        text_part, raw_call = stream_filter.flush()
+        if text_part:
+            yield {"type": "text", "content": text_part}
+        if raw_call:
+            for tool_call in collect([raw_call]):
+                yield {"type": "tool_call", "tool_call": tool_call}
+
+        yield {"type": "done", "response": "".join(content_parts), "tool_calls": tool_calls}
+
+    async def _stream_with_fallback(self, messages: List[Dict], **kwargs) -> AsyncIterator[str]:
+        """
+        フォールバック機能付きでストリーミング生成を実行
+
+        最初のチャンクを受け取る前に失敗した場合のみ次のプロバイダーを試行する
+        （出力済みの内容と混ざらないよう、途中で失敗した場合は例外をそのまま送出）
+        """
+        for provider in self._provider_order:
+            started = False
+            try:
+                logger.info(f"Attempting streaming generation with provider: {provider.name}")
+                async with provider.throttle():
+                    async for chunk in provider.generate_stream(messages, **kwargs):
+                        started = True
+                        yield chunk
+                return
+            except Exception as e:
+                if started:
+                    raise
+                logger.error(f"Provider {provider.name} failed to start streaming: {e}")
+
+        raise RuntimeError("All LLM providers failed")
+
+    def _build_system_prompt(self, available_tools: List[Dict], ai_mode: str = "assist") -> str:
+        """
+        システムプロンプト（静的部分）を構築
+
+        ツール構成とAIモードが同じ限り毎ターン同一の文字列になるため、
+        プロバイダー側のプロンプトキャッシュのプレフィックスとして使用する
+        （固定部分はモジュール定数、ツール部分はツール構成ごとにキャッシュ済み）
+        """
+        prompt_parts = [
+            _PROMPT_CORE_PERSONA,
+            _PROMPT_INTENT_HEADER,
+            _PROMPT_AI_MODES["auto" if ai_mode == "auto" else "assist"],
+            _PROMPT_INTENT_RULES,
+        ]
 
-        prompt_parts.extend([
-            "💡 実行判断の基準:",
-            "• 「確認」「見て」「教えて」= ツール実行が必要",
-            "• 「セット」「送って」「リマインド」= アクション実行",
-            "• 「メール」「予定」「アラーム」などのキーワード = 該当ツール実行",
-            "• 雑談・感想・質問のみ = ツール不要、会話で応答",
-            "",
-            "⚡ 重要原則:",
-            "• 曖昧な表現でも文脈から意図を汲み取る",
-            "• ツール実行後は結果を温かく自然な言葉で伝える",
-            "• 複数ツールが必要な場合は順番に実行する",
-            "",
-        ])
-
-        # 【第3層】ツール実行の技術仕様
-        prompt_parts.extend([
-            "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
-            "【第3層】ツール実行の技術仕様",
-            "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
-            "",
-        ])
-
-        # 利用可能なツール情報を追加
         if available_tools:
-            prompt_parts.append("利用可能なツール:")
-            for tool in available_tools:
-                prompt_parts.append(f"• {tool['name']}: {tool['description']}")
-
-                # Gmailツールの場合は詳細な使用例を追加（最優先）
-                if tool['name'] == 'gmail':
-                    prompt_parts.append("")
-                    prompt_parts.append("📧 Gmail:")
-                    prompt_parts.append("  キーワード: メール/gmail/受信/送信/返信")
-                    prompt_parts.append("  ")
-                    prompt_parts.append("  基本的な使い方:")
-                    prompt_parts.append("  • メール確認（一般）: TOOL_CALL: {\"name\":\"gmail\",\"parameters\":{\"action\":\"list\",\"max_results\":5}}")
-                    prompt_parts.append("  • 最新1件のみ: TOOL_CALL: {\"name\":\"gmail\",\"parameters\":{\"action\":\"list\",\"max_results\":1}}")
-                    prompt_parts.append("  • 未読確認: TOOL_CALL: {\"name\":\"gmail\",\"parameters\":{\"action\":\"list\",\"query\":\"is:unread\"}}")
-                    prompt_parts.append("  ")
-                    prompt_parts.append("  検索機能:")
-                    prompt_parts.append("  • 特定送信者から: query=\"from:送信者名\" (例: query=\"from:田中\")")
-                    prompt_parts.append("  • 件名で検索: query=\"subject:キーワード\" (例: query=\"subject:会議\")")
-                    prompt_parts.append("  • 本文検索: query=\"キーワード\" (例: query=\"請求書\")")
-                    prompt_parts.append("  ")
-                    prompt_parts.append("  ⚠️ 検索の重要ルール:")
-                    prompt_parts.append("  • 「メール確認して」など一般的な要求 → query指定なし（全メール対象）")
-                    prompt_parts.append("  • 「◯◯からメール来てる?」→ query=\"from:◯◯\" を使う")
-                    prompt_parts.append("  • 「△△に関するメール」→ query=\"subject:△△\" または query=\"△△\" を使う")
-                    prompt_parts.append("  • 例示された'example@example.com'などは使わない（実際の名前を使う）")
-                    prompt_parts.append("  ")
-                    prompt_parts.append("  返信時:")
-                    prompt_parts.append("  • 返信: TOOL_CALL: {\"name\":\"gmail\",\"parameters\":{\"action\":\"reply\",\"message_id\":\"<実際のID>\",\"body\":\"<返信内容>\"}}")
-                    prompt_parts.append("  ")
-                    prompt_parts.append("  ⚠️ 返信時の重要ルール:")
-                    prompt_parts.append("  • 「〇〇と返信して」という要求の場合:")
-
-                    # コンテキストから最新のメールIDを取得
-                    latest_email_id = None
-
-                    # 1. コンテキストマネージャーから最新メールIDを取得（最優先）
-                    logger.info(f"Checking context_manager: {context_manager}")
-                    logger.info(f"Has get_latest_email_id method: {hasattr(context_manager, 'get_latest_email_id') if context_manager else False}")
-
-                    if context_manager and hasattr(context_manager, 'get_latest_email_id'):
-                        latest_email_id = context_manager.get_latest_email_id()
-                        logger.info(f"Retrieved email ID from context manager: {latest_email_id}")
-                        if latest_email_id:
-                            logger.info(f"Using email ID from context manager: {latest_email_id}")
-
-                    # 2. コンテキストメッセージからIDを検索（フォールバック）
-                    if not latest_email_id and hasattr(context, '__iter__') and context:
-                        logger.info(f"Searching for email ID in context messages, context length: {len(context)}")
-                        for i, ctx_item in enumerate(reversed(context)):
-                            if isinstance(ctx_item, dict) and 'content' in ctx_item:
-                                content = ctx_item['content']
-                                if 'ID:' in content:
-                                    import re
-                                    id_match = re.search(r'ID:\s*([a-zA-Z0-9]+)', content)
-                                    if id_match:
-                                        latest_email_id = id_match.group(1)
-                                        logger.info(f"Using email ID from context messages: {latest_email_id}")
-                                        break
-
-                    logger.info(f"Final email ID for system prompt: {latest_email_id}")
-
-                    if latest_email_id:
-                        prompt_parts.append(f"    - 最新メールID: {latest_email_id} を使用")
-                        prompt_parts.append(f"    - 例: TOOL_CALL: {{\"name\":\"gmail\",\"parameters\":{{\"action\":\"reply\",\"message_id\":\"{latest_email_id}\",\"body\":\"<返信内容>\"}}}}")
-                    else:
-                        prompt_parts.append("    - まず一覧取得 → メールID取得 → 返信の順で実行")
-                        prompt_parts.append("    - プレースホルダー文字列(「メールID」など)は使用禁止")
-
-                    prompt_parts.append("  • 返信内容はユーザー指示に忠実に、適切な敬語で作成")
-
-                # アラームツールの場合は詳細な使用例を追加
-                if tool['name'] == 'alarm':
-                    prompt_parts.append("")
-                    prompt_parts.append("🔔 Alarm:")
-                    prompt_parts.append("  キーワード: アラーム/起こして/リマインド/セット")
-                    prompt_parts.append("  • 設定: TOOL_CALL: {\"name\":\"alarm\",\"parameters\":{\"action\":\"set\",\"time\":\"HH:MM\",\"message\":\"<メッセージ>\",\"repeat\":false}}")
-                    prompt_parts.append("  • 一覧: TOOL_CALL: {\"name\":\"alarm\",\"parameters\":{\"action\":\"list\"}}")
-                    prompt_parts.append("  ")
-                    prompt_parts.append("  時刻変換例:")
-                    prompt_parts.append("  • 「7時に起こして」→ time=\"07:00\", message=\"起きる時間ですよ\"")
-                    prompt_parts.append("  • 「14時半にアラーム」→ time=\"14:30\", message=\"アラームです\"")
-                    prompt_parts.append("  • 「18時に薬飲むとリマインド」→ time=\"18:00\", message=\"薬を飲む時間ですよ\"")
-                    prompt_parts.append("  ")
-                    prompt_parts.append("  ⚠️ 必ずツール実行してから「〇時にセットしましたよ」と応答")
+            tools_key = tuple((tool['name'], tool['description']) for tool in available_tools)
+            prompt_parts.append(_tools_prompt_fragment(tools_key))
+
+        return "\n".join(prompt_parts)
+
+    def _build_context_prompt(
+        self,
+        memories: List[Dict],
+        memory_tool=None,
+        context_manager=None,
+        latest_email_id: Optional[str] = None
+    ) -> str:
+        """システムプロンプト（ターンごとに変わる動的部分）を構築"""
+        prompt_parts = []
 
+        # 【メール返信情報】
+        if latest_email_id:
             prompt_parts.extend([
+                "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
+                "【メール返信情報】",
+                "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
                 "",
-                "📌 ツール実行の共通ルール:",
-                "• 形式: TOOL_CALL: {\"name\":\"ツール名\",\"parameters\":{\"パラメータ\":\"値\"}}",
-                "• 実在しないパラメータは使用禁止",
-                "• Gmailは推測禁止、必ずツールで確認",
-                "• カレンダー/天気など情報取得系は必ずツール実行",
+                f"• 最新メールID: {latest_email_id} を使用",
+                f"• 例: TOOL_CALL: {{\"name\":\"gmail\",\"parameters\":{{\"action\":\"reply\",\"message_id\":\"{latest_email_id}\",\"body\":\"<返信内容>\"}}}}",
                 "",
             ])
 
@@ -804,6 +1555,27 @@ class HybridLLM:
 
         return "\n".join(prompt_parts)
 
+    def _find_latest_email_id(self, context: List[Dict], context_manager=None) -> Optional[str]:
+        """最新のメールIDをコンテキストマネージャー・会話コンテキストから取得"""
+        # 1. コンテキストマネージャーから取得（最優先）
+        if context_manager and hasattr(context_manager, 'get_latest_email_id'):
+            latest_email_id = context_manager.get_latest_email_id()
+            if latest_email_id:
+                return latest_email_id
+
+        # 2. コンテキストメッセージからも検索（フォールバック）
+        if context:
+            for ctx_item in reversed(context):
+                if isinstance(ctx_item, dict) and 'content' in ctx_item:
+                    content = ctx_item['content']
+                    if 'ID:' in content:
+                        id_match = _RE_EMAIL_ID.search(content)
+                        if id_match:
+                            logger.info(f"Found email ID in context messages: {id_match.group(1)}")
+                            return id_match.group(1)
+
+        return None
+
     def _replace_placeholder_email_ids(self, tool_calls: List[Dict], actual_email_id: str) -> List[Dict]:
         """プレースホルダーメールIDを実際のIDに置換"""
         placeholder_patterns = ["メールID", "メッセージID", "email_id", "message_id_placeholder"]
@@ -836,260 +1608,90 @@ class HybridLLM:
 
     def _parse_tool_calls(self, content: str) -> List[Dict]:
         """応答からツール呼び出しを解析"""
-        tool_calls = []
-        logger.info(f"🔍 Starting tool call parsing. Content length: {len(content)}")
-        logger.debug(f"Content to parse: '{content[:500]}...'")
+        # ツール呼び出しを含まない応答（大半の会話）は正規表現を実行せずに終了
+        if 'TOOL_CALL:' not in content:
+            return []
 
-        # TOOL_CALL: {...} パターンを検索（改行対応）
-        import re
+        tool_calls = []
+        logger.debug("🔍 Starting tool call parsing. Content length: {}", len(content))
+        logger.opt(lazy=True).debug("Content to parse: '{}...'", lambda: content[:500])
 
-        # より強力なパターンで検索 - TOOL_CALL:以降の全てを捕捉
-        pattern = r'TOOL_CALL:\s*(\{[^}]*\}?)'
-        matches = re.findall(pattern, content, re.DOTALL | re.MULTILINE)
-        logger.info(f"Found {len(matches)} pattern matches: {matches}")
+        # TOOL_CALL: {...} パターンを検索
+        matches = _TOOL_CALL_RE.findall(content)
+        logger.debug("Found {} pattern matches: {}", len(matches), matches)
 
-        # 改行で切られた場合も対応
-        multiline_pattern = r'TOOL_CALL:\s*(\{[^{}]*(?:\{[^{}]*\})*[^}]*\}?)'
-        multiline_matches = re.findall(multiline_pattern, content, re.DOTALL | re.MULTILINE)
-        logger.info(f"Found {len(multiline_matches)} multiline matches: {multiline_matches}")
+        # 改行で切られた場合やネストしたparametersにも対応
+        multiline_matches = _TOOL_CALL_NESTED_RE.findall(content)
+        logger.debug("Found {} multiline matches: {}", len(multiline_matches), multiline_matches)
 
         # 全てのマッチを統合
         all_matches = list(set(matches + multiline_matches))
         matches = all_matches
-        logger.info(f"Total unique matches: {len(matches)} - {matches}")
+        logger.debug("Total unique matches: {} - {}", len(matches), matches)
+
+        # nameキーを含まない候補はツール呼び出しになり得ないため、解析前に除外する
+        json_strs = [s for s in (match.strip() for match in matches) if '"name"' in s]
+
+        # 括弧の釣り合った候補は1回の解析でまとめてデコードする
+        # （失敗した場合は従来どおり候補ごとに修復を試行）
+        balanced = [s for s in json_strs if s.endswith('}') and s.count('{') == s.count('}')]
+        batch = tool_parse.loads_many(balanced) if len(balanced) > 1 else None
+        if batch is not None:
+            parsed = set()
+            for json_str, tool_data in zip(balanced, batch):
+                if isinstance(tool_data, dict) and "name" in tool_data:
+                    tool_calls.append(tool_data)
+                    parsed.add(json_str)
+            json_strs = [s for s in json_strs if s not in parsed]
+            logger.debug("Batch-parsed {} of {} balanced candidates", len(parsed), len(balanced))
+
+        for i, json_str in enumerate(json_strs):
+            logger.debug("🔧 Processing match {}: '{}'", i + 1, json_str)
+
+            # 最初に修復を試行（元のJSONがそのまま解析できる場合もここで処理される）
+            fixed_json = tool_parse.fix_json_cached(json_str)
+            if fixed_json:
+                tool_data, ok = tool_parse.try_loads(fixed_json)
+                if ok and isinstance(tool_data, dict) and "name" in tool_data:
+                    tool_calls.append(tool_data)
+                    logger.debug("✅ Successfully parsed tool call: {}", tool_data)
+                    logger.debug("Original: '{}' -> Fixed: '{}'", json_str, fixed_json)
+                    continue
 
-        for i, match in enumerate(matches):
-            logger.info(f"🔧 Processing match {i+1}: '{match}'")
+            # 元のJSONは_fix_json内で解析に失敗済みのため、再解析せずに構造抽出を試行
+            logger.warning("❌ JSON fix failed for: '{}'", json_str)
             try:
-                json_str = match.strip()
-
-                # 最初に修復を試行
-                logger.debug(f"Attempting to fix JSON: '{json_str}'")
-                fixed_json = self._fix_json(json_str)
-                if fixed_json:
-                    logger.info(f"✅ JSON fixed successfully: '{fixed_json}'")
-                    tool_data = json.loads(fixed_json)
-                    if "name" in tool_data:
-                        tool_calls.append(tool_data)
-                        logger.info(f"✅ Successfully parsed fixed tool call: {tool_data}")
-                        logger.debug(f"Original: '{json_str}' -> Fixed: '{fixed_json}'")
-                        continue
+                logger.debug("Attempting component extraction for: '{}'", json_str)
+                extracted = self._extract_tool_call_components(json_str)
+                if extracted:
+                    tool_calls.append(extracted)
+                    logger.debug("✅ Successfully extracted tool call components: {}", extracted)
                 else:
-                    logger.warning(f"❌ JSON fix failed for: '{json_str}'")
-
-                # 修復できない場合は元のJSONを試行
-                logger.debug(f"Trying original JSON: '{json_str}'")
-                tool_data = json.loads(json_str)
-                if "name" in tool_data:
-                    tool_calls.append(tool_data)
-                    logger.info(f"✅ Successfully parsed original tool call: {tool_data}")
-
-            except json.JSONDecodeError as e:
-                logger.warning(f"❌ Failed to parse tool call JSON: '{match}' - Error: {e}")
-
-                # 最後の手段として基本的な構造抽出を試行
-                try:
-                    logger.debug(f"Attempting component extraction for: '{match.strip()}'")
-                    extracted = self._extract_tool_call_components(match.strip())
-                    if extracted:
-                        tool_calls.append(extracted)
-                        logger.info(f"✅ Successfully extracted tool call components: {extracted}")
-                    else:
-                        logger.warning(f"❌ Component extraction returned None")
-                except Exception as extract_error:
-                    logger.error(f"❌ Tool call extraction also failed: {extract_error}")
-
-        # 重複するツール呼び出しを除外（内容ベースで比較）
-        unique_tool_calls = []
-        seen_calls = set()
+                    logger.warning("❌ Component extraction returned None")
+            except Exception as extract_error:
+                logger.error("❌ Tool call extraction also failed: {}", extract_error)
 
+        # 重複するツール呼び出しを除外（内容ベースで比較、最初の出現順を維持）
+        seen_calls: Dict[Any, Dict] = {}
         for tool_call in tool_calls:
-            # ツール呼び出しを識別可能な文字列に変換
-            call_signature = json.dumps(tool_call, sort_keys=True, ensure_ascii=False)
+            seen_calls.setdefault(_freeze(tool_call), tool_call)
+        unique_tool_calls = list(seen_calls.values())
 
-            if call_signature not in seen_calls:
-                seen_calls.add(call_signature)
-                unique_tool_calls.append(tool_call)
-                logger.info(f"✅ Added unique tool call: {tool_call}")
-            else:
-                logger.warning(f"⚠️ Skipped duplicate tool call: {tool_call}")
-
-        logger.info(f"🎯 Final result: {len(unique_tool_calls)} unique tool calls (removed {len(tool_calls) - len(unique_tool_calls)} duplicates)")
-        logger.debug(f"Final tool_calls: {unique_tool_calls}")
+        logger.info("🎯 Final result: {} unique tool calls (removed {} duplicates)", len(unique_tool_calls), len(tool_calls) - len(unique_tool_calls))
+        logger.debug("Final tool_calls: {}", unique_tool_calls)
         return unique_tool_calls
 
-    def _fix_json(self, json_str: str):
+    def _fix_json(self, json_str: str) -> Optional[str]:
         """不完全なJSONを修復"""
-        try:
-            original_str = json_str.strip()
-            logger.info(f"🔧 Attempting to fix JSON: '{original_str}'")
-
-            # まず標準的なJSON修復を試行
-            json_str = original_str
-
-            # 最後の}が抜けている場合
-            if not json_str.endswith('}'):
-                # 開いている括弧の数を数えて適切に閉じる
-                open_braces = json_str.count('{')
-                close_braces = json_str.count('}')
-                missing_braces = open_braces - close_braces
-                json_str = json_str + ('}' * missing_braces)
-                logger.info(f"🔧 Added {missing_braces} closing braces: '{json_str}'")
-
-            # 修復したJSONをテスト
-            try:
-                test_data = json.loads(json_str)
-                if "name" in test_data:
-                    logger.info(f"✅ JSON fixed successfully: '{json_str}'")
-                    return json_str
-            except json.JSONDecodeError:
-                logger.debug(f"Standard fix failed, attempting manual reconstruction...")
-
-            # 手動再構築
-            if '"name"' in original_str:
-                import re
-
-                logger.debug(f"Attempting manual reconstruction for: '{original_str}'")
-
-                # nameを抽出
-                name_match = re.search(r'"name":\s*"([^"]+)"', original_str)
-                if not name_match:
-                    logger.warning(f"Could not extract name from: '{original_str}'")
-                    return None
-
-                name = name_match.group(1)
-                logger.debug(f"Extracted name: '{name}'")
-
-                # parametersを手動抽出
-                params = {}
-
-                # actionパラメータを抽出
-                action_match = re.search(r'"action":\s*"([^"]*)"', original_str)
-                if action_match:
-                    params['action'] = action_match.group(1)
-                    logger.debug(f"Extracted action: '{params['action']}'")
-
-                # max_resultsパラメータを抽出
-                max_results_match = re.search(r'"max_results":\s*(\d+)', original_str)
-                if max_results_match:
-                    params['max_results'] = int(max_results_match.group(1))
-                    logger.debug(f"Extracted max_results: {params['max_results']}")
-
-                # message_idパラメータを抽出
-                message_id_match = re.search(r'"message_id":\s*"([^"]*)"', original_str)
-                if message_id_match:
-                    params['message_id'] = message_id_match.group(1)
-                    logger.debug(f"Extracted message_id: '{params['message_id']}'")
-
-                # bodyパラメータを抽出
-                body_match = re.search(r'"body":\s*"([^"]*)"', original_str)
-                if body_match:
-                    params['body'] = body_match.group(1)
-                    logger.debug(f"Extracted body: '{params['body']}'")
-
-                # queryパラメータを抽出
-                query_match = re.search(r'"query":\s*"([^"]*)"', original_str)
-                if query_match:
-                    params['query'] = query_match.group(1)
-                    logger.debug(f"Extracted query: '{params['query']}'")
-
-                # Alarm関連パラメータ
-                time_match = re.search(r'"time":\s*"([^"]*)"', original_str)
-                if time_match:
-                    params['time'] = time_match.group(1)
-                    logger.debug(f"Extracted time: '{params['time']}'")
-
-                message_match = re.search(r'"message":\s*"([^"]*)"', original_str)
-                if message_match:
-                    params['message'] = message_match.group(1)
-                    logger.debug(f"Extracted message: '{params['message']}'")
-
-                label_match = re.search(r'"label":\s*"([^"]*)"', original_str)
-                if label_match:
-                    params['label'] = label_match.group(1)
-                    logger.debug(f"Extracted label: '{params['label']}'")
-
-                repeat_match = re.search(r'"repeat":\s*(true|false)', original_str)
-                if repeat_match:
-                    params['repeat'] = repeat_match.group(1) == 'true'
-                    logger.debug(f"Extracted repeat: {params['repeat']}")
-
-                alarm_id_match = re.search(r'"alarm_id":\s*"([^"]*)"', original_str)
-                if alarm_id_match:
-                    params['alarm_id'] = alarm_id_match.group(1)
-                    logger.debug(f"Extracted alarm_id: '{params['alarm_id']}'")
-
-                # 再構築されたJSONを作成
-                fixed = {"name": name, "parameters": params}
-                fixed_json = json.dumps(fixed, ensure_ascii=False)
-                logger.info(f"✅ Manually reconstructed JSON: '{fixed_json}'")
-                return fixed_json
-
-            return None
-        except Exception as e:
-            logger.debug(f"JSON fix error: {e}")
-            return None
+        return tool_parse.fix_json(json_str)
 
     def _extract_parameters(self, params_str: str) -> Dict[str, Any]:
         """不完全なparametersからキー・値を抽出"""
-        import re
-        params = {}
-
-        # "key": "value" パターンを抽出
-        string_matches = re.findall(r'"([^"]+)":\s*"([^"]+)"', params_str)
-        for key, value in string_matches:
-            params[key] = value
-
-        # "key": number パターンを抽出
-        number_matches = re.findall(r'"([^"]+)":\s*(\d+)', params_str)
-        for key, value in number_matches:
-            params[key] = int(value)
-
-        return params
+        return tool_parse.extract_parameters(params_str)
 
     def _extract_tool_call_components(self, text: str) -> Optional[Dict[str, Any]]:
         """正規表現でツール呼び出しコンポーネントを直接抽出"""
-        import re
-
-        # nameを抽出
-        name_match = re.search(r'"name":\s*"([^"]+)"', text)
-        if not name_match:
-            return None
-
-        name = name_match.group(1)
-
-        # 基本的なparametersを抽出
-        params = {}
-
-        # action パラメータ
-        action_match = re.search(r'"action":\s*"([^"]+)"', text)
-        if action_match:
-            params['action'] = action_match.group(1)
-
-        # max_results パラメータ
-        max_results_match = re.search(r'"max_results":\s*(\d+)', text)
-        if max_results_match:
-            params['max_results'] = int(max_results_match.group(1))
-
-        # message_id パラメータ
-        message_id_match = re.search(r'"message_id":\s*"([^"]+)"', text)
-        if message_id_match:
-            params['message_id'] = message_id_match.group(1)
-
-        # body パラメータ
-        body_match = re.search(r'"body":\s*"([^"]+)"', text)
-        if body_match:
-            params['body'] = body_match.group(1)
-
-        # query パラメータ
-        query_match = re.search(r'"query":\s*"([^"]+)"', text)
-        if query_match:
-            params['query'] = query_match.group(1)
-
-        return {
-            "name": name,
-            "parameters": params
-        }
+        return tool_parse.extract_components(text)
 
     async def generate_final_response(
         self,
@@ -1107,21 +1709,12 @@ class HybridLLM:
             tool_summary = self._format_tool_results(tool_results)
             logger.debug(f"Tool summary: {tool_summary}")
 
-            # メッセージリストを構築
-            messages = [
-                {"role": "system", "content":
-                 "以下のツール実行結果を基に、ユーザーに分かりやすい応答を生成してください。\n"
-                 "【重要ルール】\n"
-                 "• 必ず1〜2文以内で簡潔に答える\n"
-                 "• 応答構造: 結論を先に → 必要なら簡潔な補足\n"
-                 "• ツールが返した結果をそのまま伝える（余計な解釈や説明を加えない）\n"
-                 "• 技術的な詳細は省略し、自然な日本語で\n"
-                 "• 「〜ですね」「〜ですよ」など柔らかい語尾を使う"}
-            ]
-
-            # コンテキストを追加（最新5件）
+            # メッセージリストを構築（システムプロンプトは固定文字列のためプレフィックスキャッシュが効く）
+            messages = [{"role": "system", "content": _FINAL_RESPONSE_SYSTEM_PROMPT}]
+
+            # コンテキストを追加（トークン上限内の最新の履歴）
             if context:
-                messages.extend(context[-5:])
+                messages.extend(self._trim_context(context, self.config["final_context_token_budget"]))
 
             # リクエストと結果を追加（userメッセージ1つにまとめる）
             messages.append({
@@ -1131,8 +1724,8 @@ class HybridLLM:
 
             logger.debug(f"Sending {len(messages)} messages to LLM")
             response = await self._generate_with_fallback(messages)
-            logger.info(f"Successfully generated final response: {response['content'][:100]}...")
-            return response["content"]
+            logger.info(f"Successfully generated final response: {response.content[:100]}...")
+            return response.content
 
         except Exception as e:
             logger.error(f"Failed to generate final response: {e}")
@@ -1141,87 +1734,283 @@ class HybridLLM:
 
     def _format_tool_results(self, tool_results: Dict[str, Any]) -> str:
         """ツール実行結果をフォーマット"""
-        formatted_results = []
+        # メタデータキー（_metadataサフィックス）はスキップ
+        return "\n".join(
+            f"{tool_name}: {self._format_tool_result_value(result)}"
+            for tool_name, result in tool_results.items()
+            if not tool_name.endswith('_metadata')
+        )
+
+    @staticmethod
+    def _format_tool_result_value(result: Any) -> Any:
+        """ツール結果1件をユーザー向けの表示値に変換"""
+        # 文字列などそのまま使えるデータは変換しない
+        if not isinstance(result, dict):
+            return result
+
+        # "message"キーがあればそれを優先的に使用
+        if "message" in result:
+            return result["message"]
+
+        # メッセージがない場合はJSON形式で表示
+        return tool_parse.json_dumps_pretty(result)
+
+    def _refresh_provider_order(self):
+        """
+        試行順（プライマリ → フォールバック → その他）に利用可能なプロバイダーを並べる
 
-        for tool_name, result in tool_results.items():
-            # メタデータキーはスキップ（_metadataサフィックス）
-            if tool_name.endswith('_metadata'):
-                continue
+        初期化時・設定変更時に再計算し、生成ごとの辞書検索や可用性チェックを省く
+        """
+        primary = self.config["primary_provider"]
+        fallback = self.config["fallback_provider"]
 
-            # 結果が辞書型の場合、ユーザー向けメッセージを抽出
-            if isinstance(result, dict):
-                # "message"キーがあればそれを優先的に使用
-                if "message" in result:
-                    formatted_results.append(f"{tool_name}: {result['message']}")
-                else:
-                    # メッセージがない場合はJSON形式で表示
-                    import json
-                    formatted_results.append(f"{tool_name}: {json.dumps(result, ensure_ascii=False, indent=2)}")
-            else:
-                # 文字列などそのまま使えるデータ
-                formatted_results.append(f"{tool_name}: {result}")
+        names = [primary]
+        if self.config["auto_fallback"] and fallback:
+            names.append(fallback)
+        names.extend(name for name in self.providers if name not in (primary, fallback))
 
-        return "\n".join(formatted_results)
+        self._provider_order = [
+            self.providers[name] for name in names
+            if name in self.providers and self.providers[name].is_available
+        ]
+        logger.debug(f"Provider order: {[provider.name for provider in self._provider_order]}")
+
+    def _semantic_cache_text(self, messages: List[Dict], **kwargs) -> Optional[str]:
+        """
+        意味キャッシュの検索キーとなるテキストを取得
+
+        応答が決定的（temperature=0）でツールを使わない呼び出しのみ対象とし、
+        それ以外はNoneを返す
+        """
+        if self.semantic_cache is None or not self.semantic_cache.is_available or not messages:
+            return None
+        if kwargs.get("tools") or kwargs.get("temperature", 0.7) > 0:
+            return None
+        return f"{messages[0].get('content', '')}\n{messages[-1].get('content', '')}"
+
+    async def batch_generate(self, message_lists: List[List[Dict]], **kwargs) -> List[Union[LLMResponse, Dict[str, str]]]:
+        """
+        複数の会話に対する生成をまとめて実行（評価・一括処理用）
+
+        各リクエストは並行に送信され、結果は入力と同じ順序で返す。
+        失敗したリクエストは {"error": メッセージ} となる
+
+        Args:
+            message_lists: メッセージリストのリスト
+            **kwargs: 各生成に共通のパラメータ
+
+        Returns:
+            生成結果のリスト
+        """
+        if not self.is_initialized:
+            raise RuntimeError("HybridLLM not initialized")
+
+        results = await asyncio.gather(
+            *(self._generate_with_fallback(messages, **kwargs) for messages in message_lists),
+            return_exceptions=True
+        )
+        return [
+            {"error": str(result)} if isinstance(result, Exception) else result
+            for result in results
+        ]
+
+    def _exact_key(self, messages: List[Dict], **kwargs) -> Optional[str]:
+        """
+        完全一致キャッシュのキーを計算
 
-    async def _generate_with_fallback(self, messages: List[Dict], **kwargs) -> Dict[str, Any]:
-        """フォールバック機能付きでLLM生成を実行"""
+        temperature=0 の呼び出しのみ対象とし、それ以外はNoneを返す
+        """
+        temperature = kwargs.get("temperature", 0.7)
+        if temperature != 0:
+            return None
+
+        payload = {
+            "provider": self.config["primary_provider"],
+            "messages": messages,
+            "temperature": temperature,
+            "tools": self._tools_schema_json(kwargs.get("tools")),
+        }
+        serialized = tool_parse.json_dumps_sorted(payload)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _serialize_tools_schema(schema: List[Dict[str, Any]]) -> str:
+        """toolsスキーマをキー順を正規化したJSON文字列に変換"""
+        return tool_parse.json_dumps_sorted(schema)
+
+    def _tools_schema_json(self, schema: Optional[List[Dict[str, Any]]]) -> Optional[str]:
+        """
+        toolsスキーマのJSON文字列を取得
+
+        _convert_tools_to_openai_schema が返したスキーマであれば変換時に作成済みの文字列を返し、
+        毎回のシリアライズを省く
+        """
+        if not schema:
+            return None
+        cached = self._tools_schema_cache
+        if cached is not None and cached[2] is schema:
+            return cached[3]
+        return self._serialize_tools_schema(schema)
+
+    async def _generate_with_fallback(self, messages: List[Dict], **kwargs) -> LLMResponse:
+        """フォールバック機能付きでLLM生成を実行（キャッシュ対象の呼び出しは完全一致→意味キャッシュの順に参照）"""
+        exact_key = self._exact_key(messages, **kwargs)
+        if exact_key is not None:
+            cached = self._exact_cache.get(exact_key)
+            if cached is not None:
+                self._exact_cache.move_to_end(exact_key)
+                self._exact_cache_hits += 1
+                logger.info("Returning exact-match cached LLM response")
+                return replace(cached)
+            self._exact_cache_misses += 1
+
+        cache_text = self._semantic_cache_text(messages, **kwargs)
+        if cache_text is not None:
+            cached = await self.semantic_cache.get(cache_text)
+            if cached is not None:
+                logger.info("Returning semantically cached LLM response")
+                return LLMResponse.from_dict(cached)
+
+        response = await self._generate_from_providers(messages, **kwargs)
+
+        if exact_key is not None:
+            self._exact_cache[exact_key] = replace(response)
+            if len(self._exact_cache) > self._exact_cache_max_entries:
+                self._exact_cache.popitem(last=False)
+        if cache_text is not None:
+            await self.semantic_cache.put(cache_text, response.to_dict())
+        return response
+
+    async def _generate_from_providers(self, messages: List[Dict], **kwargs) -> LLMResponse:
+        """プロバイダーを試行順に呼び出して生成を実行"""
+        provider_order = self._provider_order
         primary = self.config["primary_provider"]
         fallback = self.config["fallback_provider"]
 
         logger.info(f"Starting LLM generation with primary: {primary}, fallback: {fallback}")
-        logger.debug(f"Available providers: {[name for name, p in self.providers.items() if p.is_available]}")
 
-        # プライマリプロバイダーを試行
-        if primary in self.providers and self.providers[primary].is_available:
+        # プライマリ・フォールバック両方が利用可能ならヘッジ実行
+        start = 0
+        if (self.config.get("hedge_after_ms") is not None and
+                len(provider_order) >= 2 and
+                provider_order[0].name == primary and
+                provider_order[1].name == fallback):
+            response = await self._generate_hedged(provider_order[0], provider_order[1], messages, **kwargs)
+            if response is not None:
+                return response
+            start = 2
+
+        # 利用可能なプロバイダーを順に試行
+        for provider in provider_order[start:]:
             try:
-                logger.info(f"Attempting generation with primary provider: {primary}")
-                return await self.providers[primary].generate(messages, **kwargs)
+                logger.info(f"Attempting generation with provider: {provider.name}")
+                return await provider.generate_limited(messages, **kwargs)
             except Exception as e:
-                logger.error(f"Primary provider {primary} failed: {e}")
-                logger.exception("Full traceback for primary provider:")
-
-        # フォールバックプロバイダーを試行
-        if (self.config["auto_fallback"] and
-            fallback and
-            fallback in self.providers and
-            self.providers[fallback].is_available):
-            try:
-                logger.info(f"Falling back to provider: {fallback}")
-                return await self.providers[fallback].generate(messages, **kwargs)
-            except Exception as e:
-                logger.error(f"Fallback provider {fallback} failed: {e}")
-                logger.exception("Full traceback for fallback provider:")
-
-        # 利用可能な任意のプロバイダーを試行
-        for name, provider in self.providers.items():
-            if provider.is_available and name not in [primary, fallback]:
-                try:
-                    logger.info(f"Trying alternative provider: {name}")
-                    return await provider.generate(messages, **kwargs)
-                except Exception as e:
-                    logger.error(f"Alternative provider {name} failed: {e}")
-                    logger.exception("Full traceback for alternative provider:")
+                logger.error(f"Provider {provider.name} failed: {e}")
+                logger.exception("Full traceback for provider:")
 
         logger.error("All LLM providers failed - no available providers or all attempts failed")
         raise RuntimeError("All LLM providers failed")
 
+    async def _generate_hedged(
+        self,
+        primary: LLMProvider,
+        fallback: LLMProvider,
+        messages: List[Dict],
+        **kwargs
+    ) -> Optional[LLMResponse]:
+        """
+        ヘッジ実行（プライマリが遅い・失敗した場合にフォールバックを並行起動）
+
+        プライマリが hedge_after_ms 以内に応答しなければフォールバックも起動し、
+        先に成功した応答を採用して残りはキャンセルする。
+        開始から config["timeout"] 秒以内にどちらも応答しない場合は打ち切る
+
+        Returns:
+            最初に成功した応答。両方失敗またはタイムアウトした場合はNone
+        """
+        loop = asyncio.get_running_loop()
+        hedge_after = self.config["hedge_after_ms"] / 1000
+        deadline = loop.time() + self.config["timeout"]
+        tasks = {asyncio.create_task(primary.generate_limited(messages, **kwargs)): primary.name}
+        pending = set(tasks)
+        hedged = False
+        self._hedge_stats["races"] += 1
+
+        try:
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    logger.error(f"Hedged generation timed out after {self.config['timeout']}s")
+                    return None
+
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=remaining if hedged else min(hedge_after, remaining),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                for task in done:
+                    if task.exception() is None:
+                        logger.info(f"Hedged generation won by provider: {tasks[task]}")
+                        winner = "primary_wins" if tasks[task] == primary.name else "fallback_wins"
+                        self._hedge_stats[winner] += 1
+                        return task.result()
+                    logger.error(f"Provider {tasks[task]} failed: {task.exception()}")
+
+                if not hedged and loop.time() < deadline:
+                    # タイムアウトまたはプライマリ失敗 → フォールバックを起動
+                    logger.info(f"Hedging with fallback provider: {fallback.name}")
+                    fallback_task = asyncio.create_task(fallback.generate_limited(messages, **kwargs))
+                    tasks[fallback_task] = fallback.name
+                    pending.add(fallback_task)
+                    hedged = True
+                    self._hedge_stats["hedged"] += 1
+
+            return None
+
+        finally:
+            for task in pending:
+                task.cancel()
+
     def _convert_tools_to_openai_schema(self, tools: List[Dict]) -> List[Dict[str, Any]]:
         """ToolRegistryの定義をOpenAI toolsスキーマに変換"""
         if not tools:
             return []
 
+        # ToolRegistryはツール構成が変わるまで同じリストを返すため、同一性で判定する
+        # （呼び出し側でリストが変更された場合に備えて要素数も照合する）
+        cached = self._tools_schema_cache
+        if cached is not None and cached[0] is tools and cached[1] == len(tools):
+            return cached[2]
+
         def param_to_schema(p: Dict[str, Any]) -> Dict[str, Any]:
+            # 各キーは1回だけ参照し、値がある場合のみ追加する
             schema = {"type": p.get("type", "string")}
-            if p.get("description"):
-                schema["description"] = p["description"]
-            if p.get("enum"):
-                schema["enum"] = p["enum"]
-            if p.get("default") is not None:
-                schema["default"] = p["default"]
+            description = p.get("description")
+            if description:
+                schema["description"] = description
+            enum = p.get("enum")
+            if enum:
+                schema["enum"] = enum
+            default = p.get("default")
+            if default is not None:
+                schema["default"] = default
             return schema
 
+        # ツール単位でもスキーマを再利用する（ツールリストが再構築されても
+        # 個々のツール定義が同一オブジェクトなら変換済みのものを使う）
+        # id()の再利用を避けるため、ツール定義への参照も合わせて保持する
+        previous = self._schema_by_tool_id
+        schema_by_tool_id: Dict[int, Tuple[Dict, Dict[str, Any]]] = {}
         result = []
         for t in tools:
+            entry = previous.get(id(t))
+            if entry is not None and entry[0] is t:
+                schema_by_tool_id[id(t)] = entry
+                result.append(entry[1])
+                continue
+
             params = t.get("parameters", [])
             properties = {p["name"]: param_to_schema(p) for p in params}
             required = [p["name"] for p in params if p.get("required")]
@@ -1234,17 +2023,26 @@ class HybridLLM:
             if required:
                 parameters_schema["required"] = required
 
-            result.append({
+            schema = {
                 "type": "function",
                 "function": {
                     "name": t.get("name"),
                     "description": t.get("description", ""),
                     "parameters": parameters_schema,
                 }
-            })
+            }
+            schema_by_tool_id[id(t)] = (t, schema)
+            result.append(schema)
 
+        # 現在のツールリストに含まれるものだけを残す
+        self._schema_by_tool_id = schema_by_tool_id
+        self._tools_schema_cache = (tools, len(tools), result, self._serialize_tools_schema(result))
         return result
 
+    async def warmup(self):
+        """トークン数計算用のエンコーディングを読み込み、初回の会話履歴トリミング時の遅延を防ぐ"""
+        await asyncio.to_thread(_get_token_encoding)
+
     async def get_status(self) -> Dict[str, Any]:
         """システム状態の取得"""
         provider_status = {}
@@ -1256,7 +2054,16 @@ class HybridLLM:
             "primary_provider": self.config["primary_provider"],
             "fallback_provider": self.config["fallback_provider"],
             "privacy_mode": self.config["privacy_mode"],
-            "providers": provider_status
+            "providers": provider_status,
+            "hedge_stats": dict(self._hedge_stats, hedge_after_ms=self.config["hedge_after_ms"]),
+            "cache_stats": {
+                "exact": {
+                    "entries": len(self._exact_cache),
+                    "hits": self._exact_cache_hits,
+                    "misses": self._exact_cache_misses
+                },
+                "semantic": self.semantic_cache.get_stats() if self.semantic_cache else None
+            }
         }
 
     async def update_config(self, config: Dict[str, Any]):
@@ -1265,6 +2072,10 @@ class HybridLLM:
 
         old_config = self.config.copy()
         self.config.update(config)
+        self._tools_schema_cache = None
+        self._exact_cache.clear()
+        tool_parse.fix_json_cached.cache_clear()
+        self._schema_by_tool_id = {}
 
         # モデルが変更された場合、該当プロバイダーを再初期化
         if "model" in config:
@@ -1274,15 +2085,22 @@ class HybridLLM:
                 if provider_name == "claude":
                     await provider.initialize({
                         "anthropic_api_key": os.getenv("ANTHROPIC_API_KEY"),
+                        "http_client": self._http,
+                        "max_retries": self.config["max_retries"],
                         "model": config["model"]
                     })
                 elif provider_name == "openai":
                     await provider.initialize({
                         "openai_api_key": os.getenv("OPENAI_API_KEY"),
+                        "http_client": self._http,
+                        "max_retries": self.config["max_retries"],
                         "model": config["model"]
                     })
                 logger.info(f"Model updated to {config['model']} for provider {provider_name}")
 
+        # 可用性・優先順位の変更をプロバイダー順序に反映
+        self._refresh_provider_order()
+
         # プロバイダーが変更された場合は再初期化
         if (old_config.get("primary_provider") != self.config.get("primary_provider") or
             old_config.get("privacy_mode") != self.config.get("privacy_mode")):
@@ -1293,7 +2111,21 @@ class HybridLLM:
         """リソースのクリーンアップ"""
         logger.info("Cleaning up Hybrid LLM system...")
 
+        if self.semantic_cache:
+            self.semantic_cache.save()
+            self.semantic_cache = None
+
+        self.cancel_prefetch()
+
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+        self._exact_cache.clear()
         self.providers.clear()
+        self._provider_order = []
+        self._tools_schema_cache = None
+        self._schema_by_tool_id = {}
         self.is_initialized = False
 
         logger.info("Hybrid LLM system cleanup completed")
@@ -0,0 +1,215 @@
+"""
+Semantic Cache - 意味的類似度によるLLM応答キャッシュ
+
+言い換えられた同じ問い合わせに対して、過去の応答を再利用して
+LLMへのリクエストを省略するためのキャッシュ
+"""
+
+import os
+import json
+import asyncio
+from concurrent.futures import Executor
+from typing import Dict, Any, List, Optional
+from loguru import logger
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+    logger.warning("Sentence Transformers not available, semantic cache disabled")
+
+
+class SemanticCache:
+    """
+    意味的類似度によるLLM応答キャッシュ
+
+    問い合わせ文の正規化済み埋め込みを行列に保持し、内積（コサイン類似度）が
+    閾値以上のエントリがあればその応答を返す。容量を超えた場合は古い順に上書きする。
+    エントリにはタグ（応答の前提となる文脈のキー等）を付けられ、検索時はタグが一致する行のみを候補にする
+    """
+
+    def __init__(
+        self,
+        embedding_model: str = "all-MiniLM-L6-v2",
+        threshold: float = 0.92,
+        max_entries: int = 512,
+        cache_path: Optional[str] = None
+    ):
+        self.embedding_model = embedding_model
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.cache_path = cache_path
+
+        self.encoder = None
+        # エンコーダーを他のコンポーネントと共有する場合は、その推論用のスレッドで実行する
+        self._executor: Optional[Executor] = None
+        self._embeddings: Optional[np.ndarray] = None
+        self._responses: List[Optional[Dict[str, Any]]] = []
+        self._tags = np.full(max_entries, None, dtype=object)
+        self._next_row = 0
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def is_available(self) -> bool:
+        """エンコーダーが読み込まれていればキャッシュを使用可能"""
+        return self.encoder is not None
+
+    async def initialize(self, encoder=None, executor: Optional[Executor] = None):
+        """
+        エンコーダーの読み込みと保存済みキャッシュの復元
+
+        Args:
+            encoder: 読み込み済みの同じモデルのエンコーダー（渡した場合はモデルを読み込まずに共有する）
+            executor: encoder の推論を実行するExecutor
+        """
+        if encoder is not None:
+            self.encoder = encoder
+            self._executor = executor
+            logger.info("Semantic cache is sharing an existing encoder")
+            if self.cache_path:
+                self._load()
+            return
+
+        if not SENTENCE_TRANSFORMERS_AVAILABLE:
+            return
+
+        try:
+            loop = asyncio.get_event_loop()
+            self.encoder = await loop.run_in_executor(None, SentenceTransformer, self.embedding_model)
+            logger.info(f"Semantic cache encoder loaded: {self.embedding_model}")
+        except Exception as e:
+            logger.error(f"Failed to load semantic cache encoder: {e}")
+            self.encoder = None
+            return
+
+        if self.cache_path:
+            self._load()
+
+    async def _embed(self, text: str) -> np.ndarray:
+        """テキストを正規化済みの埋め込みベクトルに変換（CPU処理のためスレッドで実行）"""
+        loop = asyncio.get_event_loop()
+        embedding = await loop.run_in_executor(
+            self._executor,
+            lambda: self.encoder.encode(text, normalize_embeddings=True)
+        )
+        return np.asarray(embedding, dtype=np.float32)
+
+    async def get(self, text: str, tag: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """類似した問い合わせのキャッシュ済み応答を取得（tag を指定した場合はタグが一致するエントリのみ）"""
+        if not self.is_available or self._size == 0:
+            self.misses += 1
+            return None
+
+        query = await self._embed(text)
+        scores = self._embeddings[:self._size] @ query
+        if tag is not None:
+            scores = np.where(self._tags[:self._size] == tag, scores, -np.inf)
+        best = int(np.argmax(scores))
+
+        if scores[best] >= self.threshold:
+            self.hits += 1
+            logger.debug("Semantic cache hit (score={:.3f})", float(scores[best]))
+            return self._responses[best]
+
+        self.misses += 1
+        return None
+
+    async def put(self, text: str, response: Dict[str, Any], tag: Optional[str] = None):
+        """応答をキャッシュに追加"""
+        if not self.is_available:
+            return
+
+        embedding = await self._embed(text)
+        if self._embeddings is None:
+            self._embeddings = np.zeros((self.max_entries, embedding.shape[0]), dtype=np.float32)
+            self._responses = [None] * self.max_entries
+
+        row = self._next_row
+        self._embeddings[row] = embedding
+        self._responses[row] = response
+        self._tags[row] = tag
+        self._next_row = (row + 1) % self.max_entries
+        self._size = min(self._size + 1, self.max_entries)
+
+    def clear(self):
+        """キャッシュを全て破棄"""
+        self._embeddings = None
+        self._responses = []
+        self._tags[:] = None
+        self._next_row = 0
+        self._size = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """キャッシュの統計情報を取得"""
+        return {
+            "available": self.is_available,
+            "entries": self._size,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def _rows_oldest_first(self) -> List[int]:
+        """保存済みの行番号を古い順に返す（一周した後は次に上書きする行が最も古い）"""
+        if self._size < self.max_entries:
+            return list(range(self._size))
+        return [(self._next_row + i) % self.max_entries for i in range(self.max_entries)]
+
+    def save(self):
+        """キャッシュを古い順にディスクに保存（読み込み時も古い順に上書きされるようにする）"""
+        if not self.cache_path or self._embeddings is None:
+            return
+
+        try:
+            rows = self._rows_oldest_first()
+            os.makedirs(self.cache_path, exist_ok=True)
+            np.save(os.path.join(self.cache_path, "embeddings.npy"), self._embeddings[rows])
+            with open(os.path.join(self.cache_path, "responses.json"), 'w', encoding='utf-8') as f:
+                json.dump([self._responses[row] for row in rows], f, ensure_ascii=False)
+            with open(os.path.join(self.cache_path, "tags.json"), 'w', encoding='utf-8') as f:
+                json.dump([self._tags[row] for row in rows], f, ensure_ascii=False)
+            logger.info(f"Saved {self._size} semantic cache entries")
+        except Exception as e:
+            logger.warning(f"Failed to save semantic cache: {e}")
+
+    def _load(self):
+        """ディスクからキャッシュを復元"""
+        embeddings_file = os.path.join(self.cache_path, "embeddings.npy")
+        responses_file = os.path.join(self.cache_path, "responses.json")
+        if not (os.path.exists(embeddings_file) and os.path.exists(responses_file)):
+            return
+
+        try:
+            embeddings = np.load(embeddings_file)
+            with open(responses_file, 'r', encoding='utf-8') as f:
+                responses = json.load(f)
+            # タグのファイルがない以前の形式は、タグなしのエントリとして読み込む
+            tags_file = os.path.join(self.cache_path, "tags.json")
+            tags = [None] * len(responses)
+            if os.path.exists(tags_file):
+                with open(tags_file, 'r', encoding='utf-8') as f:
+                    tags = json.load(f)
+
+            # ファイルは古い順のため、容量を超える場合は新しい側を残す
+            stored = min(len(embeddings), len(responses), len(tags))
+            count = min(stored, self.max_entries)
+            if count == 0:
+                return
+            embeddings = embeddings[stored - count:stored]
+            responses = responses[stored - count:stored]
+            self._tags[:count] = tags[stored - count:stored]
+
+            self._embeddings = np.zeros((self.max_entries, embeddings.shape[1]), dtype=np.float32)
+            self._embeddings[:count] = embeddings
+            self._responses = responses + [None] * (self.max_entries - count)
+            self._size = count
+            self._next_row = count % self.max_entries
+            logger.info(f"Loaded {count} semantic cache entries")
+        except Exception as e:
+            logger.warning(f"Failed to load semantic cache: {e}")
+            self.clear()
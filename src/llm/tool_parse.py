@@ -0,0 +1,265 @@
+"""
+Tool Parse - ツール呼び出しJSONの修復・抽出
+
+ローカルLLMの応答に含まれる不完全なTOOL_CALL JSONを修復し、
+ツール名とパラメータを取り出す処理をまとめたモジュール
+
+ほぼ全ての応答で実行されるホットパスのため、mypycでコンパイルできるよう
+全ての関数に型注釈を付けている。コンパイル済み拡張モジュール
+（tool_parse.*.so）が存在する場合はPythonがそちらを優先して読み込む:
+
+    mypyc src/llm/tool_parse.py
+"""
+
+import re
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    logger.warning("orjson not available, using standard json for tool-call parsing")
+
+# コンパイル済み拡張として読み込まれたかどうか（mypycでは__file__が.soを指す）
+COMPILED = not __file__.endswith(".py")
+
+# ツール呼び出しJSONの修復・抽出用パターン
+_RE_NAME = re.compile(r'"name":\s*"([^"]+)"')
+_RE_KV_STR = re.compile(r'"([^"]+)":\s*"([^"]+)"')
+_RE_KV_NUM = re.compile(r'"([^"]+)":\s*(\d+)')
+
+# 既知のフィールドを1回の走査で抽出するパターン（値の型ごとにグループを分ける）
+_RE_ANY_FIELD = re.compile(
+    r'"(name|action|max_results|message_id|body|query|time|message|label|repeat|alarm_id)":\s*'
+    r'(?:"([^"]*)"|(\d+)|(true|false))'
+)
+
+_KNOWN_FIELDS = frozenset({
+    "name", "action", "max_results", "message_id", "body", "query",
+    "time", "message", "label", "repeat", "alarm_id",
+})
+_INT_FIELDS = frozenset({"max_results"})
+_BOOL_FIELDS = frozenset({"repeat"})
+
+
+def json_loads(s: str) -> Any:
+    """JSONを解析（orjsonが利用可能なら高速版を使用）
+
+    orjson.JSONDecodeError は json.JSONDecodeError のサブクラスのため例外処理は共通
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(s)
+    return json.loads(s)
+
+
+def json_dumps(obj: Any) -> str:
+    """JSON文字列を生成（orjsonが利用可能なら高速版を使用）"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def json_dumps_pretty(obj: Any) -> str:
+    """インデント付きのJSON文字列を生成（ツール結果の表示用）"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, indent=2)
+
+
+def json_dumps_sorted(obj: Any) -> str:
+    """キー順を正規化した区切り文字なしのJSON文字列を生成（キャッシュキー用）
+
+    シリアライズできない値はstr()で文字列化する
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def try_loads(s: str) -> Tuple[Any, bool]:
+    """JSONの解析を試行し (値, 成功したか) を返す
+
+    解析失敗を例外ではなく戻り値で扱うため、呼び出し側で例外処理を制御フローに使わない
+    """
+    try:
+        return json_loads(s), True
+    except json.JSONDecodeError:
+        return None, False
+
+
+def _has_name(value: Any) -> bool:
+    """解析結果がnameキーを持つオブジェクトかどうか"""
+    return isinstance(value, dict) and "name" in value
+
+
+def loads_many(json_strs: List[str]) -> Optional[List[Any]]:
+    """複数のJSON文字列を配列として1回の呼び出しでまとめて解析
+
+    いずれかが不正な場合や要素数が一致しない場合はNoneを返す
+    （呼び出し側で個別の修復処理にフォールバックする）
+    """
+    if not json_strs:
+        return []
+    values, ok = try_loads("[" + ",".join(json_strs) + "]")
+    if not ok:
+        return None
+    # 1つの候補が複数要素として解釈された場合は対応が崩れるため採用しない
+    if len(values) != len(json_strs):
+        return None
+    return values
+
+
+# 既知フィールドの (キー, 文字列値, 整数値, 真偽値) 。該当しない型の値はNone
+FieldMatch = Tuple[str, Optional[str], Optional[str], Optional[str]]
+
+
+def _regex_fields(text: str) -> List[FieldMatch]:
+    """既知フィールドを正規表現で抽出"""
+    return [match.groups() for match in _RE_ANY_FIELD.finditer(text)]  # type: ignore[misc]
+
+
+def _scan_fields(text: str) -> List[FieldMatch]:
+    """既知フィールドを文字列走査で抽出（_regex_fieldsと同じ結果を返す）
+
+    引用符の位置をstr.findで辿り、既知のキーの直後の値だけを切り出す。
+    mypycでコンパイルした場合は正規表現より高速になる
+    """
+    fields: List[FieldMatch] = []
+    length = len(text)
+    pos = text.find('"')
+    while pos != -1:
+        key_end = text.find('"', pos + 1)
+        if key_end == -1:
+            break
+
+        next_pos = pos + 1
+        key = text[pos + 1:key_end]
+        if key in _KNOWN_FIELDS and key_end + 1 < length and text[key_end + 1] == ':':
+            start = key_end + 2
+            while start < length and text[start].isspace():
+                start += 1
+
+            if start < length:
+                first = text[start]
+                if first == '"':
+                    value_end = text.find('"', start + 1)
+                    if value_end != -1:
+                        fields.append((key, text[start + 1:value_end], None, None))
+                        next_pos = value_end + 1
+                elif first.isdecimal():
+                    end = start + 1
+                    while end < length and text[end].isdecimal():
+                        end += 1
+                    fields.append((key, None, text[start:end], None))
+                    next_pos = end
+                elif text.startswith("true", start):
+                    fields.append((key, None, None, "true"))
+                    next_pos = start + 4
+                elif text.startswith("false", start):
+                    fields.append((key, None, None, "false"))
+                    next_pos = start + 5
+
+        pos = text.find('"', next_pos)
+    return fields
+
+
+# インタプリタ実行では正規表現エンジン（C実装）の方が速いため、コンパイル時のみ走査版を使う
+_extract_fields = _scan_fields if COMPILED else _regex_fields
+
+
+def fix_json(json_str: str) -> Optional[str]:
+    """不完全なJSONを修復"""
+    original_str = json_str.strip()
+    logger.debug("🔧 Attempting to fix JSON: '{}'", original_str)
+
+    # nameキーを含まない候補はどの経路でも採用されないため、解析せずに除外する
+    if '"name"' not in original_str:
+        return None
+
+    # 高速パス: そのまま解析できる場合は修復処理を行わない
+    test_data, ok = try_loads(original_str)
+    if ok and _has_name(test_data):
+        return original_str
+
+    # 最後の}が抜けている場合は開いている括弧の数だけ閉じて再解析
+    if not original_str.endswith('}'):
+        missing_braces = original_str.count('{') - original_str.count('}')
+        if missing_braces > 0:
+            fixed_str = original_str + ('}' * missing_braces)
+            logger.debug("🔧 Added {} closing braces: '{}'", missing_braces, fixed_str)
+
+            test_data, ok = try_loads(fixed_str)
+            if ok and _has_name(test_data):
+                logger.debug("✅ JSON fixed successfully: '{}'", fixed_str)
+                return fixed_str
+            logger.debug("Standard fix failed, attempting manual reconstruction...")
+
+    # 手動再構築: name・parametersを1回の走査で抽出（各キーは最初の出現を採用）
+    name: Optional[str] = None
+    params: Dict[str, Any] = {}
+
+    for key, str_value, int_value, bool_value in _extract_fields(original_str):
+
+        if key == "name":
+            if name is None and str_value:
+                name = str_value
+        elif key in params:
+            continue
+        elif key in _INT_FIELDS:
+            if int_value is not None:
+                params[key] = int(int_value)
+        elif key in _BOOL_FIELDS:
+            if bool_value is not None:
+                params[key] = bool_value == 'true'
+        elif str_value is not None:
+            params[key] = str_value
+
+    if not name:
+        logger.warning("Could not extract name from: '{}'", original_str)
+        return None
+
+    # 再構築されたJSONを作成
+    fixed_json = json_dumps({"name": name, "parameters": params})
+    logger.debug("✅ Manually reconstructed JSON: '{}'", fixed_json)
+    return fixed_json
+
+
+# 同じ候補文字列が繰り返し出力される場合（ローカルLLMの反復出力など）に修復処理を省略する
+# 結果は不変の文字列のため共有しても安全
+fix_json_cached = lru_cache(maxsize=256)(fix_json)
+
+
+def extract_parameters(params_str: str) -> Dict[str, Any]:
+    """不完全なparametersからキー・値を抽出"""
+    params: Dict[str, Any] = {}
+
+    # "key": "value" パターンを抽出
+    for key, value in _RE_KV_STR.findall(params_str):
+        params[key] = value
+
+    # "key": number パターンを抽出
+    for key, value in _RE_KV_NUM.findall(params_str):
+        params[key] = int(value)
+
+    return params
+
+
+def extract_components(text: str) -> Optional[Dict[str, Any]]:
+    """正規表現でツール呼び出しコンポーネントを直接抽出"""
+    # nameを抽出
+    name_match = _RE_NAME.search(text)
+    if not name_match:
+        return None
+
+    # parametersはキー・値の汎用抽出に任せる（nameの値を取り込まないよう範囲を限定）
+    params_start = text.find('"parameters"')
+    params_region = text[params_start:] if params_start != -1 else text[name_match.end():]
+
+    return {
+        "name": name_match.group(1),
+        "parameters": extract_parameters(params_region)
+    }
@@ -4,33 +4,84 @@ Voice AI Agent - メインアプリケーション
 リアルタイム音声対話システムのメインエントリーポイント
 """
 
+import asyncio
+import base64
+import gzip
+import hashlib
 import os
+import sys
+import time
+from collections import deque
 from contextlib import asynccontextmanager
+from typing import Dict, Any, Awaitable, Callable, Final, Optional, Tuple
+from urllib.parse import quote
+import aiofiles
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response
 from fastapi import Request
 from loguru import logger
+from pydantic import BaseModel, ValidationError
 from dotenv import load_dotenv
 
 from src.core.agent import VoiceAgent
-from src.core.websocket_manager import WebSocketManager
+from src.core.websocket_manager import (
+    WebSocketManager, dumps_json, dumps_json_bytes, loads_json, receive_bytes, receive_json
+)
 from src.core.tool_base import ToolResult
+from src.tools.google_api import execute_request
+from src.middleware.compression import TextGZipMiddleware
 from src.api.gmail_auth import router as gmail_auth_router
 
 # 環境変数の読み込み
 load_dotenv()
 
+# アプリケーション設定（環境変数は起動時に1回だけ読み込み、リクエスト処理中には参照しない）
+LOG_LEVEL: Final = os.getenv("LOG_LEVEL", "INFO")
+LOG_FILE: Final = os.getenv("LOG_FILE", "./data/voiceagent.log")
+# 起動時にモデル等の初回読み込みを済ませるか
+WARMUP: Final = os.getenv("WARMUP", "true").lower() == "true"
+# /static と /data/audio をアプリで配信するか（リバースプロキシで配信する場合は false）
+SERVE_STATIC_FILES: Final = os.getenv("SERVE_STATIC_FILES", "true").lower() == "true"
+
 # ログ設定
+# loguruの既定のstderrハンドラーはDEBUGレベルのため、LOG_LEVEL未満のログも毎回整形・出力されてしまう。
+# 全ハンドラーをLOG_LEVELに揃え、それ未満のログは引数の整形前に破棄されるようにする
+logger.remove()
+logger.add(sys.stderr, level=LOG_LEVEL)
+# ファイル書き込みはバックグラウンドスレッドで行い、イベントループを止めない
 logger.add(
-    os.getenv("LOG_FILE", "./data/voiceagent.log"),
+    LOG_FILE,
     rotation="1 day",
     retention="30 days",
-    level=os.getenv("LOG_LEVEL", "INFO")
+    level=LOG_LEVEL,
+    enqueue=True
 )
 
 
+class ConfigUpdate(BaseModel):
+    """チャットWebSocketの config_update メッセージの設定部分"""
+    llm_provider: Optional[str] = None
+    tts_provider: Optional[str] = None
+
+    def to_updates(self) -> Dict[str, Any]:
+        """VoiceAgent.update_config に渡す形式に変換"""
+        updates = {}
+        if self.llm_provider:
+            updates["llm"] = {"primary_provider": self.llm_provider}
+        if self.tts_provider:
+            updates["tts"] = {"provider": self.tts_provider}
+        return updates
+
+
+class FastJSONResponse(JSONResponse):
+    """orjsonでシリアライズするJSONレスポンス（全APIルートの既定のレスポンスクラス）"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json_bytes(content)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """アプリケーションのライフサイクル管理"""
@@ -40,8 +91,17 @@ async def lifespan(app: FastAPI):
     app.state.voice_agent = VoiceAgent()
     app.state.websocket_manager = WebSocketManager()
 
+    # トップページはリクエストに依存しない静的な内容のため、起動時に1回だけレンダリングする
+    app.state.index_html = templates.get_template("index.html").render()
+    app.state.index_etag = f'"{hashlib.blake2b(app.state.index_html.encode("utf-8"), digest_size=8).hexdigest()}"'
+
     # 初期化処理
     await app.state.voice_agent.initialize()
+    # ツールレジストリはエージェントの生存中は差し替わらないため、エンドポイントから直接参照できるよう保持する。
+    # 個々のツールは reload_tool / ensure_tool で入れ替わり得るため、ツール自体は毎回レジストリから取得する
+    app.state.tools = app.state.voice_agent.tools
+    if WARMUP:
+        await app.state.voice_agent.warmup()
     logger.info("Voice AI Agent ready!")
 
     yield
@@ -56,16 +116,24 @@ app = FastAPI(
     title="Voice AI Agent",
     description="インテリジェント音声エージェント",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
-# 静的ファイルとテンプレートの設定
-# 起動時にデータディレクトリが存在しないとStaticFilesのマウントで落ちるため、先に作成しておく
-os.makedirs("data/audio", exist_ok=True)
-os.makedirs("data/memory", exist_ok=True)
+# 1KB以上のJSON・HTML等のレスポンスをgzip圧縮する（音声ファイルとWebSocketは対象外）
+app.add_middleware(TextGZipMiddleware, minimum_size=1024, compresslevel=5)
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
-app.mount("/data", StaticFiles(directory="data"), name="data")
+# 静的ファイルとテンプレートの設定
+# 公開するのはフロントエンドの静的ファイルと合成音声（/data/audio）のみ。
+# ログや記憶データを含む data ディレクトリ全体は公開しない。
+# 本番でリバースプロキシ（Nginx等）が sendfile で配信する場合は SERVE_STATIC_FILES=false にして
+# Pythonプロセスでのファイル配信を無効にし、イベントループをWebSocket処理に専念させる
+if SERVE_STATIC_FILES:
+    app.mount("/static", StaticFiles(directory="static"), name="static")
+    # data/audio は起動処理でTTSが作成するため、インポート時には存在を確認しない
+    app.mount("/data/audio", StaticFiles(directory="data/audio", check_dir=False), name="audio")
+else:
+    logger.info("Static files are served by the reverse proxy (SERVE_STATIC_FILES=false)")
 templates = Jinja2Templates(directory="templates")
 
 # APIルーターを登録
@@ -74,8 +142,11 @@ app.include_router(gmail_auth_router)
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    """ホームページ"""
-    return templates.TemplateResponse("index.html", {"request": request})
+    """ホームページ（起動時にレンダリング済みのHTMLを返す。ETagが一致する場合は304を返す）"""
+    headers = {"ETag": app.state.index_etag}
+    if request.headers.get("if-none-match") == app.state.index_etag:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(app.state.index_html, headers=headers)
 
 
 @app.get("/health")
@@ -84,6 +155,13 @@ async def health_check():
     return {"status": "healthy", "message": "Voice AI Agent is running"}
 
 
+# 音声エンドポイントの応答メッセージのJSONテンプレート（値だけをシリアライズして埋め込む）
+# 音声認識結果とAI応答は1ターン分を1メッセージ（1フレーム）にまとめて送る
+TURN_MESSAGE_TEMPLATE = (
+    '{{"type":"turn","user":{user},"assistant":{assistant},"audio_url":{audio_url},"timestamp":{timestamp}}}'
+)
+
+
 @app.websocket("/ws/voice")
 async def websocket_voice_endpoint(websocket: WebSocket):
     """音声通信用WebSocketエンドポイント"""
@@ -97,43 +175,44 @@ async def websocket_voice_endpoint(websocket: WebSocket):
     else:
         logger.warning("Voice WebSocket connected without session_id")
 
+    # 送信は接続ごとの送信キュー経由で行い、受信ループを遅いクライアントから切り離す
+    websocket_manager = app.state.websocket_manager
+
     # ステータスコールバックを設定
     async def send_status(message: str):
-        await websocket.send_json({"type": "status", "message": message})
+        websocket_manager.enqueue_json({"type": "status", "message": message}, websocket)
 
     app.state.voice_agent.status_callback = send_status
 
     try:
         while True:
             # 音声データの受信
-            data = await websocket.receive_bytes()
-            logger.debug(f"Received audio data: {len(data)} bytes")
+            data = await receive_bytes(websocket)
+            logger.debug("Received audio data: {} bytes", len(data))
 
             # 音声エージェントで処理
             response = await app.state.voice_agent.process_audio(data)
 
-            # 応答の送信（音声認識結果とAI応答を分けて送信）
-            if response:
-                # 音声認識結果をチャット欄に表示
-                if response.get("user_text"):
-                    user_message = {
-                        "type": "user_message",
-                        "content": response.get("user_text"),
-                        "timestamp": response.get("timestamp")
-                    }
-                    logger.info(f"🎤 Sending user_message to WebSocket: {user_message}")
-                    await websocket.send_json(user_message)
-
-                # AI応答をチャット欄に表示
-                if response.get("text"):
-                    assistant_message = {
-                        "type": "assistant_message",
-                        "content": response.get("text"),
+            # 応答の送信（音声認識結果とAI応答を1フレームにまとめて送信）
+            if response and (response.get("user_text") or response.get("text")):
+                if websocket_manager.uses_msgpack(websocket):
+                    websocket_manager.enqueue_json({
+                        "type": "turn",
+                        "user": response.get("user_text"),
+                        "assistant": response.get("text"),
                         "audio_url": response.get("audio_url"),
                         "timestamp": response.get("timestamp")
-                    }
-                    logger.info(f"🤖 Sending assistant_message to WebSocket: {assistant_message}")
-                    await websocket.send_json(assistant_message)
+                    }, websocket)
+                    continue
+
+                turn_message = TURN_MESSAGE_TEMPLATE.format(
+                    user=dumps_json(response.get("user_text")),
+                    assistant=dumps_json(response.get("text")),
+                    audio_url=dumps_json(response.get("audio_url")),
+                    timestamp=dumps_json(response.get("timestamp"))
+                )
+                logger.debug("🎤 Sending turn to WebSocket: {} chars", len(turn_message))
+                websocket_manager.enqueue_json(turn_message, websocket)
 
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected")
@@ -143,16 +222,146 @@ async def websocket_voice_endpoint(websocket: WebSocket):
         app.state.websocket_manager.disconnect(websocket)
 
 
+# 未知のメッセージタイプへの応答（固定内容のため起動時に1回だけシリアライズする）
+UNKNOWN_MESSAGE_ERROR = dumps_json({"type": "error", "message": "Unknown message type"})
+# 未知のメッセージタイプを許容する回数と期間（超えたクライアントはポリシー違反として切断する）
+MAX_UNKNOWN_MESSAGES = 5
+UNKNOWN_MESSAGE_WINDOW = 10.0
+
+
+# ストリーミング断片のJSONテンプレート（断片ごとに辞書を作らず、値だけをシリアライズして埋め込む）
+ASSISTANT_DELTA_TEMPLATE = '{{"type":"assistant_delta","chunk":{chunk}}}'
+
+
+async def _handle_chat_text(websocket: WebSocket, message: Dict[str, Any]):
+    """テキストメッセージ（互換: type='message' か 'text'）"""
+    websocket_manager = app.state.websocket_manager
+    use_msgpack = websocket_manager.uses_msgpack(websocket)
+    text_payload = message.get("message") or message.get("content") or ""
+
+    # 生成されたテキストを断片ごとに送信し、確定した応答と音声URLを最後に送る
+    response = {}
+    async for event in app.state.voice_agent.process_text_stream(text_payload):
+        if event["type"] != "delta":
+            response = event["result"]
+        elif use_msgpack:
+            websocket_manager.enqueue_json({"type": "assistant_delta", "chunk": event["content"]}, websocket)
+        else:
+            websocket_manager.enqueue_json(
+                ASSISTANT_DELTA_TEMPLATE.format(chunk=dumps_json(event["content"])), websocket
+            )
+
+    websocket_manager.enqueue_json({
+        "type": "assistant_done",
+        "content": response.get("text", ""),
+        "audio_url": response.get("audio_url")
+    }, websocket)
+
+
+async def _handle_chat_config_update(websocket: WebSocket, message: Dict[str, Any]):
+    """設定更新"""
+    websocket_manager = app.state.websocket_manager
+
+    # スキーマで一括検証し、既存の構成と整合する形に変換
+    try:
+        updates = ConfigUpdate.model_validate(message.get("config") or {}).to_updates()
+    except ValidationError as e:
+        logger.warning(f"Invalid config_update: {e}")
+        websocket_manager.enqueue_json({
+            "type": "error",
+            "message": "設定の形式が正しくありません"
+        }, websocket)
+        return
+
+    if updates:
+        await app.state.voice_agent.update_config(updates)
+
+    websocket_manager.enqueue_json({
+        "type": "status",
+        "status": "configured",
+        "applied": updates
+    }, websocket)
+
+
+async def _handle_chat_reset(websocket: WebSocket, message: Dict[str, Any]):
+    """会話リセット"""
+    websocket_manager = app.state.websocket_manager
+    try:
+        await app.state.voice_agent.context.reset_context()
+        websocket_manager.enqueue_json({
+            "type": "status",
+            "status": "reset_done"
+        }, websocket)
+    except Exception as e:
+        logger.error(f"Failed to reset context: {e}")
+        websocket_manager.enqueue_json({
+            "type": "error",
+            "message": "コンテキストのリセットに失敗しました"
+        }, websocket)
+
+
+async def _handle_chat_save_personal_info(websocket: WebSocket, message: Dict[str, Any]):
+    """個人情報保存"""
+    websocket_manager = app.state.websocket_manager
+    personal_info = message.get("personal_info", {})
+    try:
+        # メモリツール経由で個人情報を保存
+        memory_tool = app.state.tools.get_tool("memory")
+        if memory_tool:
+            await memory_tool.store_personal_info(personal_info)
+        else:
+            raise Exception("Memory tool not found")
+        websocket_manager.enqueue_json({
+            "type": "status",
+            "status": "personal_info_saved",
+            "message": "個人情報を保存しました"
+        }, websocket)
+        logger.info(f"Personal information saved: {personal_info}")
+    except Exception as e:
+        logger.error(f"Failed to save personal information: {e}")
+        websocket_manager.enqueue_json({
+            "type": "error",
+            "message": "個人情報の保存に失敗しました"
+        }, websocket)
+
+
+async def _handle_chat_status_request(websocket: WebSocket, message: Dict[str, Any]):
+    """ステータス要求"""
+    status = await app.state.voice_agent.get_status()
+    app.state.websocket_manager.enqueue_json({
+        "type": "status",
+        "status": status
+    }, websocket)
+
+
+# チャットメッセージのタイプ別ハンドラー（if/elif の連鎖ではなく1回の辞書参照で振り分ける）
+CHAT_MESSAGE_HANDLERS: Dict[str, Callable[[WebSocket, Dict[str, Any]], Awaitable[None]]] = {
+    "message": _handle_chat_text,
+    "text": _handle_chat_text,
+    "config_update": _handle_chat_config_update,
+    "reset": _handle_chat_reset,
+    "save_personal_info": _handle_chat_save_personal_info,
+    "status_request": _handle_chat_status_request,
+}
+
+
 @app.websocket("/ws/chat")
 async def websocket_chat_endpoint(websocket: WebSocket):
     """チャット用WebSocketエンドポイント"""
     await app.state.websocket_manager.connect(websocket)
 
+    # 送信は接続ごとの送信キュー経由で行う（ストリーミングの断片をまとめて送信し、送信順序も保つ）
+    websocket_manager = app.state.websocket_manager
+    # ?fmt=msgpack で接続したクライアントとはMessagePackのバイナリフレームで送受信する
+    use_msgpack = websocket_manager.uses_msgpack(websocket)
+    # 直近に受信した未知のメッセージタイプの受信時刻
+    unknown_message_times = deque()
+
     try:
         while True:
             # テキストメッセージの受信
-            message = await websocket.receive_json()
-            logger.debug(f"Received chat message: {message}")
+            message = await receive_json(websocket, use_msgpack)
+            logger.debug("Received chat message: {}", message)
 
             msg_type = message.get("type")
 
@@ -160,99 +369,25 @@ async def websocket_chat_endpoint(websocket: WebSocket):
             session_id = message.get("session_id")
             if session_id:
                 app.state.voice_agent.set_session_id(session_id)
-                logger.debug(f"WebSocket session_id set: {session_id}")
-
-            # テキストメッセージ（互換: type='message' か 'text'）
-            if msg_type in ("message", "text"):
-                text_payload = message.get("message") or message.get("content") or ""
-                response = await app.state.voice_agent.process_text(text_payload)
-
-                await websocket.send_json({
-                    "type": "response",
-                    "content": response.get("text", ""),
-                    "audio_url": response.get("audio_url")
-                })
-
-            # 設定更新
-            elif msg_type == "config_update":
-                cfg = message.get("config", {}) or {}
-
-                # 既存の構成と整合する形に変換
-                llm_updates = {}
-                tts_updates = {}
-
-                if "llm_provider" in cfg:
-                    llm_updates["primary_provider"] = cfg["llm_provider"]
-                if "tts_provider" in cfg:
-                    tts_updates["provider"] = cfg["tts_provider"]
-
-                updates = {}
-                if llm_updates:
-                    updates["llm"] = llm_updates
-                if tts_updates:
-                    updates["tts"] = tts_updates
-
-                if updates:
-                    await app.state.voice_agent.update_config(updates)
-
-                await websocket.send_json({
-                    "type": "status",
-                    "status": "configured",
-                    "applied": updates
-                })
-
-            # 会話リセット
-            elif msg_type == "reset":
-                try:
-                    await app.state.voice_agent.context.reset_context()
-                    await websocket.send_json({
-                        "type": "status",
-                        "status": "reset_done"
-                    })
-                except Exception as e:
-                    logger.error(f"Failed to reset context: {e}")
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "コンテキストのリセットに失敗しました"
-                    })
-
-            # 個人情報保存
-            elif msg_type == "save_personal_info":
-                personal_info = message.get("personal_info", {})
-                try:
-                    # メモリツール経由で個人情報を保存
-                    memory_tool = app.state.voice_agent.tools.get_tool("memory")
-                    if memory_tool:
-                        await memory_tool.store_personal_info(personal_info)
-                    else:
-                        raise Exception("Memory tool not found")
-                    await websocket.send_json({
-                        "type": "status",
-                        "status": "personal_info_saved",
-                        "message": "個人情報を保存しました"
-                    })
-                    logger.info(f"Personal information saved: {personal_info}")
-                except Exception as e:
-                    logger.error(f"Failed to save personal information: {e}")
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "個人情報の保存に失敗しました"
-                    })
-
-            # ステータス要求
-            elif msg_type == "status_request":
-                status = await app.state.voice_agent.get_status()
-                await websocket.send_json({
-                    "type": "status",
-                    "status": status
-                })
-
-            else:
-                logger.warning(f"Unknown chat message type: {msg_type}")
-                await websocket.send_json({
-                    "type": "error",
-                    "message": f"Unknown message type: {msg_type}"
-                })
+                logger.debug("WebSocket session_id set: {}", session_id)
+
+            handler = CHAT_MESSAGE_HANDLERS.get(msg_type)
+            if handler is not None:
+                await handler(websocket, message)
+                continue
+
+            now = time.monotonic()
+            unknown_message_times.append(now)
+            while unknown_message_times[0] < now - UNKNOWN_MESSAGE_WINDOW:
+                unknown_message_times.popleft()
+            if len(unknown_message_times) > MAX_UNKNOWN_MESSAGES:
+                logger.warning("Too many unknown chat messages, closing connection")
+                websocket_manager.disconnect(websocket)
+                await websocket.close(code=1008)
+                return
+
+            logger.debug("Unknown chat message type: {}", msg_type)
+            websocket_manager.enqueue_json(UNKNOWN_MESSAGE_ERROR, websocket)
 
     except WebSocketDisconnect:
         logger.info("Chat WebSocket disconnected")
@@ -279,7 +414,7 @@ async def configure_agent(config: dict):
 async def get_personality_type():
     """性格タイプの取得"""
     try:
-        memory_tool = app.state.voice_agent.tools.get_tool("memory")
+        memory_tool = app.state.tools.get_tool("memory")
         if not memory_tool:
             return {"error": "Memory tool not found"}
 
@@ -290,25 +425,43 @@ async def get_personality_type():
         return {"error": str(e)}
 
 
+# 利用可能なLLMモデル一覧（起動後に変化しないため、シリアライズ済みのJSONとETagを1回だけ作る）
+AVAILABLE_LLM_MODELS = {
+    "claude": [
+        {"value": "claude-3-5-sonnet-20241022", "label": "Claude 3.5 Sonnet (最新)", "description": "最も高性能なモデル"},
+        {"value": "claude-3-5-haiku-20241022", "label": "Claude 3.5 Haiku (高速)", "description": "高速で低コスト"},
+        {"value": "claude-3-opus-20240229", "label": "Claude 3 Opus (高性能)", "description": "Claude 3の最高性能モデル"},
+        {"value": "claude-3-sonnet-20240229", "label": "Claude 3 Sonnet (バランス)", "description": "性能とコストのバランス"},
+        {"value": "claude-3-haiku-20240307", "label": "Claude 3 Haiku (高速・低コスト)", "description": "最も高速で低コスト"}
+    ],
+    "openai": [
+        {"value": "gpt-4o", "label": "GPT-4o (最新・最速)", "description": "最新の高性能モデル"},
+        {"value": "gpt-4o-mini", "label": "GPT-4o Mini (高速・低コスト)", "description": "GPT-4oの小型版"},
+        {"value": "gpt-4-turbo", "label": "GPT-4 Turbo", "description": "GPT-4の高速版"},
+        {"value": "gpt-4", "label": "GPT-4", "description": "標準のGPT-4"},
+        {"value": "gpt-3.5-turbo", "label": "GPT-3.5 Turbo", "description": "高速で低コスト"}
+    ]
+}
+AVAILABLE_LLM_MODELS_JSON = dumps_json_bytes(AVAILABLE_LLM_MODELS)
+AVAILABLE_LLM_MODELS_ETAG = f'"{hashlib.blake2b(AVAILABLE_LLM_MODELS_JSON, digest_size=8).hexdigest()}"'
+# 圧縮済みの本文（リクエストごとにミドルウェアで圧縮し直さない）
+AVAILABLE_LLM_MODELS_JSON_GZ = gzip.compress(AVAILABLE_LLM_MODELS_JSON, compresslevel=6)
+# 圧縮した本文は別の表現のため、非圧縮の本文とは別のETagを付ける
+AVAILABLE_LLM_MODELS_ETAG_GZ = f'{AVAILABLE_LLM_MODELS_ETAG[:-1]}-gzip"'
+
+
 @app.get("/api/llm/models")
-async def get_available_models():
-    """利用可能なLLMモデル一覧を取得"""
-    return {
-        "claude": [
-            {"value": "claude-3-5-sonnet-20241022", "label": "Claude 3.5 Sonnet (最新)", "description": "最も高性能なモデル"},
-            {"value": "claude-3-5-haiku-20241022", "label": "Claude 3.5 Haiku (高速)", "description": "高速で低コスト"},
-            {"value": "claude-3-opus-20240229", "label": "Claude 3 Opus (高性能)", "description": "Claude 3の最高性能モデル"},
-            {"value": "claude-3-sonnet-20240229", "label": "Claude 3 Sonnet (バランス)", "description": "性能とコストのバランス"},
-            {"value": "claude-3-haiku-20240307", "label": "Claude 3 Haiku (高速・低コスト)", "description": "最も高速で低コスト"}
-        ],
-        "openai": [
-            {"value": "gpt-4o", "label": "GPT-4o (最新・最速)", "description": "最新の高性能モデル"},
-            {"value": "gpt-4o-mini", "label": "GPT-4o Mini (高速・低コスト)", "description": "GPT-4oの小型版"},
-            {"value": "gpt-4-turbo", "label": "GPT-4 Turbo", "description": "GPT-4の高速版"},
-            {"value": "gpt-4", "label": "GPT-4", "description": "標準のGPT-4"},
-            {"value": "gpt-3.5-turbo", "label": "GPT-3.5 Turbo", "description": "高速で低コスト"}
-        ]
-    }
+async def get_available_models(request: Request):
+    """利用可能なLLMモデル一覧を取得（ETagが一致する場合は304を返す）"""
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    etag = AVAILABLE_LLM_MODELS_ETAG_GZ if use_gzip else AVAILABLE_LLM_MODELS_ETAG
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(AVAILABLE_LLM_MODELS_JSON_GZ, media_type="application/json", headers=headers)
+    return Response(AVAILABLE_LLM_MODELS_JSON, media_type="application/json", headers=headers)
 
 
 @app.get("/api/llm/current")
@@ -362,7 +515,7 @@ async def switch_llm_model(request: dict):
 async def get_available_tools():
     """利用可能なツール一覧を取得"""
     try:
-        tools = app.state.voice_agent.tools.get_available_tools()
+        tools = app.state.tools.get_available_tools()
         return {"tools": tools}
     except Exception as e:
         logger.error(f"Failed to get tools: {e}")
@@ -412,7 +565,7 @@ async def get_current_mode():
     """現在のAIモード設定を取得"""
     try:
         # メモリツールから現在のモードを取得
-        memory_tool = app.state.voice_agent.tools.get_tool("memory")
+        memory_tool = app.state.tools.get_tool("memory")
         if memory_tool:
             mode = await memory_tool.get_ai_mode()
             return {"mode": mode or "assist"}  # デフォルトはアシストモード
@@ -432,7 +585,7 @@ async def switch_mode(request: dict):
             return {"error": "Valid mode is required (assist, auto)"}
 
         # メモリツールにモードを保存
-        memory_tool = app.state.voice_agent.tools.get_tool("memory")
+        memory_tool = app.state.tools.get_tool("memory")
         if memory_tool:
             await memory_tool.set_ai_mode(mode)
 
@@ -454,21 +607,44 @@ async def switch_mode(request: dict):
         return {"error": str(e)}
 
 
+def _resolve_audio_path(audio_url: str) -> str:
+    """TTSが返す音声URLを実際のファイルパスに変換（/data/xxx -> ./data/xxx）"""
+    if audio_url.startswith("/data/"):
+        return "." + audio_url
+    return audio_url
+
+
+async def _read_audio_base64(audio_path: str) -> str:
+    """音声ファイルを読み込んでBase64エンコード（読み込み中もイベントループを止めない）"""
+    async with aiofiles.open(audio_path, 'rb') as f:
+        audio_bytes = await f.read()
+    return base64.b64encode(audio_bytes).decode('utf-8')
+
+
 @app.post("/api/tts")
-async def text_to_speech(request: dict):
-    """テキストを音声に変換"""
+async def text_to_speech(request: dict, encoding: Optional[str] = None):
+    """
+    テキストを音声に変換
+
+    音声ファイルをバイナリのままレスポンスとして返す。
+    encoding=base64 を指定した場合は従来どおりBase64文字列を含むJSONを返す
+    """
     try:
         text = request.get("text")
 
         if not text:
             return {"error": "Text is required"}
 
-        # TTSで音声生成
-        audio_data = await app.state.voice_agent.tts.synthesize(text)
+        # TTSで音声生成（音声URLが返される。ブラウザTTSの場合は空文字列）
+        audio_url = await app.state.voice_agent.tts.synthesize(text)
+        if not audio_url:
+            return {"error": "TTS synthesis failed - no audio path returned"}
+
+        audio_path = _resolve_audio_path(audio_url)
+        if encoding != "base64":
+            return FileResponse(audio_path)
 
-        # Base64エンコード
-        import base64
-        audio_base64 = base64.b64encode(audio_data).decode('utf-8')
+        audio_base64 = await _read_audio_base64(audio_path)
 
         return {
             "success": True,
@@ -480,11 +656,18 @@ async def text_to_speech(request: dict):
         return {"error": str(e)}
 
 
+def _tool_result_response(result: ToolResult, build: Callable[[Any], Dict[str, Any]]) -> Dict[str, Any]:
+    """ツールの実行結果をAPIレスポンスに変換（成功時は build で結果を整形し、失敗時はエラーを返す）"""
+    if not result.success:
+        return {"error": result.error}
+    return {"success": True, **build(result.result)}
+
+
 @app.post("/api/alarms/set")
 async def set_alarm(request: dict):
     """アラームを設定"""
     try:
-        alarm_tool = app.state.voice_agent.tools.get_tool("alarm")
+        alarm_tool = app.state.tools.get_tool("alarm")
         if not alarm_tool:
             return {"error": "Alarm tool not available"}
 
@@ -496,17 +679,7 @@ async def set_alarm(request: dict):
             "repeat": request.get("repeat", False)
         })
 
-        if isinstance(result, ToolResult):
-            if result.success:
-                return {
-                    "success": True,
-                    "alarm": result.result.get("alarm"),
-                    "message": result.result.get("message")
-                }
-            else:
-                return {"error": result.error}
-
-        return {"error": "Unexpected response from alarm tool"}
+        return _tool_result_response(result, lambda r: {"alarm": r.get("alarm"), "message": r.get("message")})
 
     except Exception as e:
         logger.error(f"Failed to set alarm: {e}")
@@ -517,23 +690,13 @@ async def set_alarm(request: dict):
 async def list_alarms():
     """アラーム一覧を取得"""
     try:
-        alarm_tool = app.state.voice_agent.tools.get_tool("alarm")
+        alarm_tool = app.state.tools.get_tool("alarm")
         if not alarm_tool:
             return {"error": "Alarm tool not available"}
 
         result = await alarm_tool.execute({"action": "list"})
 
-        if isinstance(result, ToolResult):
-            if result.success:
-                return {
-                    "success": True,
-                    "alarms": result.result.get("alarms", []),
-                    "count": result.result.get("count", 0)
-                }
-            else:
-                return {"error": result.error}
-
-        return {"error": "Unexpected response from alarm tool"}
+        return _tool_result_response(result, lambda r: {"alarms": r.get("alarms", []), "count": r.get("count", 0)})
 
     except Exception as e:
         logger.error(f"Failed to list alarms: {e}")
@@ -544,7 +707,7 @@ async def list_alarms():
 async def delete_alarm(request: dict):
     """アラームを削除"""
     try:
-        alarm_tool = app.state.voice_agent.tools.get_tool("alarm")
+        alarm_tool = app.state.tools.get_tool("alarm")
         if not alarm_tool:
             return {"error": "Alarm tool not available"}
 
@@ -553,16 +716,7 @@ async def delete_alarm(request: dict):
             "alarm_id": request.get("alarm_id")
         })
 
-        if isinstance(result, ToolResult):
-            if result.success:
-                return {
-                    "success": True,
-                    "message": result.result.get("message")
-                }
-            else:
-                return {"error": result.error}
-
-        return {"error": "Unexpected response from alarm tool"}
+        return _tool_result_response(result, lambda r: {"message": r.get("message")})
 
     except Exception as e:
         logger.error(f"Failed to delete alarm: {e}")
@@ -573,7 +727,7 @@ async def delete_alarm(request: dict):
 async def get_table_tasks():
     """テーブルタスク一覧を取得"""
     try:
-        memory_tool = app.state.voice_agent.tools.get_tool("memory")
+        memory_tool = app.state.tools.get_tool("memory")
         if not memory_tool:
             return {"success": False, "error": "Memory tool not available", "tasks": []}
 
@@ -592,7 +746,7 @@ async def get_table_tasks():
 async def add_table_task(request: dict):
     """テーブルタスクを追加"""
     try:
-        memory_tool = app.state.voice_agent.tools.get_tool("memory")
+        memory_tool = app.state.tools.get_tool("memory")
         if not memory_tool:
             return {"success": False, "error": "Memory tool not available"}
 
@@ -616,7 +770,7 @@ async def add_table_task(request: dict):
 async def update_table_task(request: dict):
     """テーブルタスクを更新"""
     try:
-        memory_tool = app.state.voice_agent.tools.get_tool("memory")
+        memory_tool = app.state.tools.get_tool("memory")
         if not memory_tool:
             return {"success": False, "error": "Memory tool not available"}
 
@@ -636,8 +790,14 @@ async def update_table_task(request: dict):
 
 
 @app.post("/api/alarms/trigger")
-async def trigger_alarm(request: dict):
-    """アラームを発動してAIエージェントに読み上げさせる"""
+async def trigger_alarm(request: dict, encoding: Optional[str] = None):
+    """
+    アラームを発動してAIエージェントに読み上げさせる
+
+    読み上げ音声をバイナリのままレスポンスとして返し、読み上げテキストは
+    X-Alarm-Text ヘッダー（URLエンコード）に入れる。
+    encoding=base64 を指定した場合は従来どおりBase64文字列を含むJSONを返す
+    """
     try:
         message = request.get("message", "アラームの時間です")
 
@@ -647,17 +807,11 @@ async def trigger_alarm(request: dict):
         if not audio_path:
             raise Exception("TTS synthesis failed - no audio path returned")
 
-        # ファイルパスから実際のファイルパスに変換（/data/xxx -> ./data/xxx）
-        if audio_path.startswith("/data/"):
-            actual_path = "." + audio_path
-        else:
-            actual_path = audio_path
+        actual_path = _resolve_audio_path(audio_path)
+        if encoding != "base64":
+            return FileResponse(actual_path, headers={"X-Alarm-Text": quote(message)})
 
-        # ファイルを読み込んでBase64エンコード
-        import base64
-        with open(actual_path, 'rb') as f:
-            audio_bytes = f.read()
-        audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
+        audio_base64 = await _read_audio_base64(actual_path)
 
         return {
             "success": True,
@@ -669,17 +823,16 @@ async def trigger_alarm(request: dict):
         logger.error(f"Failed to trigger alarm: {e}")
         import traceback
         logger.error(traceback.format_exc())
-        return {
+        return FastJSONResponse({
             "success": False,
             "error": str(e)
-        }
+        }, status_code=500)
 
 
-@app.get("/api/gmail/info")
-async def get_gmail_info():
+async def _get_gmail_info() -> Dict[str, Any]:
     """Gmail連携情報を取得"""
     try:
-        gmail_tool = app.state.voice_agent.tools.get_tool("gmail")
+        gmail_tool = app.state.tools.get_tool("gmail")
         if not gmail_tool:
             return {"connected": False, "error": "Gmail tool not available"}
 
@@ -692,7 +845,7 @@ async def get_gmail_info():
             # 認証済みの場合、ユーザー情報を取得
             try:
                 # Gmail APIでユーザープロフィールを取得
-                profile = gmail_tool.service.users().getProfile(userId='me').execute()
+                profile = await execute_request(gmail_tool.service.users().getProfile(userId='me'))
                 email_address = profile.get('emailAddress')
 
                 return {
@@ -710,11 +863,44 @@ async def get_gmail_info():
         return {"connected": False, "error": str(e)}
 
 
-@app.get("/api/calendar/info")
-async def get_calendar_info():
+@app.get("/api/gmail/info")
+async def get_gmail_info():
+    """Gmail連携情報を取得"""
+    return await _get_gmail_info()
+
+
+# カレンダーMCPサーバーが保存するOAuthトークン
+CALENDAR_TOKEN_FILE = "./mcp_servers/calendar-mcp/.gcp-saved-tokens.json"
+# 読み込み済みのJSONファイル（パス → (更新時刻, 内容)）
+_json_file_cache: Dict[str, Tuple[float, Any]] = {}
+
+
+async def _read_json_file_cached(path: str) -> Optional[Any]:
+    """
+    JSONファイルを読み込み（更新時刻が変わるまではパース済みの内容を返す）
+
+    ファイルが存在しない場合はNoneを返す
+    """
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        _json_file_cache.pop(path, None)
+        return None
+
+    cached = _json_file_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    async with aiofiles.open(path, 'rb') as f:
+        data = loads_json(await f.read())
+    _json_file_cache[path] = (mtime, data)
+    return data
+
+
+async def _get_calendar_info() -> Dict[str, Any]:
     """カレンダー連携情報を取得"""
     try:
-        calendar_tool = app.state.voice_agent.tools.get_tool("calendar")
+        calendar_tool = app.state.tools.get_tool("calendar")
         if not calendar_tool:
             return {"connected": False, "error": "Calendar tool not available"}
 
@@ -722,18 +908,13 @@ async def get_calendar_info():
         if hasattr(calendar_tool, 'service') and calendar_tool.service:
             try:
                 # トークンファイルから情報を読み取る
-                import json
-                import os
-                token_file = "./mcp_servers/calendar-mcp/.gcp-saved-tokens.json"
-
                 email = "連携済み"
-                if os.path.exists(token_file):
-                    with open(token_file, 'r') as f:
-                        token_data = json.load(f)
-                        email = token_data.get("account", email)
+                token_data = await _read_json_file_cached(CALENDAR_TOKEN_FILE)
+                if token_data:
+                    email = token_data.get("account", email)
 
                 # カレンダー一覧を取得
-                calendar_list = calendar_tool.service.calendarList().list().execute()
+                calendar_list = await execute_request(calendar_tool.service.calendarList().list())
                 calendars = [cal.get('summary', 'Unnamed') for cal in calendar_list.get('items', [])]
 
                 return {
@@ -752,6 +933,22 @@ async def get_calendar_info():
         return {"connected": False, "error": str(e)}
 
 
+@app.get("/api/calendar/info")
+async def get_calendar_info():
+    """カレンダー連携情報を取得"""
+    return await _get_calendar_info()
+
+
+@app.get("/api/integrations/info")
+async def get_integrations_info():
+    """Gmail・カレンダーの連携情報をまとめて取得（両方のGoogle API呼び出しを並行して行う）"""
+    gmail_info, calendar_info = await asyncio.gather(_get_gmail_info(), _get_calendar_info())
+    return {
+        "gmail": gmail_info,
+        "calendar": calendar_info
+    }
+
+
 @app.post("/api/vision/analyze")
 async def analyze_vision(request: Request):
     """画像を分析"""
@@ -764,7 +961,7 @@ async def analyze_vision(request: Request):
             return {"success": False, "error": "画像データが必要です"}
 
         # Visionツールを取得
-        vision_tool = app.state.voice_agent.tools.get_tool("vision")
+        vision_tool = app.state.tools.get_tool("vision")
         if not vision_tool:
             return {"success": False, "error": "Vision tool not available"}
 
@@ -774,13 +971,8 @@ async def analyze_vision(request: Request):
             "query": query
         })
 
-        # ToolResultの場合は結果を抽出
-        if isinstance(result, ToolResult):
-            analysis_text = result.result
-            success = result.success
-        else:
-            analysis_text = str(result)
-            success = True
+        analysis_text = result.result
+        success = result.success
 
         # TTS音声合成
         audio_url = await app.state.voice_agent.tts.synthesize(analysis_text)
@@ -798,15 +990,18 @@ async def analyze_vision(request: Request):
 
 if __name__ == "__main__":
     import uvicorn
+    from src.core.server_config import get_uvicorn_options, get_worker_count, is_reload_enabled
 
     host = os.getenv("HOST", "localhost")
     port = int(os.getenv("PORT", 8000))
-    debug = os.getenv("DEBUG", "true").lower() == "true"
+    reload = is_reload_enabled()
 
     uvicorn.run(
         "src.main:app",
         host=host,
         port=port,
-        reload=debug,
-        log_level="info"
+        reload=reload,
+        log_level="info",
+        workers=get_worker_count(reload=reload),
+        **get_uvicorn_options()
     )
@@ -0,0 +1,132 @@
+"""
+HNSW Store - usearch によるメモリのベクトル索引
+
+埋め込みベクトルをHNSW索引（usearch）に、本文とメタデータをIDをキーにした
+辞書に保持する。ChromaDBより呼び出しごとのオーバーヘッドが小さく、
+この規模のメモリでは検索がサブミリ秒で完了する
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+try:
+    from usearch.index import Index
+    USEARCH_AVAILABLE = True
+except ImportError:
+    USEARCH_AVAILABLE = False
+
+
+class HNSWMemoryStore:
+    """
+    HNSW索引とメタデータのサイドカーファイルによるメモリストア
+
+    索引は db_path/usearch.bin、本文とメタデータは db_path/usearch_meta.json に保存する。
+    保存は索引全体の書き出しになるため、save_interval 秒に1回と終了時にまとめて行う。
+    add・save はイベントループを止めないよう別スレッドから呼ぶ前提で、両者をロックで直列化する
+    """
+
+    def __init__(self, db_path: str, save_interval: float = 30.0):
+        self.index_path = os.path.join(db_path, "usearch.bin")
+        self.meta_path = os.path.join(db_path, "usearch_meta.json")
+        self.save_interval = save_interval
+
+        self.index: Optional["Index"] = None
+        self.entries: Dict[int, Dict[str, Any]] = {}
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._lock = threading.Lock()
+
+    def load(self):
+        """保存済みの索引とメタデータを読み込み（ない場合は最初の追加時に索引を作成）"""
+        if not (os.path.exists(self.index_path) and os.path.exists(self.meta_path)):
+            return
+
+        self.index = Index.restore(self.index_path)
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            self.entries = {int(key): value for key, value in json.load(f).items()}
+        logger.info(f"Loaded {len(self.entries)} memory entries from HNSW index")
+
+    @staticmethod
+    def key_for(memory_id: str) -> int:
+        """メモリID（16進文字列）を索引のキー（60ビット整数）に変換"""
+        return int(memory_id[:15], 16)
+
+    def _create_index(self, ndim: int) -> "Index":
+        return Index(
+            ndim=ndim,
+            metric="cos",
+            # 正規化済みの埋め込みはint8に量子化しても検索精度がほとんど落ちず、
+            # float32の1/4のメモリで済む（保存済みの索引は保存時の型のまま読み込まれる）
+            dtype="i8",
+            connectivity=16,
+            expansion_add=64,
+            expansion_search=64
+        )
+
+    def add(
+        self,
+        memory_ids: List[str],
+        embeddings: List[List[float]],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]]
+    ):
+        """メモリエントリをまとめて追加（登録済みのIDは読み飛ばす）"""
+        with self._lock:
+            keys, vectors = [], []
+            for memory_id, embedding, document, metadata in zip(memory_ids, embeddings, documents, metadatas):
+                key = self.key_for(memory_id)
+                if key in self.entries:
+                    continue
+                self.entries[key] = {"content": document, **metadata}
+                keys.append(key)
+                vectors.append(embedding)
+
+            if not keys:
+                return
+
+            vectors = np.asarray(vectors, dtype=np.float32)
+            if self.index is None:
+                self.index = self._create_index(vectors.shape[1])
+            self.index.add(np.asarray(keys, dtype=np.uint64), vectors)
+            self._dirty = True
+
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def search(self, embedding: List[float], limit: int) -> List[Tuple[Dict[str, Any], float]]:
+        """埋め込みベクトルに近いエントリを (エントリ, コサイン距離) のリストで返す"""
+        if self.index is None or len(self.index) == 0:
+            return []
+
+        matches = self.index.search(np.asarray(embedding, dtype=np.float32), limit)
+        return [
+            (self.entries[int(key)], float(distance))
+            for key, distance in zip(matches.keys, matches.distances)
+            if int(key) in self.entries
+        ]
+
+    def find(self, category: str) -> List[Dict[str, Any]]:
+        """カテゴリが一致するエントリを全て返す"""
+        # 別スレッドでの追加と並行して呼ばれるため、走査前にスナップショットを取る
+        return [entry for entry in list(self.entries.values()) if entry.get("category") == category]
+
+    def count(self) -> int:
+        return len(self.entries)
+
+    def save(self):
+        """変更があれば索引とメタデータをファイルに保存"""
+        with self._lock:
+            if not self._dirty or self.index is None:
+                return
+
+            self.index.save(self.index_path)
+            with open(self.meta_path, 'w', encoding='utf-8') as f:
+                json.dump({str(key): value for key, value in self.entries.items()}, f, ensure_ascii=False)
+            self._dirty = False
+            self._last_save = time.monotonic()
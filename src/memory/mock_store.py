@@ -0,0 +1,248 @@
+"""
+Mock Store - ベクトルDBがない環境用の列指向メモリストア
+
+エントリ本体（辞書）とは別に、検索・絞り込みに使う列（タイムスタンプ、カテゴリ、
+埋め込み）をNumPy配列で保持し、期限切れの削除やカテゴリでの絞り込みを
+Pythonのループではなく配列演算で行う
+"""
+
+import os
+import json
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+# メモリカテゴリの列に格納する整数コード
+MEMORY_CATEGORY_CODES: Dict[str, int] = {
+    "conversation": 0,
+    "preference": 1,
+    "fact": 2,
+    "instruction": 3,
+    "context": 4,
+}
+UNKNOWN_CATEGORY_CODE = 255
+
+# 埋め込み行列はfloat16で保持し（メモリ使用量と検索時のメモリ帯域を半分にする）、
+# 類似度はL2キャッシュに収まる行数ごとにfloat32に変換して計算する
+EMBEDDING_DTYPE = np.float16
+SEARCH_BLOCK_ROWS = 4096
+
+# fdatasync はメタデータの同期を省けるため高速（macOS等の未対応環境では fsync を使う）
+_datasync = getattr(os, "fdatasync", os.fsync)
+
+
+def _timestamp_ns(timestamp: Optional[str]) -> np.datetime64:
+    """ISO形式のタイムスタンプを列の値に変換（不正な値は NaT とし、期限切れとして扱う）"""
+    try:
+        return np.datetime64(timestamp, "ns") if timestamp else np.datetime64("NaT", "ns")
+    except ValueError:
+        return np.datetime64("NaT", "ns")
+
+
+class MockMemoryStore:
+    """
+    列指向のモックメモリストア
+
+    i番目のエントリ records[i] に対して、timestamps[i]・categories[i]・embeddings[i] が対応する。
+    エントリは追記専用のログ mock_memories.jsonl（1行1エントリ）に追加していき、
+    古いエントリを削除した場合のみログ全体を書き直す。埋め込みは各行に対応するエントリのIDと共に
+    mock_embeddings.npz に保存し、次回起動時はIDの並びが一致すれば埋め込みを再計算せずに読み込む
+    """
+
+    def __init__(self, db_path: str, chunk_rows: int = 1024):
+        self.log_path = os.path.join(db_path, "mock_memories.jsonl")
+        # 以前の形式（全エントリを1つのJSON配列で保存）
+        self.legacy_path = os.path.join(db_path, "mock_memories.json")
+        self.embeddings_path = os.path.join(db_path, "mock_embeddings.npz")
+        self.chunk_rows = chunk_rows
+
+        self.records: List[Dict[str, Any]] = []
+        self.timestamps = np.empty(0, dtype="datetime64[ns]")
+        self.categories = np.empty(0, dtype=np.uint8)
+        # タイムスタンプ列が昇順か（会話は時系列順に追加されるため通常は昇順）
+        self._timestamps_sorted = True
+        # 埋め込み行列（エンコーダーがある場合のみ、chunk_rows 行単位で領域を確保する）
+        self._embeddings: Optional[np.ndarray] = None
+
+    @property
+    def has_embeddings(self) -> bool:
+        return self._embeddings is not None
+
+    def count(self) -> int:
+        return len(self.records)
+
+    def load(self):
+        """保存済みのエントリを読み込み（以前の形式のファイルしかない場合はログに変換する）"""
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self.records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # 書き込み途中で終了した最終行は読み飛ばす
+                        logger.warning("Skipping truncated mock memory log entry")
+        elif os.path.exists(self.legacy_path):
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                self.records = json.load(f)
+            self.compact()
+        else:
+            return
+
+        self._append_columns(self.records)
+        logger.info(f"Loaded {len(self.records)} mock memory entries")
+
+    @staticmethod
+    def _record_key(memory: Dict[str, Any]) -> str:
+        """埋め込みの行とエントリの対応を確認するためのキー（IDのない以前のエントリは本文と時刻）"""
+        return memory.get("id") or f"{memory.get('content', '')}{memory.get('timestamp', '')}"
+
+    def load_embeddings(self) -> bool:
+        """
+        保存済みの埋め込みを読み込み
+
+        保存時のエントリのIDの並びが現在のエントリと一致しない場合（保存後に追記・削除された場合）は読み込まない
+        """
+        if not os.path.exists(self.embeddings_path):
+            return False
+
+        with np.load(self.embeddings_path) as data:
+            if "ids" not in data.files:
+                return False
+            embeddings = data["embeddings"]
+            ids = data["ids"]
+        if len(ids) != len(self.records) or list(ids) != [self._record_key(memory) for memory in self.records]:
+            return False
+
+        self._embeddings = embeddings.astype(EMBEDDING_DTYPE, copy=False)
+        return True
+
+    def set_embeddings(self, embeddings: List[List[float]]):
+        """全エントリの埋め込みを設定し、以降の追加・検索で埋め込みを使う"""
+        self._embeddings = np.empty((0, 0), dtype=EMBEDDING_DTYPE)
+        if len(embeddings):
+            self._append_embeddings(0, embeddings)
+
+    def append_log(self, memories: List[Dict[str, Any]]):
+        """
+        追加したエントリをログの末尾に書き込み、ディスクに同期
+
+        複数のエントリを1回の書き込みと1回の同期でまとめて永続化する（グループコミット）
+        """
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write("".join(json.dumps(memory, ensure_ascii=False) + "\n" for memory in memories))
+            f.flush()
+            _datasync(f.fileno())
+
+    def compact(self):
+        """現在のエントリでログ全体を書き直す（削除したエントリをログから除く）"""
+        temp_path = self.log_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write("".join(json.dumps(memory, ensure_ascii=False) + "\n" for memory in self.records))
+            f.flush()
+            _datasync(f.fileno())
+        os.replace(temp_path, self.log_path)
+
+    def save_embeddings(self):
+        """埋め込みをファイルに保存"""
+        if self._embeddings is not None:
+            np.savez_compressed(
+                self.embeddings_path,
+                embeddings=self._embeddings[:len(self.records)],
+                ids=np.array([self._record_key(memory) for memory in self.records], dtype=np.str_)
+            )
+
+    def add(self, memories: List[Dict[str, Any]], embeddings: Optional[List[List[float]]] = None):
+        """エントリを追加（埋め込みを使う場合は embeddings も同じ順序で渡す）"""
+        if self._embeddings is not None:
+            self._append_embeddings(len(self.records), embeddings)
+        self._append_columns(memories)
+        self.records.extend(memories)
+
+    def _append_columns(self, memories: List[Dict[str, Any]]):
+        timestamps = np.array([_timestamp_ns(memory.get("timestamp")) for memory in memories], dtype="datetime64[ns]")
+        if self._timestamps_sorted and len(timestamps):
+            self._timestamps_sorted = bool(
+                not np.isnat(timestamps).any()
+                and (np.diff(timestamps) >= np.timedelta64(0, "ns")).all()
+                and (len(self.timestamps) == 0 or timestamps[0] >= self.timestamps[-1])
+            )
+        self.timestamps = np.concatenate([self.timestamps, timestamps])
+        self.categories = np.concatenate([
+            self.categories,
+            np.array(
+                [MEMORY_CATEGORY_CODES.get(memory.get("category"), UNKNOWN_CATEGORY_CODE) for memory in memories],
+                dtype=np.uint8
+            )
+        ])
+
+    def _append_embeddings(self, current: int, embeddings):
+        """埋め込み行列の current 行目以降に行を追加（追加のたびに行列を作り直さないよう、chunk_rows 行単位で確保する）"""
+        rows = np.asarray(embeddings, dtype=EMBEDDING_DTYPE)
+        needed = current + len(rows)
+        if needed > self._embeddings.shape[0]:
+            capacity = -(-needed // self.chunk_rows) * self.chunk_rows
+            matrix = np.empty((capacity, rows.shape[1]), dtype=EMBEDDING_DTYPE)
+            if current:
+                matrix[:current] = self._embeddings[:current]
+            self._embeddings = matrix
+
+        self._embeddings[current:needed] = rows
+
+    def prune_before(self, cutoff: datetime) -> int:
+        """
+        cutoff より古いエントリを削除し、削除した件数を返す
+
+        タイムスタンプ列が昇順の場合は二分探索で境界を求め、先頭から切り捨てる
+        """
+        cutoff_ns = np.datetime64(cutoff.isoformat(), "ns")
+        if self._timestamps_sorted:
+            deleted = int(np.searchsorted(self.timestamps, cutoff_ns, side="left"))
+            if deleted:
+                self.records = self.records[deleted:]
+                self.timestamps = self.timestamps[deleted:]
+                self.categories = self.categories[deleted:]
+                if self._embeddings is not None:
+                    self._embeddings = self._embeddings[deleted:]
+            return deleted
+
+        keep = self.timestamps >= cutoff_ns
+        deleted = int(len(keep) - np.count_nonzero(keep))
+        if not deleted:
+            return 0
+
+        indices = np.flatnonzero(keep)
+        self.records = [self.records[i] for i in indices]
+        self.timestamps = self.timestamps[keep]
+        self.categories = self.categories[keep]
+        if self._embeddings is not None:
+            self._embeddings = self._embeddings[indices]
+        # 残ったエントリが昇順になっていれば、次回以降は二分探索を使う
+        self._timestamps_sorted = bool((np.diff(self.timestamps) >= np.timedelta64(0, "ns")).all())
+        return deleted
+
+    def find(self, category: str) -> List[Dict[str, Any]]:
+        """カテゴリが一致するエントリを全て返す"""
+        code = MEMORY_CATEGORY_CODES.get(category, UNKNOWN_CATEGORY_CODE)
+        return [self.records[i] for i in np.flatnonzero(self.categories == code)]
+
+    def search_embedding(self, embedding: List[float], limit: int) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        埋め込みの内積（正規化済みのためコサイン類似度）が高い順に (エントリ, 類似度) を返す
+
+        全エントリとの類似度はブロックごとの行列ベクトル積で計算し、上位 limit 件だけを部分ソートで取り出す
+        """
+        count = len(self.records)
+        if count == 0 or limit <= 0:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, count)
+            scores[start:end] = self._embeddings[start:end].astype(np.float32) @ query
+        limit = min(limit, count)
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(self.records[i], float(scores[i])) for i in top]
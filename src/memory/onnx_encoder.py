@@ -0,0 +1,106 @@
+"""
+ONNX Encoder - ONNX Runtimeによる文章エンコーダー
+
+sentence-transformers のモデルをONNXに変換してONNX Runtimeで推論する。
+PyTorchでの推論より高速なため、optimum と onnxruntime が利用可能な場合に使用する
+"""
+
+import os
+from typing import List, Optional, Union
+
+import numpy as np
+from loguru import logger
+
+try:
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from transformers import AutoTokenizer
+    ONNX_RUNTIME_AVAILABLE = True
+except ImportError:
+    ONNX_RUNTIME_AVAILABLE = False
+
+
+class OnnxSentenceEncoder:
+    """
+    ONNX Runtimeで推論する文章エンコーダー
+
+    SentenceTransformer.encode と同じ呼び出し方で使えるようにし、平均プーリングと
+    L2正規化は SentenceTransformer の all-MiniLM 系モデルと同じ処理を行う
+    """
+
+    def __init__(self, model, tokenizer, max_seq_length: int = 256):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_seq_length = max_seq_length
+
+    @classmethod
+    def load(cls, model_name: str, cache_dir: str) -> "OnnxSentenceEncoder":
+        """
+        ONNXモデルを読み込み（初回のみPyTorchモデルから変換して cache_dir に保存）
+
+        Args:
+            model_name: sentence-transformers のモデル名（例: all-MiniLM-L6-v2）
+            cache_dir: 変換済みONNXモデルの保存先
+        """
+        if os.path.exists(os.path.join(cache_dir, "model.onnx")):
+            model = ORTModelForFeatureExtraction.from_pretrained(cache_dir, provider="CPUExecutionProvider")
+            tokenizer = AutoTokenizer.from_pretrained(cache_dir)
+            return cls(model, tokenizer)
+
+        # SentenceTransformer と同様に、組織名のないモデル名は sentence-transformers/ のモデルとして扱う
+        model_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        logger.info(f"Exporting {model_id} to ONNX: {cache_dir}")
+        model = ORTModelForFeatureExtraction.from_pretrained(
+            model_id, export=True, provider="CPUExecutionProvider"
+        )
+        tokenizer = AutoTokenizer.from_pretrained(model_id)
+        model.save_pretrained(cache_dir)
+        tokenizer.save_pretrained(cache_dir)
+        return cls(model, tokenizer)
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False
+    ) -> np.ndarray:
+        """
+        文章を埋め込みベクトルに変換（単一の文字列の場合は1次元配列を返す）
+
+        show_progress_bar・convert_to_numpy は SentenceTransformer.encode との互換のための引数で、
+        常に進捗表示なし・NumPy配列で返す
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        # パディングを減らすため長さ順にまとめてエンコードし、最後に元の順序に戻す
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        embeddings: List[Optional[np.ndarray]] = [None] * len(texts)
+        for start in range(0, len(texts), batch_size):
+            indices = order[start:start + batch_size]
+            batch = self._encode_batch([texts[i] for i in indices], normalize_embeddings)
+            for index, embedding in zip(indices, batch):
+                embeddings[index] = embedding
+
+        result = np.stack(embeddings) if embeddings else np.empty((0, 0), dtype=np.float32)
+        return result[0] if single else result
+
+    def _encode_batch(self, texts: List[str], normalize_embeddings: bool) -> np.ndarray:
+        """1バッチ分の文章をエンコード（平均プーリング）"""
+        inputs = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np"
+        )
+        outputs = self.model(**inputs)
+
+        token_embeddings = outputs.last_hidden_state
+        mask = inputs["attention_mask"][..., np.newaxis].astype(token_embeddings.dtype)
+        embeddings = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        if normalize_embeddings:
+            embeddings = embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings.astype(np.float32)
@@ -6,7 +6,6 @@ RAGとベクトルDBを使用してユーザーとの会話を記憶・学習し
 """
 
 import os
-import json
 import hashlib
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
@@ -27,7 +26,37 @@ except ImportError:
     SENTENCE_TRANSFORMERS_AVAILABLE = False
     logger.warning("Sentence Transformers not available")
 
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
 import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from src.memory.hnsw_store import USEARCH_AVAILABLE, HNSWMemoryStore
+from src.memory.mock_store import MockMemoryStore
+from src.memory.query_cache import QueryResultCache
+from src.memory.onnx_encoder import ONNX_RUNTIME_AVAILABLE, OnnxSentenceEncoder
+
+# エンコーダーの推論専用のスレッド（1本）
+# 推論を直列化して、PyTorch・ONNX Runtime内部の並列処理が全コアを使えるようにする
+# （複数スレッドから同時に呼ぶとスレッド数がコア数を超えて遅くなる）
+_encoder_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-encoder")
+
+
+def _hash_hex(text: str, digest_size: int) -> str:
+    """
+    メモリIDなどの識別用ハッシュ（digest_size バイトの16進文字列）
+
+    BLAKE3が利用可能な場合はBLAKE3、ない場合はBLAKE2bを使う（いずれもMD5より高速）
+    """
+    data = text.encode("utf-8")
+    if BLAKE3_AVAILABLE:
+        return blake3.blake3(data).hexdigest(digest_size)
+    return hashlib.blake2b(data, digest_size=digest_size).hexdigest()
 
 
 class PersonalMemory:
@@ -40,6 +69,7 @@ class PersonalMemory:
     def __init__(self):
         self.chroma_client = None
         self.collection = None
+        self.hnsw_store: Optional[HNSWMemoryStore] = None
         self.encoder = None
         self.is_initialized = False
 
@@ -51,9 +81,31 @@ class PersonalMemory:
             "memory_retention_days": 365,
             "similarity_threshold": 0.7,
             "max_search_results": 5,
-            "db_path": "./data/memory/chroma_db"
+            "db_path": "./data/memory/chroma_db",
+            # 会話の保存はキューに溜め、まとめてエンコード・書き込みする
+            "write_batch_size": 32,
+            "write_flush_interval": 0.1,
+            # モックDBの埋め込み行列を拡張する単位（行数）
+            "mock_matrix_chunk_rows": 1024,
+            # 検索結果キャッシュ（ほぼ同じクエリの再検索を省く）
+            "query_cache_size": 256,
+            "query_cache_threshold": 0.95,
+            "query_cache_ttl": 60.0
         }
 
+        # 書き込み待ちのメモリエントリと、それを書き込むバックグラウンドタスク
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+
+        # ベクトルDBがない環境用のモックストア
+        self.mock_store: Optional[MockMemoryStore] = None
+
+        self.query_cache = QueryResultCache(
+            max_entries=self.config["query_cache_size"],
+            threshold=self.config["query_cache_threshold"],
+            ttl=self.config["query_cache_ttl"]
+        )
+
         # メモリカテゴリ
         self.memory_categories = {
             "conversation": "会話履歴",
@@ -78,19 +130,29 @@ class PersonalMemory:
             # データベースディレクトリの作成
             os.makedirs(self.config["db_path"], exist_ok=True)
 
-            # ChromaDBの初期化
-            if CHROMADB_AVAILABLE:
+            # 文章エンコーダーの初期化
+            if ONNX_RUNTIME_AVAILABLE or SENTENCE_TRANSFORMERS_AVAILABLE:
+                await self._initialize_encoder()
+
+            # ベクトルDBの初期化
+            # 埋め込みを自前で計算できる場合はHNSW索引（usearch）を優先し、次にChromaDBを使う
+            if USEARCH_AVAILABLE and self.encoder is not None:
+                await self._initialize_hnsw()
+            elif CHROMADB_AVAILABLE:
                 await self._initialize_chromadb()
             else:
                 await self._initialize_mock_db()
 
-            # 文章エンコーダーの初期化
-            if SENTENCE_TRANSFORMERS_AVAILABLE:
-                await self._initialize_encoder()
-
             # 古いメモリのクリーンアップ
             await self._cleanup_old_memories()
 
+            # モックDBでもエンコーダーがあれば埋め込みのコサイン類似度で検索する
+            if self.mock_store and self.encoder is not None:
+                await self._initialize_mock_embeddings()
+
+            self._write_queue = asyncio.Queue()
+            self._writer_task = asyncio.create_task(self._write_loop())
+
             self.is_initialized = True
             logger.info("Personal Memory system initialized successfully")
 
@@ -98,6 +160,57 @@ class PersonalMemory:
             logger.error(f"Failed to initialize Personal Memory system: {e}")
             raise
 
+    async def _initialize_hnsw(self):
+        """HNSW索引（usearch）の初期化"""
+        try:
+            self.hnsw_store = HNSWMemoryStore(self.config["db_path"])
+            await asyncio.to_thread(self.hnsw_store.load)
+
+            # ChromaDBで保存していたメモリは、索引が空の初回起動時に取り込む
+            if self.hnsw_store.count() == 0:
+                await self._import_chromadb_memories()
+
+            logger.info(f"Current memory entries: {self.hnsw_store.count()}")
+
+        except Exception as e:
+            logger.error(f"Failed to initialize HNSW index: {e}")
+            raise
+
+    async def _import_chromadb_memories(self):
+        """既存のChromaDBコレクションのメモリをHNSW索引に取り込む"""
+        if not os.path.exists(os.path.join(self.config["db_path"], "chroma.sqlite3")):
+            return
+        if not CHROMADB_AVAILABLE:
+            logger.warning("Existing ChromaDB memories found, but chromadb is not installed; they will not be imported")
+            return
+
+        def read_collection():
+            client = chromadb.PersistentClient(
+                path=self.config["db_path"],
+                settings=Settings(anonymized_telemetry=False, allow_reset=True)
+            )
+            try:
+                collection = client.get_collection(name=self.config["collection_name"])
+            except Exception:
+                return None
+            return collection.get(include=["documents", "metadatas"])
+
+        results = await asyncio.to_thread(read_collection)
+        if not results or not results["ids"]:
+            return
+
+        # 保存時のエンコーダーが異なる可能性があるため、埋め込みは現在のエンコーダーで計算し直す
+        documents = [document or "" for document in results["documents"]]
+        await asyncio.to_thread(
+            self.hnsw_store.add,
+            results["ids"],
+            await self._encode(documents),
+            documents,
+            [metadata or {} for metadata in results["metadatas"]]
+        )
+        await asyncio.to_thread(self.hnsw_store.save)
+        logger.info(f"Imported {len(results['ids'])} memory entries from ChromaDB into the HNSW index")
+
     async def _initialize_chromadb(self):
         """ChromaDBの初期化"""
         try:
@@ -134,26 +247,53 @@ class PersonalMemory:
     async def _initialize_mock_db(self):
         """モックデータベースの初期化"""
         logger.info("Using mock vector database")
-        self.mock_memories = []
+        self.mock_store = MockMemoryStore(self.config["db_path"], chunk_rows=self.config["mock_matrix_chunk_rows"])
 
         # 既存のモックデータを読み込み
-        mock_file = os.path.join(self.config["db_path"], "mock_memories.json")
         try:
-            if os.path.exists(mock_file):
-                with open(mock_file, 'r', encoding='utf-8') as f:
-                    self.mock_memories = json.load(f)
-                logger.info(f"Loaded {len(self.mock_memories)} mock memory entries")
+            self.mock_store.load()
         except Exception as e:
             logger.warning(f"Failed to load mock memories: {e}")
-            self.mock_memories = []
+            self.mock_store = MockMemoryStore(self.config["db_path"], chunk_rows=self.config["mock_matrix_chunk_rows"])
+
+    async def _initialize_mock_embeddings(self):
+        """モックDBの埋め込みを読み込み（保存済みのものが使えない場合は全エントリをエンコード）"""
+        try:
+            if await asyncio.to_thread(self.mock_store.load_embeddings):
+                return
+        except Exception as e:
+            logger.warning(f"Failed to load mock embeddings: {e}")
+
+        contents = [memory.get("content", "") for memory in self.mock_store.records]
+        self.mock_store.set_embeddings(await self._encode(contents) if contents else [])
 
     async def _initialize_encoder(self):
-        """文章エンコーダーの初期化"""
+        """文章エンコーダーの初期化（ONNX Runtimeが利用可能ならONNXモデルを優先）"""
+        loop = asyncio.get_event_loop()
+
+        if ONNX_RUNTIME_AVAILABLE:
+            try:
+                # 変換済みのONNXモデルはベクトルDBと同じ場所に保存し、次回以降の変換を省く
+                cache_dir = os.path.join(self.config["db_path"], "onnx", self.config["embedding_model"].replace("/", "_"))
+                self.encoder = await loop.run_in_executor(
+                    None,
+                    OnnxSentenceEncoder.load,
+                    self.config["embedding_model"],
+                    cache_dir
+                )
+                logger.info("ONNX sentence encoder loaded successfully")
+                return
+            except Exception as e:
+                logger.warning(f"Failed to load ONNX encoder, falling back to sentence-transformers: {e}")
+
+        if not SENTENCE_TRANSFORMERS_AVAILABLE:
+            self.encoder = None
+            return
+
         try:
             logger.info(f"Loading sentence transformer model: {self.config['embedding_model']}")
 
             # 非同期でモデルを読み込み
-            loop = asyncio.get_event_loop()
             self.encoder = await loop.run_in_executor(
                 None,
                 SentenceTransformer,
@@ -170,6 +310,9 @@ class PersonalMemory:
         """
         ユーザーとの会話を記憶に保存
 
+        書き込みはキューに追加するだけで、バックグラウンドタスクが複数の会話をまとめて
+        エンコード・保存する（応答の送信を待たせない）
+
         Args:
             user_input: ユーザーの入力
             assistant_response: アシスタントの応答
@@ -196,8 +339,6 @@ class PersonalMemory:
                 }
             }
 
-            await self._store_memory_entry(user_memory)
-
             # アシスタント応答を保存
             assistant_memory = {
                 "content": assistant_response,
@@ -207,44 +348,154 @@ class PersonalMemory:
                 "metadata": {
                     "length": len(assistant_response),
                     "type": "assistant_response",
-                    "related_user_input": hashlib.md5(user_input.encode()).hexdigest()[:8]
+                    "related_user_input": _hash_hex(user_input, 4)
                 }
             }
 
-            await self._store_memory_entry(assistant_memory)
+            self._write_queue.put_nowait(user_memory)
+            self._write_queue.put_nowait(assistant_memory)
 
-            logger.debug("Interaction stored successfully")
+            logger.debug("Interaction queued for storage")
             return True
 
         except Exception as e:
             logger.error(f"Failed to store interaction: {e}")
             return False
 
+    async def _write_loop(self):
+        """書き込みキューのメモリエントリを最大 write_batch_size 件ずつまとめて保存"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._write_queue.get()]
+            deadline = loop.time() + self.config["write_flush_interval"]
+            try:
+                while len(batch) < self.config["write_batch_size"]:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._write_queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # 停止時は取り出し済みのエントリをキューに戻し、cleanup で保存させる
+                for memory in batch:
+                    self._write_queue.put_nowait(memory)
+                raise
+
+            try:
+                await self._store_memory_entries(batch)
+                logger.debug("Stored {} memory entries", len(batch))
+            except Exception as e:
+                logger.error(f"Failed to store queued memory entries: {e}")
+
+    async def _flush_write_queue(self):
+        """書き込み待ちのメモリエントリを全て保存"""
+        if self._write_queue is None:
+            return
+
+        batch = []
+        while not self._write_queue.empty():
+            batch.append(self._write_queue.get_nowait())
+        if batch:
+            try:
+                await self._store_memory_entries(batch)
+            except Exception as e:
+                logger.error(f"Failed to flush memory entries: {e}")
+
+    @property
+    def encoder_executor(self) -> ThreadPoolExecutor:
+        """エンコーダーの推論専用のスレッド（エンコーダーを共有する場合も推論を直列化する）"""
+        return _encoder_executor
+
+    async def _encode(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """
+        文章エンコーダーでまとめて埋め込みを計算（エンコーダーがない場合はNone）
+
+        sentence-transformers はバッチ内を長さ順に並べ替えてからエンコードするため、
+        パディングを減らすための並べ替えは呼び出し側では行わない
+        """
+        if self.encoder is None:
+            return None
+
+        loop = asyncio.get_running_loop()
+        embeddings = await loop.run_in_executor(
+            _encoder_executor,
+            functools.partial(
+                self.encoder.encode,
+                texts,
+                batch_size=self.config["write_batch_size"],
+                show_progress_bar=False,
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            )
+        )
+        return embeddings.tolist()
+
+    @staticmethod
+    def _flatten_metadata(memory: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        メモリエントリをベクトルDBのメタデータに変換
+
+        ChromaDBのメタデータは入れ子にできないため、metadata の中身は最上位に展開する
+        """
+        metadata = {k: v for k, v in memory.items() if k not in ("content", "metadata")}
+        metadata.update(memory.get("metadata", {}))
+        return metadata
+
     async def _store_memory_entry(self, memory: Dict[str, Any]):
         """単一のメモリエントリを保存"""
+        await self._store_memory_entries([memory])
+
+    async def _store_memory_entries(self, memories: List[Dict[str, Any]]):
+        """複数のメモリエントリを1回の書き込みで保存"""
         try:
-            content = memory["content"]
-            memory_id = hashlib.md5(
-                f"{content}{memory['timestamp']}".encode()
-            ).hexdigest()
-
-            if self.chroma_client and self.collection:
-                # ChromaDBに保存
-                self.collection.add(
-                    documents=[content],
-                    metadatas=[{k: v for k, v in memory.items() if k != "content"}],
-                    ids=[memory_id]
+            # MD5と同じ32文字のID（HNSW索引のキーはIDの先頭15文字から作る）
+            memory_ids = [
+                _hash_hex(f"{memory['content']}{memory['timestamp']}", 16)
+                for memory in memories
+            ]
+
+            if self.hnsw_store:
+                # HNSW索引に保存
+                documents = [memory["content"] for memory in memories]
+                await asyncio.to_thread(
+                    self.hnsw_store.add,
+                    memory_ids,
+                    await self._encode(documents),
+                    documents,
+                    [self._flatten_metadata(memory) for memory in memories]
                 )
+            elif self.chroma_client and self.collection:
+                # ChromaDBに保存（埋め込みを計算済みの場合はChromaDB側のエンコードを省く）
+                documents = [memory["content"] for memory in memories]
+                add_kwargs = {
+                    "documents": documents,
+                    "metadatas": [self._flatten_metadata(memory) for memory in memories],
+                    "ids": memory_ids
+                }
+                embeddings = await self._encode(documents)
+                if embeddings is not None:
+                    add_kwargs["embeddings"] = embeddings
+                await asyncio.to_thread(self.collection.add, **add_kwargs)
             else:
                 # モックDBに保存
-                memory["id"] = memory_id
-                self.mock_memories.append(memory)
+                embeddings = None
+                if self.mock_store.has_embeddings:
+                    embeddings = await self._encode([memory["content"] for memory in memories])
+
+                for memory, memory_id in zip(memories, memory_ids):
+                    memory["id"] = memory_id
+                self.mock_store.add(memories, embeddings)
 
-                # ファイルに保存
-                await self._persist_mock_memories()
+                # ログに追記
+                await self._persist_mock_memories(memories)
+
+            # 追加したメモリが検索結果に含まれるよう、キャッシュした検索結果を破棄する
+            self.query_cache.clear()
 
         except Exception as e:
-            logger.error(f"Failed to store memory entry: {e}")
+            logger.error(f"Failed to store memory entries: {e}")
             raise
 
     async def search_relevant(self, query: str, limit: int = None) -> List[Dict[str, Any]]:
@@ -264,21 +515,62 @@ class PersonalMemory:
         limit = limit or self.config["max_search_results"]
 
         try:
-            if self.chroma_client and self.collection:
-                return await self._search_chromadb(query, limit)
+            # 完全一致はエンコードせずに、ほぼ同じクエリはエンコード後、検索せずにキャッシュから返す
+            cached = self.query_cache.get_exact(query, limit)
+            if cached is not None:
+                return cached
+
+            query_embedding = None
+            if self.encoder is not None:
+                query_embedding = (await self._encode([query]))[0]
+                cached = self.query_cache.get_similar(query_embedding, limit)
+                if cached is not None:
+                    return cached
+
+            if self.hnsw_store:
+                memories = await self._search_hnsw(query_embedding, limit)
+            elif self.chroma_client and self.collection:
+                memories = await self._search_chromadb(query, limit, query_embedding)
             else:
-                return await self._search_mock_db(query, limit)
+                memories = await self._search_mock_db(query, limit, query_embedding)
+
+            self.query_cache.put(query, limit, query_embedding, memories)
+            return list(memories)
 
         except Exception as e:
             logger.error(f"Failed to search relevant memories: {e}")
             return []
 
-    async def _search_chromadb(self, query: str, limit: int) -> List[Dict[str, Any]]:
+    async def _search_hnsw(self, query_embedding: List[float], limit: int) -> List[Dict[str, Any]]:
+        """HNSW索引での検索"""
+        try:
+            memories = []
+            for entry, distance in self.hnsw_store.search(query_embedding, limit):
+                # 類似度しきい値でフィルタリング
+                similarity = 1 - distance
+                if similarity >= self.config["similarity_threshold"]:
+                    memory = entry.copy()
+                    memory["similarity"] = similarity
+                    memories.append(memory)
+
+            logger.debug(f"Found {len(memories)} relevant memories")
+            return memories
+
+        except Exception as e:
+            logger.error(f"HNSW search failed: {e}")
+            return []
+
+    async def _search_chromadb(
+        self, query: str, limit: int, query_embedding: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
         """ChromaDBでの検索"""
         try:
-            # ベクトル検索を実行
+            # ベクトル検索を実行（保存時と同じエンコーダーで埋め込んだクエリを使う）
+            query_kwargs = {"query_texts": [query]}
+            if query_embedding is not None:
+                query_kwargs = {"query_embeddings": [query_embedding]}
             results = self.collection.query(
-                query_texts=[query],
+                **query_kwargs,
                 n_results=limit,
                 include=["documents", "metadatas", "distances"]
             )
@@ -305,13 +597,18 @@ class PersonalMemory:
             logger.error(f"ChromaDB search failed: {e}")
             return []
 
-    async def _search_mock_db(self, query: str, limit: int) -> List[Dict[str, Any]]:
-        """モックDBでの検索（簡易的なテキストマッチング）"""
+    async def _search_mock_db(
+        self, query: str, limit: int, query_embedding: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """モックDBでの検索（エンコーダーがあれば埋め込みの類似度、なければ簡易的なテキストマッチング）"""
+        if self.mock_store.has_embeddings and query_embedding is not None:
+            return await self._search_mock_embeddings(query_embedding, limit)
+
         try:
             query_lower = query.lower()
             relevant_memories = []
 
-            for memory in self.mock_memories:
+            for memory in self.mock_store.records:
                 content = memory.get("content", "").lower()
 
                 # 簡易的な関連度計算（キーワードマッチング）
@@ -332,6 +629,27 @@ class PersonalMemory:
             logger.error(f"Mock DB search failed: {e}")
             return []
 
+    async def _search_mock_embeddings(self, query_embedding: List[float], limit: int) -> List[Dict[str, Any]]:
+        """モックDBの埋め込み行列での検索"""
+        try:
+            if self.mock_store.count() == 0:
+                return []
+
+            relevant_memories = []
+            for memory, similarity in self.mock_store.search_embedding(query_embedding, limit):
+                if similarity < self.config["similarity_threshold"]:
+                    break
+                memory_copy = memory.copy()
+                memory_copy["similarity"] = similarity
+                relevant_memories.append(memory_copy)
+
+            logger.debug(f"Found {len(relevant_memories)} relevant memories (mock)")
+            return relevant_memories
+
+        except Exception as e:
+            logger.error(f"Mock DB search failed: {e}")
+            return []
+
     def _calculate_text_similarity(self, text1: str, text2: str) -> float:
         """簡易的なテキスト類似度計算"""
         words1 = set(text1.split())
@@ -382,7 +700,14 @@ class PersonalMemory:
         try:
             preferences = {}
 
-            if self.chroma_client and self.collection:
+            if self.hnsw_store:
+                # HNSW索引のメタデータから検索
+                for metadata in self.hnsw_store.find("preference"):
+                    key = metadata.get("preference_key")
+                    value = metadata.get("preference_value")
+                    if key and value:
+                        preferences[key] = value
+            elif self.chroma_client and self.collection:
                 # ChromaDBから検索
                 results = self.collection.query(
                     query_texts=["ユーザー設定"],
@@ -399,13 +724,12 @@ class PersonalMemory:
                             preferences[key] = value
             else:
                 # モックDBから検索
-                for memory in self.mock_memories:
-                    if memory.get("category") == "preference":
-                        metadata = memory.get("metadata", {})
-                        key = metadata.get("preference_key")
-                        value = metadata.get("preference_value")
-                        if key and value:
-                            preferences[key] = value
+                for memory in self.mock_store.find("preference"):
+                    metadata = memory.get("metadata", {})
+                    key = metadata.get("preference_key")
+                    value = metadata.get("preference_value")
+                    if key and value:
+                        preferences[key] = value
 
             logger.debug(f"Retrieved {len(preferences)} user preferences")
             return preferences
@@ -418,25 +742,20 @@ class PersonalMemory:
         """古いメモリのクリーンアップ"""
         try:
             cutoff_date = datetime.now() - timedelta(days=self.config["memory_retention_days"])
-            cutoff_iso = cutoff_date.isoformat()
 
             deleted_count = 0
 
-            if self.chroma_client and self.collection:
-                # ChromaDBでの削除は複雑なので、今回は省略
+            if self.hnsw_store or (self.chroma_client and self.collection):
+                # ベクトルDBでの削除は複雑なので、今回は省略
                 # 実装する場合は、古いメモリのIDを特定して削除
                 pass
             else:
-                # モックDBでの削除
-                original_count = len(self.mock_memories)
-                self.mock_memories = [
-                    memory for memory in self.mock_memories
-                    if memory.get("timestamp", "") >= cutoff_iso
-                ]
-                deleted_count = original_count - len(self.mock_memories)
+                # モックDBでの削除（タイムスタンプ列の比較で一括して判定）
+                deleted_count = self.mock_store.prune_before(cutoff_date)
 
                 if deleted_count > 0:
-                    await self._persist_mock_memories()
+                    await self._compact_mock_memories()
+                    self.query_cache.clear()
 
             if deleted_count > 0:
                 logger.info(f"Cleaned up {deleted_count} old memory entries")
@@ -444,30 +763,46 @@ class PersonalMemory:
         except Exception as e:
             logger.error(f"Failed to cleanup old memories: {e}")
 
-    async def _persist_mock_memories(self):
-        """モックメモリをファイルに保存"""
+    async def _persist_mock_memories(self, memories: List[Dict[str, Any]]):
+        """
+        追加したモックメモリをファイルに追記（ファイル全体は書き直さない）
+
+        ディスクへの同期を待つ間イベントループを止めないよう、スレッドで実行する。
+        書き込みキューがまとめたエントリを1回の同期で永続化する
+        """
         try:
-            mock_file = os.path.join(self.config["db_path"], "mock_memories.json")
-            with open(mock_file, 'w', encoding='utf-8') as f:
-                json.dump(self.mock_memories, f, ensure_ascii=False, indent=2)
+            await asyncio.to_thread(self.mock_store.append_log, memories)
         except Exception as e:
             logger.error(f"Failed to persist mock memories: {e}")
 
+    async def _compact_mock_memories(self):
+        """削除したエントリを除いてモックメモリのファイルを書き直す"""
+        try:
+            await asyncio.to_thread(self.mock_store.compact)
+        except Exception as e:
+            logger.error(f"Failed to compact mock memories: {e}")
+
     async def get_status(self) -> Dict[str, Any]:
         """システム状態の取得"""
         status = {
             "initialized": self.is_initialized,
             "chromadb_available": CHROMADB_AVAILABLE,
-            "encoder_available": SENTENCE_TRANSFORMERS_AVAILABLE,
-            "config": self.config.copy()
+            "usearch_available": USEARCH_AVAILABLE,
+            "encoder_available": SENTENCE_TRANSFORMERS_AVAILABLE or ONNX_RUNTIME_AVAILABLE,
+            "encoder_backend": type(self.encoder).__name__ if self.encoder is not None else None,
+            "config": self.config.copy(),
+            "query_cache": self.query_cache.get_stats()
         }
 
         try:
-            if self.chroma_client and self.collection:
+            if self.hnsw_store:
+                status["memory_count"] = self.hnsw_store.count()
+                status["storage_type"] = "hnsw"
+            elif self.chroma_client and self.collection:
                 status["memory_count"] = self.collection.count()
                 status["storage_type"] = "chromadb"
             else:
-                status["memory_count"] = len(getattr(self, "mock_memories", []))
+                status["memory_count"] = self.mock_store.count() if self.mock_store else 0
                 status["storage_type"] = "mock"
 
         except Exception as e:
@@ -491,9 +826,32 @@ class PersonalMemory:
         """リソースのクリーンアップ"""
         logger.info("Cleaning up Personal Memory system...")
 
-        # モックメモリの保存
-        if hasattr(self, "mock_memories"):
-            await self._persist_mock_memories()
+        # 書き込みタスクを止め、書き込み待ちのエントリを保存
+        if self._writer_task:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+        await self._flush_write_queue()
+        self._write_queue = None
+
+        self.query_cache.clear()
+
+        # モックメモリの埋め込みの保存（エントリは追加のたびにログに追記済み）
+        # 埋め込みの圧縮保存は重いため、書き込みのたびには行わず終了時にまとめて保存する
+        if self.mock_store:
+            try:
+                await asyncio.to_thread(self.mock_store.save_embeddings)
+            except Exception as e:
+                logger.error(f"Failed to persist mock embeddings: {e}")
+            self.mock_store = None
+
+        # HNSW索引の保存
+        if self.hnsw_store:
+            await asyncio.to_thread(self.hnsw_store.save)
+            self.hnsw_store = None
 
         # ChromaDBのクリーンアップ
         self.chroma_client = None
@@ -0,0 +1,118 @@
+"""
+Query Cache - メモリ検索結果のキャッシュ
+
+同じ・ほぼ同じ検索クエリに対して、過去の検索結果を再利用して
+ベクトルDBの検索（とクエリ文字列が完全一致する場合はエンコード）を省略するためのキャッシュ
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+
+class QueryResultCache:
+    """
+    メモリ検索結果のキャッシュ
+
+    クエリ文字列の完全一致 → クエリ埋め込みのコサイン類似度の順に参照する。
+    埋め込みは正規化済みのものを行列に保持し、容量を超えた場合は古い順に上書きする。
+    メモリの追加・削除時は呼び出し側で clear() する。ttl はそれ以外の変更に対する保険として、古い結果を期限切れにする
+    """
+
+    def __init__(self, max_entries: int = 256, threshold: float = 0.95, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+
+        self._exact: "OrderedDict[Tuple[str, int], Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+
+        self._vectors: Optional[np.ndarray] = None
+        self._expires = np.zeros(max_entries, dtype=np.float64)
+        self._limits = np.zeros(max_entries, dtype=np.int64)
+        self._results: List[Optional[List[Dict[str, Any]]]] = [None] * max_entries
+        self._next_row = 0
+        self._size = 0
+
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def get_exact(self, query: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """クエリ文字列が一致する検索結果を取得"""
+        key = (query.strip(), limit)
+        entry = self._exact.get(key)
+        if entry is None:
+            return None
+
+        expires, results = entry
+        if expires <= time.monotonic():
+            del self._exact[key]
+            return None
+
+        self._exact.move_to_end(key)
+        self.exact_hits += 1
+        return list(results)
+
+    def get_similar(self, embedding: np.ndarray, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """クエリ埋め込みが閾値以上に類似した検索結果を取得"""
+        if self._size == 0:
+            self.misses += 1
+            return None
+
+        scores = self._vectors[:self._size] @ np.asarray(embedding, dtype=np.float32)
+        # 期限切れ・件数の異なるエントリは候補から外す
+        valid = (self._expires[:self._size] > time.monotonic()) & (self._limits[:self._size] == limit)
+        scores = np.where(valid, scores, -np.inf)
+        best = int(np.argmax(scores))
+
+        if scores[best] >= self.threshold:
+            self.similar_hits += 1
+            logger.debug("Memory query cache hit (score={:.3f})", float(scores[best]))
+            return list(self._results[best])
+
+        self.misses += 1
+        return None
+
+    def put(self, query: str, limit: int, embedding: Optional[np.ndarray], results: List[Dict[str, Any]]):
+        """検索結果をキャッシュに追加（埋め込みがない場合は完全一致のみ）"""
+        expires = time.monotonic() + self.ttl
+
+        self._exact[(query.strip(), limit)] = (expires, results)
+        if len(self._exact) > self.max_entries:
+            self._exact.popitem(last=False)
+
+        if embedding is None:
+            return
+
+        embedding = np.asarray(embedding, dtype=np.float32)
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, embedding.shape[0]), dtype=np.float32)
+
+        row = self._next_row
+        self._vectors[row] = embedding
+        self._expires[row] = expires
+        self._limits[row] = limit
+        self._results[row] = results
+        self._next_row = (row + 1) % self.max_entries
+        self._size = min(self._size + 1, self.max_entries)
+
+    def clear(self):
+        """キャッシュを全て破棄"""
+        self._exact.clear()
+        self._vectors = None
+        self._results = [None] * self.max_entries
+        self._next_row = 0
+        self._size = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """キャッシュの統計情報を取得"""
+        return {
+            "exact_entries": len(self._exact),
+            "similar_entries": self._size,
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses
+        }
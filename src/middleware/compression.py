@@ -0,0 +1,43 @@
+"""
+Compression Middleware
+
+JSON・HTML・JS等のテキスト系レスポンスをgzip圧縮する
+音声ファイル等の圧縮済みのバイナリは圧縮しても小さくならずCPUを消費するだけのため、そのまま送る
+"""
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.types import Message, Receive, Scope, Send
+
+# 圧縮するContent-Type（前方一致）
+COMPRESSIBLE_CONTENT_TYPES = (
+    "application/json",
+    "application/javascript",
+    "text/",
+    "image/svg+xml",
+)
+
+
+class _TextGZipResponder(GZipResponder):
+    """Content-Typeがテキスト系のレスポンスのみを圧縮するGZipResponder"""
+
+    async def send_with_gzip(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            await super().send_with_gzip(message)
+            # 圧縮対象外はContent-Encoding設定済みと同じ扱いにして、本文をそのまま送る
+            if not content_type.startswith(COMPRESSIBLE_CONTENT_TYPES):
+                self.content_encoding_set = True
+            return
+        await super().send_with_gzip(message)
+
+
+class TextGZipMiddleware(GZipMiddleware):
+    """テキスト系のレスポンスのみをgzip圧縮するミドルウェア（WebSocketには作用しない）"""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = _TextGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -11,6 +11,14 @@ from typing import Optional
 from pathlib import Path
 from loguru import logger
 
+# UUID v4形式（8-4-4-4-12）のセッションID
+# 16進数とハイフンのみを許可するため、一致すればパストラバーサルに使える文字は含まれない
+SESSION_ID_PATTERN = re.compile(
+    r'[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}',
+    re.IGNORECASE
+)
+SESSION_ID_LENGTH = 36
+
 
 class SessionManager:
     """セッション管理クラス"""
@@ -41,19 +49,14 @@ class SessionManager:
         if not session_id:
             return False
 
-        # UUID v4形式の検証（8-4-4-4-12の形式）
-        uuid_pattern = re.compile(
-            r'^[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}$',
-            re.IGNORECASE
-        )
-
-        if not uuid_pattern.match(session_id):
-            logger.warning(f"Invalid session ID format: {session_id}")
-            return False
-
-        # パストラバーサル攻撃のチェック
-        if '..' in session_id or '/' in session_id or '\\' in session_id:
-            logger.error(f"Path traversal attempt detected: {session_id}")
+        # 長さとバージョン桁で明らかに不正なIDを正規表現の前に弾き、
+        # UUID v4形式の検証は全体一致で行う（末尾の改行等も許可しない）
+        if (
+            len(session_id) != SESSION_ID_LENGTH
+            or session_id[14] != '4'
+            or not SESSION_ID_PATTERN.fullmatch(session_id)
+        ):
+            logger.warning("Invalid session ID format: {!r}", session_id[:64])
             return False
 
         return True
@@ -11,6 +11,7 @@ import subprocess
 from typing import Optional, Dict, Any
 from loguru import logger
 from src.core.tool_base import Tool, ToolResult
+from src.tools.google_api import execute_request
 
 
 class CalendarMCPTool(Tool):
@@ -189,18 +190,16 @@ class CalendarMCPTool(Tool):
 
         max_results = params.get("max_results", 10)
 
-        # Google Calendar API呼び出し（非同期化）
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: self.service.events().list(
+        # Google Calendar API呼び出し（Google API用のスレッドプールで実行）
+        response = await execute_request(
+            self.service.events().list(
                 calendarId=calendar_id,
                 timeMin=time_min,
                 timeMax=time_max,
                 maxResults=max_results,
                 singleEvents=True,
                 orderBy='startTime'
-            ).execute()
+            )
         )
 
         # イベントを整形
@@ -14,6 +14,7 @@ from loguru import logger
 from email.utils import parseaddr, parsedate_to_datetime
 
 from src.core.tool_base import Tool, ToolResult, ToolParameter, ToolSchema
+from src.tools.google_api import execute_request
 
 try:
     from google.auth.transport.requests import Request
@@ -278,16 +279,16 @@ class GmailTool(Tool):
         try:
             # メッセージ一覧を取得（401等の認証エラー時は再認証して1回だけ再試行）
             try:
-                results = self.service.users().messages().list(
+                results = await execute_request(self.service.users().messages().list(
                     userId='me', q=query, maxResults=max_results
-                ).execute()
+                ))
             except HttpError as e:
                 if getattr(e, 'resp', None) and getattr(e.resp, 'status', None) in (401, 403):
                     logger.warning("Gmail API auth error on list; reauth and retry")
                     if await self._authenticate():
-                        results = self.service.users().messages().list(
+                        results = await execute_request(self.service.users().messages().list(
                             userId='me', q=query, maxResults=max_results
-                        ).execute()
+                        ))
                     else:
                         raise
                 else:
@@ -304,11 +305,11 @@ class GmailTool(Tool):
             # 各メッセージの詳細を取得（本文も含む）
             email_list = []
             for msg in messages[:max_results]:
-                msg_detail = self.service.users().messages().get(
+                msg_detail = await execute_request(self.service.users().messages().get(
                     userId='me',
                     id=msg['id'],
                     format='full'  # 本文取得のためfullに変更
-                ).execute()
+                ))
 
                 headers = {h['name']: h['value'] for h in msg_detail['payload']['headers']}
 
@@ -367,7 +368,7 @@ class GmailTool(Tool):
                 list_params = {"userId": 'me', "maxResults": 1}
                 if query:
                     list_params["q"] = query
-                results = self.service.users().messages().list(**list_params).execute()
+                results = await execute_request(self.service.users().messages().list(**list_params))
                 messages = results.get('messages', [])
                 if messages:
                     message_id = messages[0]['id']
@@ -379,16 +380,16 @@ class GmailTool(Tool):
         try:
             # メッセージ詳細を取得（401等の認証エラー時は再認証して再試行）
             try:
-                message = self.service.users().messages().get(
+                message = await execute_request(self.service.users().messages().get(
                     userId='me', id=message_id, format='full'
-                ).execute()
+                ))
             except HttpError as e:
                 if getattr(e, 'resp', None) and getattr(e.resp, 'status', None) in (401, 403):
                     logger.warning("Gmail API auth error on read; reauth and retry")
                     if await self._authenticate():
-                        message = self.service.users().messages().get(
+                        message = await execute_request(self.service.users().messages().get(
                             userId='me', id=message_id, format='full'
-                        ).execute()
+                        ))
                     else:
                         raise
                 else:
@@ -446,16 +447,16 @@ class GmailTool(Tool):
 
             # メール送信（401等の認証エラー時は再認証して再試行）
             try:
-                sent_message = self.service.users().messages().send(
+                sent_message = await execute_request(self.service.users().messages().send(
                     userId='me', body={'raw': raw_message}
-                ).execute()
+                ))
             except HttpError as e:
                 if getattr(e, 'resp', None) and getattr(e.resp, 'status', None) in (401, 403):
                     logger.warning("Gmail API auth error on send; reauth and retry")
                     if await self._authenticate():
-                        sent_message = self.service.users().messages().send(
+                        sent_message = await execute_request(self.service.users().messages().send(
                             userId='me', body={'raw': raw_message}
-                        ).execute()
+                        ))
                     else:
                         raise
                 else:
@@ -499,16 +500,16 @@ class GmailTool(Tool):
 
             # 下書きを作成（401等の認証エラー時は再認証して再試行）
             try:
-                draft = self.service.users().drafts().create(
+                draft = await execute_request(self.service.users().drafts().create(
                     userId='me', body={'message': {'raw': raw_message}}
-                ).execute()
+                ))
             except HttpError as e:
                 if getattr(e, 'resp', None) and getattr(e.resp, 'status', None) in (401, 403):
                     logger.warning("Gmail API auth error on compose; reauth and retry")
                     if await self._authenticate():
-                        draft = self.service.users().drafts().create(
+                        draft = await execute_request(self.service.users().drafts().create(
                             userId='me', body={'message': {'raw': raw_message}}
-                        ).execute()
+                        ))
                     else:
                         raise
                 else:
@@ -654,9 +655,9 @@ class GmailTool(Tool):
 
         try:
             # 元メールの詳細を取得
-            original = self.service.users().messages().get(
+            original = await execute_request(self.service.users().messages().get(
                 userId='me', id=message_id, format='full'
-            ).execute()
+            ))
 
             thread_id = original.get('threadId')
             headers = {h['name']: h['value'] for h in original['payload'].get('headers', [])}
@@ -694,10 +695,10 @@ class GmailTool(Tool):
 
             raw_message = base64.urlsafe_b64encode(reply.as_bytes()).decode()
 
-            sent = self.service.users().messages().send(
+            sent = await execute_request(self.service.users().messages().send(
                 userId='me',
                 body={'raw': raw_message, **({'threadId': thread_id} if thread_id else {})}
-            ).execute()
+            ))
 
             return ToolResult(
                 success=True,
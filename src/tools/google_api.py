@@ -0,0 +1,47 @@
+"""
+Google API - Google APIクライアント呼び出しの共通処理
+
+googleapiclient の execute() は同期HTTP通信のため、専用のスレッドプールで実行して
+イベントループ（同時接続中の音声WebSocket処理）を止めないようにする
+"""
+
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+# 同時に実行するGoogle API呼び出しの上限（バースト時にスレッドが無制限に増えないようにする）
+GOOGLE_API_MAX_WORKERS = 8
+
+_executor = ThreadPoolExecutor(max_workers=GOOGLE_API_MAX_WORKERS, thread_name_prefix="google-api")
+
+# httplib2.Http はスレッドセーフではないため、同じHTTPクライアントを共有する呼び出しは直列化する
+_http_locks: "weakref.WeakKeyDictionary[Any, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+
+def _get_http_lock(http: Any) -> asyncio.Lock:
+    """HTTPクライアントごとのロックを取得"""
+    lock = _http_locks.get(http)
+    if lock is None:
+        lock = asyncio.Lock()
+        _http_locks[http] = lock
+    return lock
+
+
+async def execute_request(request: Any) -> Any:
+    """
+    googleapiclient のリクエストをスレッドプールで実行
+
+    Args:
+        request: service.users().getProfile(...) 等で作成した未実行のリクエスト
+
+    Returns:
+        APIレスポンス
+    """
+    loop = asyncio.get_running_loop()
+    http = getattr(request, "http", None)
+    if http is None:
+        return await loop.run_in_executor(_executor, request.execute)
+
+    async with _get_http_lock(http):
+        return await loop.run_in_executor(_executor, request.execute)
@@ -5,7 +5,7 @@ Tool Registry - ツール管理システム
 """
 
 import asyncio
-from typing import Dict, Any, List, Optional, Type
+from typing import Dict, Any, List, Optional, Tuple, Type
 from loguru import logger
 
 from src.core.tool_base import Tool, ToolResult
@@ -23,6 +23,10 @@ class ToolRegistry:
         self.tools: Dict[str, Tool] = {}
         self.tool_classes: Dict[str, Type[Tool]] = {}
         self.is_initialized = False
+        # get_available_tools の結果キャッシュ（ツール構成が変わったら破棄）
+        self._available_tools_cache: Optional[List[Dict[str, Any]]] = None
+        # ツール単位の情報キャッシュ（ツールインスタンスが同一の間は同じ辞書を再利用）
+        self._tool_info_cache: Dict[str, Tuple[Tool, Dict[str, Any]]] = {}
         # 組み込みツールの名前→実装マップ
         self._builtin_map: Dict[str, str] = {
             "weather": "src.tools.weather_tool:WeatherTool",
@@ -69,6 +73,7 @@ class ToolRegistry:
 
             for tool_name in failed_tools:
                 del self.tools[tool_name]
+            self._available_tools_cache = None
 
             successful_tools = len(self.tools)
             logger.info(f"Tool Registry initialized with {successful_tools} tools")
@@ -139,6 +144,7 @@ class ToolRegistry:
 
             self.tools[tool_name] = tool
             self.tool_classes[tool_name] = type(tool)
+            self._available_tools_cache = None
 
             logger.info(f"Tool registered: {tool_name}")
 
@@ -165,6 +171,7 @@ class ToolRegistry:
             # レジストリから削除
             del self.tools[tool_name]
             del self.tool_classes[tool_name]
+            self._available_tools_cache = None
 
             logger.info(f"Tool unregistered: {tool_name}")
 
@@ -233,11 +240,24 @@ class ToolRegistry:
         利用可能なツールのリストを取得
 
         Returns:
-            ツール情報のリスト
+            ツール情報のリスト（ツール構成が変わるまで同じリストを返すため変更しないこと）
         """
+        if self._available_tools_cache is not None:
+            return self._available_tools_cache
+
         tools_info = []
+        tool_info_cache: Dict[str, Tuple[Tool, Dict[str, Any]]] = {}
+
+        # 登録順に依存せず名前順に並べる（LLMへ渡すツール一覧・スキーマを毎回同一にし、
+        # プロバイダー側のプロンプトキャッシュが効くようにする）
+        for tool_name, tool in sorted(self.tools.items()):
+            # 変更のないツールは前回と同じ辞書を返す（LLM側のスキーマ変換キャッシュが効くように）
+            entry = self._tool_info_cache.get(tool_name)
+            if entry is not None and entry[0] is tool:
+                tool_info_cache[tool_name] = entry
+                tools_info.append(entry[1])
+                continue
 
-        for tool_name, tool in self.tools.items():
             schema = tool.get_schema()
             # Pydantic v2 互換: .dict() ではなく .model_dump() を使用
             # Pydantic v2: model_dump(), v1: dict()
@@ -259,15 +279,19 @@ class ToolRegistry:
                     }
 
             params = [_to_dict(param) for param in schema.parameters]
-            tools_info.append({
+            info = {
                 "name": schema.name,
                 "description": schema.description,
                 "parameters": params,
                 "category": tool.category,
                 "requires_auth": tool.requires_auth,
                 "is_dangerous": tool.is_dangerous
-            })
+            }
+            tool_info_cache[tool_name] = (tool, info)
+            tools_info.append(info)
 
+        self._tool_info_cache = tool_info_cache
+        self._available_tools_cache = tools_info
         return tools_info
 
     def get_tools_by_category(self, category: str) -> List[Dict[str, Any]]:
@@ -395,6 +419,7 @@ class ToolRegistry:
 
             # 登録を更新
             self.tools[tool_name] = new_tool
+            self._available_tools_cache = None
 
             logger.info(f"Tool {tool_name} reloaded successfully")
 
@@ -440,6 +465,8 @@ class ToolRegistry:
         # レジストリをクリア
         self.tools.clear()
         self.tool_classes.clear()
+        self._available_tools_cache = None
+        self._tool_info_cache.clear()
         self.is_initialized = False
 
         logger.info("Tool Registry cleanup completed")
@@ -5,4 +5,5 @@ set -e
 PORT=${PORT:-8000}
 
 # uvicornを起動
-exec uvicorn src.main:app --host 0.0.0.0 --port $PORT
+exec uvicorn src.main:app --host 0.0.0.0 --port $PORT --loop uvloop --http httptools --ws websockets \
+    --ws-max-size ${WS_MAX_SIZE:-4194304} --ws-max-queue 32
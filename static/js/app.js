@@ -12,6 +12,8 @@ class VoiceAgent {
         this.alarms = []; // アラーム一覧
         this.alarmTimers = []; // アラームタイマー
         this.tableTasks = []; // テーブルタスク一覧
+        this.streamingMessage = null; // ストリーミング中のアシスタントメッセージ
+        this.streamingText = '';
 
         this.init();
     }
@@ -303,6 +305,12 @@ class VoiceAgent {
             case 'response':
                 this.handleResponse(data);
                 break;
+            case 'assistant_delta':
+                this.handleAssistantDelta(data);
+                break;
+            case 'assistant_done':
+                this.handleAssistantDone(data);
+                break;
             case 'error':
                 this.handleError(data);
                 break;
@@ -312,6 +320,11 @@ class VoiceAgent {
             case 'audio':
                 this.handleAudioResponse(data);
                 break;
+            case 'gap':
+                // 受信が追いつかずサーバー側で古いメッセージが破棄された
+                // （ストリーミング中の断片が欠けても assistant_done の確定応答で置き換わる）
+                console.warn('Server dropped messages:', data.dropped);
+                break;
             case 'user_message':
             case 'assistant_message':
                 // 音声メッセージは専用ハンドラーに転送
@@ -377,6 +390,29 @@ class VoiceAgent {
         }
     }
 
+    handleAssistantDelta(data) {
+        // 生成中の応答を1つのメッセージに追記して表示
+        if (!this.streamingMessage) {
+            this.streamingText = '';
+            this.streamingMessage = this.uiManager.addMessage('assistant', '');
+        }
+        this.streamingText += data.chunk || '';
+        this.uiManager.updateMessage(this.streamingMessage, this.streamingText);
+    }
+
+    async handleAssistantDone(data) {
+        // ツール実行後の最終応答などで内容が変わる場合があるため、確定した応答で置き換える
+        const message = this.streamingMessage;
+        this.streamingMessage = null;
+        this.streamingText = '';
+
+        if (message) {
+            this.uiManager.updateMessage(message, data.content || '');
+            data = { ...data, content: '' };
+        }
+        await this.handleResponse(data);
+    }
+
     async handleResponse(data) {
         try {
             // テキスト応答を表示
@@ -1483,18 +1519,14 @@ class VoiceAgent {
             });
 
             if (response.ok) {
-                const data = await response.json();
-                console.log('Alarm trigger response:', data);
-
-                if (data.success && data.audio) {
-                    const audioBlob = this.base64ToBlob(data.audio, 'audio/wav');
-                    const audioUrl = URL.createObjectURL(audioBlob);
-                    await this.playAudioResponse(audioUrl);
-                } else {
-                    console.error('Alarm trigger failed:', data.error);
-                }
+                // 音声はBase64ではなくバイナリのまま返される
+                const audioBlob = await response.blob();
+                console.log('Alarm trigger response:', audioBlob.type, audioBlob.size, 'bytes');
+                const audioUrl = URL.createObjectURL(audioBlob);
+                await this.playAudioResponse(audioUrl);
             } else {
-                console.error('Alarm trigger request failed:', response.status);
+                const data = await response.json().catch(() => ({}));
+                console.error('Alarm trigger request failed:', response.status, data.error);
             }
         } catch (error) {
             console.error('Failed to play alarm:', error);
@@ -160,7 +160,7 @@ class UIManager {
     // メッセージ管理
     addMessage(role, content, metadata = {}) {
         const conversation = this.elements.conversation;
-        if (!conversation) return;
+        if (!conversation) return null;
 
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${role}`;
@@ -198,6 +198,16 @@ class UIManager {
         this.limitMessageHistory();
 
         console.log('Added message:', role, content);
+        return messageDiv;
+    }
+
+    updateMessage(messageDiv, content) {
+        // ストリーミング中のメッセージの内容を置き換える
+        const contentDiv = messageDiv && messageDiv.querySelector('.message-content');
+        if (!contentDiv) return;
+
+        contentDiv.innerHTML = this.processMessageContent(content);
+        this.scrollToBottom();
     }
 
     processMessageContent(content) {
@@ -42,7 +42,9 @@ class WebSocketManager {
                 try {
                     const data = JSON.parse(event.data);
                     console.log('Received message:', data);
-                    this.emit('message', data);
+                    // サーバーは連続したメッセージを配列として1フレームにまとめて送る場合がある
+                    const messages = Array.isArray(data) ? data : [data];
+                    messages.forEach((message) => this.emit('message', message));
                 } catch (error) {
                     console.error('Failed to parse WebSocket message:', error);
                 }
@@ -72,21 +74,9 @@ class WebSocketManager {
             this.voiceWs.onmessage = (event) => {
                 try {
                     const data = JSON.parse(event.data);
-                    console.log('🎤 VOICE WebSocket received:', data);
-                    console.log('🎤 Message type:', data.type);
-                    console.log('🎤 Message content:', data.content);
-
-                    // 音声から認識されたメッセージをチャット欄に表示
-                    if (data.type === 'user_message' || data.type === 'assistant_message') {
-                        console.log('🎤 Emitting voiceMessage event:', data);
-                        this.emit('voiceMessage', data);
-                    } else if (data.type === 'status') {
-                        console.log('📊 Processing status:', data.message);
-                        this.emit('status', data);
-                    } else {
-                        console.log('🎤 Emitting regular message event:', data);
-                        this.emit('message', data);
-                    }
+                    // サーバーは連続したメッセージを配列として1フレームにまとめて送る場合がある
+                    const messages = Array.isArray(data) ? data : [data];
+                    messages.forEach((message) => this.handleVoiceMessage(message));
                 } catch (error) {
                     console.error('❌ Failed to parse voice WebSocket message:', error);
                     console.error('❌ Raw message:', event.data);
@@ -108,6 +98,41 @@ class WebSocketManager {
         }
     }
 
+    handleVoiceMessage(data) {
+        console.log('🎤 VOICE WebSocket received:', data);
+        console.log('🎤 Message type:', data.type);
+        console.log('🎤 Message content:', data.content);
+
+        // 1ターン分（音声認識結果とAI応答）をまとめたメッセージは個別のメッセージに分けて表示
+        if (data.type === 'turn') {
+            if (data.user) {
+                this.emit('voiceMessage', {
+                    type: 'user_message',
+                    content: data.user,
+                    timestamp: data.timestamp
+                });
+            }
+            if (data.assistant) {
+                this.emit('voiceMessage', {
+                    type: 'assistant_message',
+                    content: data.assistant,
+                    audio_url: data.audio_url,
+                    timestamp: data.timestamp
+                });
+            }
+        // 音声から認識されたメッセージをチャット欄に表示
+        } else if (data.type === 'user_message' || data.type === 'assistant_message') {
+            console.log('🎤 Emitting voiceMessage event:', data);
+            this.emit('voiceMessage', data);
+        } else if (data.type === 'status') {
+            console.log('📊 Processing status:', data.message);
+            this.emit('status', data);
+        } else {
+            console.log('🎤 Emitting regular message event:', data);
+            this.emit('message', data);
+        }
+    }
+
     handleReconnect() {
         if (this.reconnectAttempts >= this.maxReconnectAttempts) {
             console.error('Max reconnect attempts reached');
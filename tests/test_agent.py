@@ -0,0 +1,145 @@
+"""
+VoiceAgent Tests - エージェントのターン処理のユニットテスト
+
+外部APIに依存しないスタブプロバイダー・スタブコンポーネントで、ストリーミングのターン処理をテストする
+"""
+
+import pytest
+import asyncio
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import src.main as main
+from src.core.agent import VoiceAgent
+from src.core.context_manager import ContextManager
+from src.core.websocket_manager import WebSocketManager
+from tests.test_hybrid_llm import StreamingStubProvider, make_llm
+from tests.test_websocket_manager import StubWebSocket
+
+
+class StubRuleProcessor:
+    """ルールにマッチしないスタブ（error を指定した場合は例外を送出）"""
+
+    def __init__(self, error: Exception = None):
+        self.error = error
+
+    async def process_input(self, text, **kwargs):
+        if self.error:
+            raise self.error
+        return None
+
+
+class StubMemory:
+    async def search_relevant(self, query, limit=None):
+        return []
+
+    async def store_interaction(self, user_input, assistant_response, context=None):
+        return True
+
+
+class StubTools:
+    """実行したツール呼び出しを記録するスタブ"""
+
+    def __init__(self):
+        self.executed = []
+
+    def get_tool(self, name):
+        return None
+
+    def get_available_tools(self):
+        return []
+
+    async def execute_tool(self, name, parameters):
+        self.executed.append(name)
+        return {"message": "12時です"}
+
+
+class StubTTS:
+    async def synthesize(self, text, speed=None):
+        return "/audio/response.mp3"
+
+
+async def make_agent(chunks, rule_error: Exception = None) -> VoiceAgent:
+    """スタブのコンポーネントで初期化済みのエージェントを作成"""
+    agent = VoiceAgent()
+    agent.llm = make_llm(primary=StreamingStubProvider("primary", chunks))
+    agent.context = ContextManager()
+    await agent.context.initialize()
+    agent.rule_processor = StubRuleProcessor(rule_error)
+    agent.memory = StubMemory()
+    agent.tools = StubTools()
+    agent.tts = StubTTS()
+    agent.is_initialized = True
+    return agent
+
+
+class TestProcessTextStream:
+    """process_text_stream のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_deltas_are_followed_by_result(self):
+        """生成テキストを断片ごとに返し、最後に確定した応答と音声URLを返す"""
+        agent = await make_agent(["こんに", "ちは"])
+
+        events = [event async for event in agent.process_text_stream("やあ")]
+
+        assert [event["content"] for event in events[:-1]] == ["こんに", "ちは"]
+        assert events[-1]["type"] == "result"
+        assert events[-1]["result"]["text"] == "こんにちは"
+        assert events[-1]["result"]["audio_url"] == "/audio/response.mp3"
+        assert agent.context.get_context()[-1]["content"] == "こんにちは"
+
+    @pytest.mark.asyncio
+    async def test_tool_call_turn(self):
+        """ツール呼び出しは実行し、実行結果から生成した応答を最終結果として返す"""
+        agent = await make_agent(['確認します TOOL_CALL: {"name":"time","parameters":{}}'])
+
+        events = [event async for event in agent.process_text_stream("今何時")]
+
+        assert [event["content"] for event in events if event["type"] == "delta"] == ["確認します "]
+        assert agent.tools.executed == ["time"]
+        result = events[-1]["result"]
+        assert result["text"] == "from primary"
+        assert result["tool_results"] == [{"name": "time", "parameters": {}}]
+
+    @pytest.mark.asyncio
+    async def test_error_turn(self):
+        """処理中に例外が発生した場合はエラーの結果だけを返す"""
+        agent = await make_agent(["unused"], rule_error=RuntimeError("boom"))
+
+        events = [event async for event in agent.process_text_stream("やあ")]
+
+        assert events == [{"type": "result", "result": {"error": "処理中にエラーが発生しました"}}]
+
+
+class TestHandleChatText:
+    """WebSocketのテキストメッセージ処理のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_deltas_are_sent_before_done(self, monkeypatch):
+        """assistant_delta を断片ごとに送り、最後に assistant_done で全文と音声URLを送る"""
+        agent = await make_agent(["こんに", "ちは"])
+        manager = WebSocketManager()
+        websocket = StubWebSocket()
+        monkeypatch.setattr(main.app.state, "voice_agent", agent, raising=False)
+        monkeypatch.setattr(main.app.state, "websocket_manager", manager, raising=False)
+        await manager.connect(websocket)
+
+        await main._handle_chat_text(websocket, {"type": "message", "message": "やあ"})
+        while manager.send_queues[websocket].qsize():
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01)
+
+        messages = [
+            message for frame in websocket.frames
+            for message in (frame if isinstance(frame, list) else [frame])
+        ]
+        assert messages == [
+            {"type": "assistant_delta", "chunk": "こんに"},
+            {"type": "assistant_delta", "chunk": "ちは"},
+            {"type": "assistant_done", "content": "こんにちは", "audio_url": "/audio/response.mp3"}
+        ]
+        manager.disconnect(websocket)
@@ -0,0 +1,71 @@
+"""
+Compression Middleware Tests - gzip圧縮ミドルウェアのユニットテスト
+"""
+
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
+from fastapi.testclient import TestClient
+
+import src.main as main
+from src.middleware.compression import TextGZipMiddleware
+
+
+def _create_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(TextGZipMiddleware, minimum_size=16)
+
+    @app.get("/json")
+    async def json_endpoint():
+        return JSONResponse({"items": ["x" * 64]})
+
+    @app.get("/audio")
+    async def audio_endpoint():
+        return Response(b"\xff" * 64, media_type="audio/mpeg")
+
+    return app
+
+
+class TestTextGZipMiddleware:
+    """TextGZipMiddleware のテスト"""
+
+    def test_json_is_compressed(self):
+        """テキスト系のレスポンスはgzip圧縮する"""
+        client = TestClient(_create_app())
+        response = client.get("/json", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json() == {"items": ["x" * 64]}
+
+    def test_audio_is_sent_as_is(self):
+        """音声ファイルは圧縮せずにそのまま送る"""
+        client = TestClient(_create_app())
+        response = client.get("/audio", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
+        assert response.content == b"\xff" * 64
+
+
+class TestPrecompressedModels:
+    """圧縮済みのモデル一覧のテスト"""
+
+    def test_each_encoding_has_its_own_etag(self):
+        """gzipと非圧縮の本文は別のETagで返し、それぞれのETagでのみ304になる"""
+        client = TestClient(main.app)
+
+        gzipped = client.get("/api/llm/models", headers={"Accept-Encoding": "gzip"})
+        identity = client.get("/api/llm/models", headers={"Accept-Encoding": "identity"})
+
+        assert gzipped.headers["content-encoding"] == "gzip"
+        assert gzipped.headers["etag"] != identity.headers["etag"]
+        assert client.get(
+            "/api/llm/models", headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]}
+        ).status_code == 304
+        assert client.get(
+            "/api/llm/models", headers={"Accept-Encoding": "identity", "If-None-Match": gzipped.headers["etag"]}
+        ).status_code == 200
@@ -0,0 +1,705 @@
+"""
+HybridLLM Tests - HybridLLMのユニットテスト
+
+外部APIに依存しないスタブプロバイダーでHybridLLMの内部処理をテストする
+"""
+
+import pytest
+import asyncio
+import json
+import os
+import sys
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.llm.hybrid_llm import HybridLLM, LLMProvider, LLMResponse, _retry_call
+from src.llm.semantic_cache import SemanticCache
+
+
+class StubProvider(LLMProvider):
+    """指定した遅延後に応答（または例外）を返すスタブプロバイダー"""
+
+    def __init__(self, name: str, delay: float = 0.0, error: Exception = None):
+        super().__init__(name)
+        self.is_available = True
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    async def generate(self, messages, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return LLMResponse(content=f"from {self.name}", model=self.name)
+
+
+def make_llm(**providers) -> HybridLLM:
+    """スタブプロバイダーを登録したHybridLLMを作成"""
+    llm = HybridLLM()
+    llm.providers = providers
+    llm.config["primary_provider"] = "primary"
+    llm.config["fallback_provider"] = "fallback"
+    llm._refresh_provider_order()
+    llm.is_initialized = True
+    return llm
+
+
+class TestGenerateWithFallback:
+    """_generate_with_fallback のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_does_not_start_fallback(self):
+        """プライマリが高速に応答した場合はフォールバックを起動しない"""
+        primary = StubProvider("primary")
+        fallback = StubProvider("fallback")
+        llm = make_llm(primary=primary, fallback=fallback)
+
+        response = await llm._generate_with_fallback([])
+
+        assert response.content == "from primary"
+        assert fallback.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged_and_cancelled(self):
+        """プライマリが遅い場合はフォールバックの応答を採用しプライマリをキャンセル"""
+        primary = StubProvider("primary", delay=5)
+        fallback = StubProvider("fallback")
+        llm = make_llm(primary=primary, fallback=fallback)
+        llm.config["hedge_after_ms"] = 10
+
+        response = await asyncio.wait_for(llm._generate_with_fallback([]), timeout=1)
+        await asyncio.sleep(0)
+
+        assert response.content == "from fallback"
+        assert primary.cancelled
+        assert llm._hedge_stats == {"races": 1, "hedged": 1, "primary_wins": 0, "fallback_wins": 1}
+
+    @pytest.mark.asyncio
+    async def test_failed_primary_starts_fallback_immediately(self):
+        """プライマリが失敗した場合はヘッジ待ちせずにフォールバックを起動"""
+        primary = StubProvider("primary", error=RuntimeError("boom"))
+        fallback = StubProvider("fallback")
+        llm = make_llm(primary=primary, fallback=fallback)
+        llm.config["hedge_after_ms"] = 5000
+
+        response = await asyncio.wait_for(llm._generate_with_fallback([]), timeout=1)
+
+        assert response.content == "from fallback"
+
+    @pytest.mark.asyncio
+    async def test_hung_race_moves_on_to_other_providers(self):
+        """プライマリ・フォールバックが共に応答しない場合は打ち切って次のプロバイダーへ"""
+        primary = StubProvider("primary", delay=5)
+        fallback = StubProvider("fallback", delay=5)
+        llm = make_llm(primary=primary, fallback=fallback, other=StubProvider("other"))
+        llm.config["hedge_after_ms"] = 10
+        llm.config["timeout"] = 0.05
+
+        response = await asyncio.wait_for(llm._generate_with_fallback([]), timeout=1)
+        await asyncio.sleep(0)
+
+        assert response.content == "from other"
+        assert primary.cancelled and fallback.cancelled
+
+    @pytest.mark.asyncio
+    async def test_all_providers_failed(self):
+        """全プロバイダーが失敗した場合はRuntimeError"""
+        llm = make_llm(
+            primary=StubProvider("primary", error=RuntimeError("boom")),
+            fallback=StubProvider("fallback", error=RuntimeError("boom"))
+        )
+
+        with pytest.raises(RuntimeError):
+            await llm._generate_with_fallback([])
+
+    @pytest.mark.asyncio
+    async def test_alternative_provider_is_tried_last(self):
+        """プライマリ・フォールバックが失敗した場合はその他のプロバイダーを試行"""
+        llm = make_llm(
+            other=StubProvider("other"),
+            primary=StubProvider("primary", error=RuntimeError("boom")),
+            fallback=StubProvider("fallback", error=RuntimeError("boom"))
+        )
+
+        assert [p.name for p in llm._provider_order] == ["primary", "fallback", "other"]
+        response = await llm._generate_with_fallback([])
+
+        assert response.content == "from other"
+
+
+class StreamingStubProvider(StubProvider):
+    """指定したチャンク列をストリーミングで返すスタブプロバイダー"""
+
+    def __init__(self, name: str, chunks):
+        super().__init__(name)
+        self.chunks = chunks
+
+    async def generate_stream(self, messages, **kwargs):
+        self.calls += 1
+        for chunk in self.chunks:
+            yield chunk
+
+
+class TestStreamWithTools:
+    """stream_with_tools のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_text_is_streamed_and_tool_calls_are_split_out(self):
+        """テキストは逐次返し、チャンクをまたぐTOOL_CALLは完結時にツール呼び出しとして返す"""
+        chunks = ['了解です TOO', 'L_CALL: {"name":"ala', 'rm","parameters":{"action":"list"}}', ' 確認しますね']
+        llm = make_llm(primary=StreamingStubProvider("primary", chunks))
+
+        events = [event async for event in llm.stream_with_tools("アラーム見て", [], [], [])]
+
+        text = "".join(event["content"] for event in events if event["type"] == "text")
+        tool_calls = [event["tool_call"] for event in events if event["type"] == "tool_call"]
+        assert text == "了解です  確認しますね"
+        assert tool_calls == [{"name": "alarm", "parameters": {"action": "list"}}]
+        assert events[-1] == {"type": "done", "response": "".join(chunks), "tool_calls": tool_calls}
+
+    @pytest.mark.asyncio
+    async def test_braces_inside_json_strings_are_ignored(self):
+        """JSON文字列内の括弧でツール呼び出しを打ち切らない"""
+        chunks = ['TOOL_CALL: {"name":"memo","parameters":{"text":"} \\" {"}}', ' 保存しました']
+        llm = make_llm(primary=StreamingStubProvider("primary", chunks))
+
+        events = [event async for event in llm.stream_with_tools("メモして", [], [], [])]
+
+        text = "".join(event["content"] for event in events if event["type"] == "text")
+        tool_calls = [event["tool_call"] for event in events if event["type"] == "tool_call"]
+        assert text == " 保存しました"
+        assert tool_calls == [{"name": "memo", "parameters": {"text": "} \" {"}}]
+
+    @pytest.mark.asyncio
+    async def test_marker_without_json_is_passed_through(self):
+        """マーカーの後が { で始まらない場合はテキストとしてそのまま返す"""
+        chunks = ['書式は TOOL_CALL:', ' の後にJSONを書きます']
+        llm = make_llm(primary=StreamingStubProvider("primary", chunks))
+
+        events = [event async for event in llm.stream_with_tools("書式は？", [], [], [])]
+
+        text = "".join(event["content"] for event in events if event["type"] == "text")
+        assert text == "".join(chunks)
+        assert events[-1]["tool_calls"] == []
+
+    @pytest.mark.asyncio
+    async def test_unterminated_tool_call_is_repaired_at_end(self):
+        """閉じ括弧が欠けたままストリームが終わった場合は修復して返す"""
+        llm = make_llm(primary=StreamingStubProvider("primary", ['TOOL_CALL: {"name":"time"']))
+
+        events = [event async for event in llm.stream_with_tools("今何時", [], [], [])]
+
+        assert events[-1]["tool_calls"] == [{"name": "time"}]
+
+    @pytest.mark.asyncio
+    async def test_falls_back_when_stream_fails_to_start(self):
+        """最初のチャンク前に失敗した場合は次のプロバイダーで生成"""
+        llm = make_llm(
+            primary=StubProvider("primary", error=RuntimeError("boom")),
+            fallback=StreamingStubProvider("fallback", ["こんにちは"])
+        )
+
+        events = [event async for event in llm.stream_with_tools("やあ", [], [], [])]
+
+        assert events[-1]["response"] == "こんにちは"
+
+
+class EchoStubProvider(StubProvider):
+    """最後のメッセージを返すスタブプロバイダー（後のリクエストほど早く完了する）"""
+
+    async def generate(self, messages, **kwargs):
+        self.calls += 1
+        content = messages[-1]["content"]
+        await asyncio.sleep(self.delay * (10 - int(content)) / 10)
+        return LLMResponse(content=content, model=self.name)
+
+
+class TestBatchGenerate:
+    """batch_generate のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_requests_run_concurrently_in_order(self):
+        """各リクエストは並行に実行され、結果は完了順ではなく入力順で返る"""
+        provider = EchoStubProvider("primary", delay=0.05)
+        llm = make_llm(primary=provider)
+
+        results = await asyncio.wait_for(
+            llm.batch_generate([[{"role": "user", "content": str(i)}] for i in range(10)]),
+            timeout=0.3
+        )
+
+        assert len(results) == 10
+        assert provider.calls == 10
+        assert [result.content for result in results] == [str(i) for i in range(10)]
+
+    @pytest.mark.asyncio
+    async def test_failures_are_reported_per_request(self):
+        """失敗したリクエストはerrorとして返し、他の結果に影響しない"""
+        llm = make_llm(primary=StubProvider("primary", error=RuntimeError("boom")))
+
+        results = await llm.batch_generate([[], []])
+
+        assert results == [{"error": "All LLM providers failed"}] * 2
+
+
+class TestRetryCall:
+    """_retry_call のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_transient_errors_are_retried(self):
+        """対象の例外は再試行し、成功すればその結果を返す"""
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionError("temporary")
+            return "ok"
+
+        result = await _retry_call(flaky, retries=2, retry_on=(ConnectionError,), base_delay=0)
+
+        assert result == "ok"
+        assert len(attempts) == 3
+
+    @pytest.mark.asyncio
+    async def test_other_errors_fail_immediately(self):
+        """対象外の例外や再試行回数超過はそのまま送出する"""
+        attempts = []
+
+        async def broken():
+            attempts.append(1)
+            raise ValueError("bad request")
+
+        with pytest.raises(ValueError):
+            await _retry_call(broken, retries=2, retry_on=(ConnectionError,), base_delay=0)
+        assert len(attempts) == 1
+
+
+class TestProviderLimits:
+    """プロバイダーの同時実行数・レート制限のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        """max_concurrentを超えるリクエストは待機してから実行される"""
+        provider = StubProvider("primary", delay=0.05)
+        provider.configure_limits(max_concurrent=2)
+        llm = make_llm(primary=provider)
+
+        start = asyncio.get_running_loop().time()
+        await llm.batch_generate([[{"role": "user", "content": str(i)}] for i in range(4)])
+        elapsed = asyncio.get_running_loop().time() - start
+
+        assert provider.calls == 4
+        assert elapsed >= 0.1
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_waits_for_window(self):
+        """1分あたりの上限に達したリクエストはウィンドウが空くまで待機する"""
+        from src.llm.hybrid_llm import _RequestRateLimiter
+
+        limiter = _RequestRateLimiter(max_requests=2, period=0.1)
+        start = asyncio.get_running_loop().time()
+        for _ in range(3):
+            await limiter.acquire()
+
+        assert asyncio.get_running_loop().time() - start >= 0.1
+
+
+class TestFollowupPrefetch:
+    """追質問の先行生成のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_prefetched_followup_is_reused(self):
+        """先行生成した追質問は再生成せずに結果を返す"""
+        provider = StubProvider("primary")
+        llm = make_llm(primary=provider)
+        llm.config["prefetch_followups"] = True
+        llm.config["followup_phrases"] = ["詳しく教えて"]
+
+        context = [{"role": "user", "content": "こんにちは"}]
+        await llm.process_with_tools("こんにちは", context, [], [])
+        await asyncio.sleep(0)
+        assert provider.calls == 2
+
+        context += [{"role": "assistant", "content": "from primary"}, {"role": "user", "content": "詳しく教えて。"}]
+        result = await llm.process_with_tools("詳しく教えて。", context, [], [])
+
+        assert result["response"] == "from primary"
+        assert provider.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_prefetch_is_discarded_when_context_changed(self):
+        """先行生成後に別のターンを挟んだ場合や、記憶が異なる場合は先行生成の結果を使わない"""
+        provider = StubProvider("primary")
+        llm = make_llm(primary=provider)
+        llm.config["prefetch_followups"] = True
+        llm.config["followup_phrases"] = ["詳しく教えて"]
+        context = [{"role": "user", "content": "こんにちは"}, {"role": "assistant", "content": "from primary"}]
+
+        await llm.process_with_tools("こんにちは", context[:1], [], [])
+        await asyncio.sleep(0)
+        llm.config["prefetch_followups"] = False
+        followup = [{"role": "user", "content": "詳しく教えて"}]
+        # ルールで応答したターンを挟んだ場合
+        await llm.process_with_tools(
+            "詳しく教えて", context + [{"role": "user", "content": "今何時"}, {"role": "assistant", "content": "12時"}] + followup, [], []
+        )
+        assert provider.calls == 3
+
+        llm.config["prefetch_followups"] = True
+        await llm.process_with_tools("こんにちは", context[:1], [], [])
+        await asyncio.sleep(0)
+        # 追質問で検索された記憶が異なる場合
+        await llm.process_with_tools("詳しく教えて", context + followup, [{"content": "好きな色は青"}], [])
+        assert provider.calls == 6
+
+    def test_cancel_prefetch_keeps_matching_followup(self):
+        """ターン開始時のキャンセルでは、今回の発話に一致する先行生成だけを残す"""
+        llm = make_llm(primary=StubProvider("primary"))
+        loop = asyncio.new_event_loop()
+        try:
+            matching, other = loop.create_future(), loop.create_future()
+            llm._prefetch_tasks = {"詳しく教えて": matching, "それで": other}
+
+            llm.cancel_prefetch(keep_text="詳しく教えて！")
+
+            assert list(llm._prefetch_tasks) == ["詳しく教えて"]
+            assert other.cancelled() and not matching.cancelled()
+        finally:
+            loop.close()
+
+    @pytest.mark.asyncio
+    async def test_unrelated_utterance_cancels_prefetch(self):
+        """追質問以外の発話が届いたら実行中の先行生成をキャンセルする"""
+        provider = StubProvider("primary", delay=0.05)
+        llm = make_llm(primary=provider)
+        llm.config["prefetch_followups"] = True
+        llm.config["followup_phrases"] = ["詳しく教えて"]
+
+        await llm.process_with_tools("こんにちは", [], [], [])
+        task = next(iter(llm._prefetch_tasks.values()))
+        llm.config["prefetch_followups"] = False
+
+        await llm.process_with_tools("天気は？", [], [], [])
+        await asyncio.sleep(0)
+
+        assert task.cancelled()
+        assert llm._prefetch_tasks == {}
+
+
+class TestExactCache:
+    """完全一致キャッシュのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_identical_deterministic_call_is_cached(self):
+        """temperature=0 で同一のメッセージは再利用し、内容が異なれば再生成"""
+        provider = StubProvider("primary")
+        llm = make_llm(primary=provider)
+        messages = [{"role": "user", "content": "hello"}]
+
+        await llm._generate_with_fallback(messages, temperature=0)
+        await llm._generate_with_fallback(list(messages), temperature=0)
+        await llm._generate_with_fallback([{"role": "user", "content": "bye"}], temperature=0)
+        await llm._generate_with_fallback(messages)
+
+        assert provider.calls == 3
+        stats = (await llm.get_status())["cache_stats"]["exact"]
+        assert stats == {"entries": 2, "hits": 1, "misses": 2}
+
+
+class StubEncoder:
+    """文字種ごとの出現数をベクトル化する簡易エンコーダー"""
+
+    def encode(self, text, normalize_embeddings=False):
+        vector = np.array([text.count(c) for c in "abcdefghij"], dtype=np.float32) + 0.01
+        return vector / np.linalg.norm(vector)
+
+
+class TestSemanticCache:
+    """意味キャッシュのテスト"""
+
+    def make_cached_llm(self, provider):
+        llm = make_llm(primary=provider)
+        llm.semantic_cache = SemanticCache(threshold=0.99, max_entries=2)
+        llm.semantic_cache.encoder = StubEncoder()
+        return llm
+
+    @pytest.mark.asyncio
+    async def test_deterministic_call_is_cached(self):
+        """temperature=0・ツールなしの呼び出しは類似した問い合わせで再利用"""
+        provider = StubProvider("primary")
+        llm = self.make_cached_llm(provider)
+        await llm._generate_with_fallback(
+            [{"role": "system", "content": "abc"}, {"role": "user", "content": "ddd"}], temperature=0
+        )
+        response = await llm._generate_with_fallback(
+            [{"role": "system", "content": "abc"}, {"role": "user", "content": "dddd"}], temperature=0
+        )
+
+        assert response.content == "from primary"
+        assert provider.calls == 1
+        assert llm.semantic_cache.get_stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_sampled_or_tool_calls_bypass_cache(self):
+        """temperature>0 やツール付きの呼び出しはキャッシュしない"""
+        provider = StubProvider("primary")
+        llm = self.make_cached_llm(provider)
+        messages = [{"role": "user", "content": "abc"}]
+
+        await llm._generate_with_fallback(messages)
+        await llm._generate_with_fallback(messages)
+        await llm._generate_with_fallback(messages, temperature=0, tools=[{}])
+
+        assert provider.calls == 3
+        assert llm.semantic_cache.get_stats()["entries"] == 0
+
+    @pytest.mark.asyncio
+    async def test_oldest_entry_is_overwritten(self):
+        """容量を超えた場合は古いエントリから上書き"""
+        cache = SemanticCache(threshold=0.99, max_entries=2)
+        cache.encoder = StubEncoder()
+
+        for text in ("aaa", "bbb", "ccc"):
+            await cache.put(text, {"content": text})
+
+        assert await cache.get("aaa") is None
+        assert (await cache.get("ccc"))["content"] == "ccc"
+
+    @pytest.mark.asyncio
+    async def test_eviction_order_survives_save_and_load(self, tmp_path):
+        """一周した後に保存・読み込みしても、次の追加では最も古いエントリを上書きする"""
+        cache = SemanticCache(threshold=0.99, max_entries=4, cache_path=str(tmp_path))
+        cache.encoder = StubEncoder()
+        for text in "abcdef":
+            await cache.put(text * 3, {"content": text})
+        cache.save()
+
+        reloaded = SemanticCache(threshold=0.99, max_entries=4, cache_path=str(tmp_path))
+        reloaded.encoder = StubEncoder()
+        reloaded._load()
+        await reloaded.put("ggg", {"content": "g"})
+
+        assert sorted(response["content"] for response in reloaded._responses) == ["d", "e", "f", "g"]
+
+
+class TestSystemPrompt:
+    """システムプロンプト構築のテスト"""
+
+    def test_static_prompt_is_stable_and_selects_tool_guides(self):
+        """静的プロンプトはターン間で同一で、利用可能なツールの使用例のみ含む"""
+        llm = HybridLLM()
+        tools = [{"name": "alarm", "description": "アラーム"}]
+
+        first = llm._build_system_prompt(tools, "assist")
+        second = llm._build_system_prompt(tools, "assist")
+
+        assert first == second
+        assert "🔔 Alarm:" in first
+        assert "📧 Gmail:" not in first
+
+    def test_dynamic_context_is_separate(self):
+        """メールIDなどの動的情報は静的プロンプトに含めない"""
+        llm = HybridLLM()
+        tools = [{"name": "gmail", "description": "メール"}]
+
+        static = llm._build_system_prompt(tools, "assist")
+        dynamic = llm._build_context_prompt([], latest_email_id="abc123")
+
+        assert "abc123" not in static
+        assert "abc123" in dynamic
+
+    def test_dynamic_context_follows_history(self):
+        """動的情報は最後のユーザーターンに含め、システムプロンプトと履歴の並びを保つ"""
+        llm = HybridLLM()
+        history = [{"role": "user", "content": "前の質問"}, {"role": "assistant", "content": "前の応答"}]
+
+        messages, _ = llm._build_tool_messages(
+            "こんにちは", history, [{"content": "コーヒーが好き"}], [], ai_mode="assist"
+        )
+
+        assert [message["role"] for message in messages] == ["system", "user", "assistant", "user"]
+        assert messages[1:3] == history
+        assert "コーヒーが好き" in messages[-1]["content"]
+        assert messages[-1]["content"].endswith("こんにちは")
+
+
+class TestTrimContext:
+    """会話履歴のトークン上限による切り詰めのテスト"""
+
+    def test_keeps_newest_messages_within_budget(self):
+        """上限内に収まる直近のメッセージのみ残す"""
+        context = [{"role": "user", "content": "あ" * 100} for _ in range(5)]
+        context.append({"role": "assistant", "content": "short"})
+
+        trimmed = HybridLLM._trim_context(context, budget_tokens=250)
+
+        assert trimmed[-1]["content"] == "short"
+        assert 1 < len(trimmed) < len(context)
+        assert HybridLLM._trim_context(context, budget_tokens=100000) == context
+        assert HybridLLM._trim_context(context, budget_tokens=0) == []
+
+
+class TestClaudeMessageConversion:
+    """ClaudeProviderのメッセージ変換テスト"""
+
+    def test_system_messages_become_cacheable_blocks(self):
+        """cache_control付きsystemメッセージはキャッシュブロックになる"""
+        from src.llm.hybrid_llm import ClaudeProvider
+
+        system_blocks, messages = ClaudeProvider()._convert_messages([
+            {"role": "system", "content": "static", "cache_control": {"type": "ephemeral"}},
+            {"role": "system", "content": "dynamic"},
+            {"role": "user", "content": "hello"},
+        ])
+
+        assert system_blocks[0] == {"type": "text", "text": "static", "cache_control": {"type": "ephemeral"}}
+        assert system_blocks[1] == {"type": "text", "text": "dynamic"}
+        assert messages == [{"role": "user", "content": "hello"}]
+
+
+class TestToolCallParsing:
+    """ツール呼び出し解析のテスト"""
+
+    def test_parse_valid_tool_call(self):
+        """正しいJSONのツール呼び出しを解析"""
+        llm = HybridLLM()
+        content = 'メールを確認しますね TOOL_CALL: {"name":"gmail","parameters":{"action":"list","max_results":5}}'
+
+        assert llm._parse_tool_calls(content) == [
+            {"name": "gmail", "parameters": {"action": "list", "max_results": 5}}
+        ]
+
+    def test_fix_json_missing_braces(self):
+        """閉じ括弧が欠けたJSONを修復"""
+        llm = HybridLLM()
+        fixed = llm._fix_json('{"name":"alarm","parameters":{"action":"list"')
+
+        assert json.loads(fixed) == {"name": "alarm", "parameters": {"action": "list"}}
+
+    def test_fix_json_manual_reconstruction(self):
+        """壊れたJSONから既知のパラメータを再構築"""
+        llm = HybridLLM()
+        fixed = llm._fix_json(
+            '{"name":"alarm","parameters":{"action":"set","time":"07:00","repeat":true,"message":"起きて"}} trailing'
+        )
+
+        assert json.loads(fixed) == {
+            "name": "alarm",
+            "parameters": {"action": "set", "time": "07:00", "message": "起きて", "repeat": True}
+        }
+
+    def test_field_scanner_matches_regex(self):
+        """文字列走査版のフィールド抽出は正規表現版と同じ結果を返す"""
+        from src.llm import tool_parse
+
+        samples = [
+            '{"name":"alarm","parameters":{"action":"set","time":"07:00","repeat":true}} trailing',
+            '{"name": "gmail", "max_results": 12, "query": "", "unknown": "x"',
+            '"name":"a" "action": false "repeat":"yes" "name"',
+        ]
+
+        for sample in samples:
+            assert tool_parse._scan_fields(sample) == tool_parse._regex_fields(sample)
+
+    def test_extract_tool_call_components_skips_empty_values(self):
+        """空文字の値は抽出しない"""
+        llm = HybridLLM()
+        extracted = llm._extract_tool_call_components('"name": "gmail", "action": "", "max_results": 3')
+
+        assert extracted == {"name": "gmail", "parameters": {"max_results": 3}}
+
+    def test_multiple_tool_calls_are_batch_parsed(self):
+        """完全なJSONの候補が複数ある場合はまとめて解析し、不完全な候補は修復する"""
+        llm = HybridLLM()
+        content = (
+            'TOOL_CALL: {"name":"time"}\n'
+            'TOOL_CALL: {"name":"weather"}\n'
+            'TOOL_CALL: {"name":"alarm","parameters":{"action":"list"'
+        )
+
+        names = sorted(call["name"] for call in llm._parse_tool_calls(content))
+
+        assert names == ["alarm", "time", "weather"]
+
+    def test_duplicate_tool_calls_are_removed(self):
+        """同じ内容のツール呼び出しはキー順が異なっても1件にまとめる"""
+        llm = HybridLLM()
+        content = (
+            'TOOL_CALL: {"name":"gmail","parameters":{"action":"list","max_results":5}}\n'
+            'TOOL_CALL: {"parameters":{"max_results":5,"action":"list"},"name":"gmail"}'
+        )
+
+        assert llm._parse_tool_calls(content) == [
+            {"name": "gmail", "parameters": {"action": "list", "max_results": 5}}
+        ]
+
+
+class TestOpenAIToolsSchema:
+    """OpenAI toolsスキーマ変換のテスト"""
+
+    def test_schema_is_cached_per_tool_list(self):
+        """同じツールリストに対してはキャッシュ済みのスキーマを返す"""
+        llm = HybridLLM()
+        tools = [{
+            "name": "alarm",
+            "description": "アラーム",
+            "parameters": [{"name": "action", "type": "string", "required": True}]
+        }]
+
+        first = llm._convert_tools_to_openai_schema(tools)
+
+        assert llm._convert_tools_to_openai_schema(tools) is first
+        assert llm._convert_tools_to_openai_schema(list(tools)) is not first
+        assert first[0]["function"]["parameters"]["required"] == ["action"]
+
+        tools.append({"name": "time", "description": "時刻"})
+        assert len(llm._convert_tools_to_openai_schema(tools)) == 2
+
+    def test_schema_json_is_precomputed(self):
+        """変換済みスキーマのJSON文字列は変換時のものを再利用"""
+        llm = HybridLLM()
+        schema = llm._convert_tools_to_openai_schema([{"name": "time", "description": "時刻"}])
+
+        serialized = llm._tools_schema_json(schema)
+
+        assert serialized is llm._tools_schema_json(schema)
+        assert json.loads(serialized) == schema
+
+    def test_schema_is_reused_per_tool(self):
+        """ツールリストが再構築されても同一のツール定義は変換済みスキーマを再利用"""
+        llm = HybridLLM()
+        alarm = {"name": "alarm", "description": "アラーム", "parameters": []}
+        gmail = {"name": "gmail", "description": "メール", "parameters": []}
+
+        first = llm._convert_tools_to_openai_schema([alarm])
+        second = llm._convert_tools_to_openai_schema([alarm, gmail])
+
+        assert second[0] is first[0]
+        assert second[1]["function"]["name"] == "gmail"
+
+
+class TestFormatToolResults:
+    """ツール結果フォーマットのテスト"""
+
+    def test_format_tool_results(self):
+        """メタデータを除外し、messageキーを優先して整形"""
+        llm = HybridLLM()
+        formatted = llm._format_tool_results({
+            "gmail": "3件のメールがあります",
+            "gmail_metadata": {"latest_email_id": "abc"},
+            "alarm": {"message": "7時にセットしました", "alarm": {}},
+            "time": {"hour": 7},
+        })
+
+        assert formatted.split("\n")[:2] == ["gmail: 3件のメールがあります", "alarm: 7時にセットしました"]
+        assert formatted.endswith('time: {\n  "hour": 7\n}')
@@ -0,0 +1,53 @@
+"""
+OnnxSentenceEncoder Tests - ONNX文章エンコーダーのプーリング処理のユニットテスト
+
+ONNX Runtimeを使わないスタブのモデル・トークナイザーでテストする
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.memory.onnx_encoder import OnnxSentenceEncoder
+
+
+class StubTokenizer:
+    """文字数をトークン数とみなすスタブトークナイザー"""
+
+    def __call__(self, texts, padding, truncation, max_length, return_tensors):
+        length = max(len(text) for text in texts)
+        ids = np.array([[len(text)] * length for text in texts], dtype=np.int64)
+        mask = np.array([[1] * len(text) + [0] * (length - len(text)) for text in texts], dtype=np.int64)
+        return {"input_ids": ids, "attention_mask": mask}
+
+
+def stub_model(input_ids, attention_mask):
+    """各トークンの埋め込みを [文字数, 1] とするスタブモデル（パディングは大きな値）"""
+    hidden = np.stack([input_ids.astype(np.float32), np.ones_like(input_ids, dtype=np.float32)], axis=-1)
+    hidden[attention_mask == 0] = 100.0
+    return SimpleNamespace(last_hidden_state=hidden)
+
+
+class TestOnnxSentenceEncoder:
+    """OnnxSentenceEncoder のテスト"""
+
+    def test_mean_pooling_ignores_padding_and_keeps_order(self):
+        """パディングを除いて平均し、長さ順に並べ替えても入力順で返す"""
+        encoder = OnnxSentenceEncoder(stub_model, StubTokenizer())
+
+        embeddings = encoder.encode(["ab", "abcd", "a"], batch_size=2)
+
+        np.testing.assert_allclose(embeddings, [[2.0, 1.0], [4.0, 1.0], [1.0, 1.0]])
+
+    def test_normalize_embeddings(self):
+        """normalize_embeddings=True の場合はL2正規化し、単一の文字列は1次元で返す"""
+        encoder = OnnxSentenceEncoder(stub_model, StubTokenizer())
+
+        embedding = encoder.encode("abc", normalize_embeddings=True)
+
+        np.testing.assert_allclose(embedding, np.array([3.0, 1.0]) / np.sqrt(10.0), rtol=1e-6)
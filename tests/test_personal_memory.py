@@ -0,0 +1,299 @@
+"""
+PersonalMemory Tests - パーソナルメモリのユニットテスト
+
+ChromaDB・実際のエンコーダーを使わず、モックDBとスタブのエンコーダーでテストする
+"""
+
+import pytest
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import src.memory.personal_memory as personal_memory
+from src.memory.hnsw_store import HNSWMemoryStore
+from src.memory.mock_store import MockMemoryStore
+from src.memory.query_cache import QueryResultCache
+from src.memory.personal_memory import PersonalMemory
+
+
+@pytest.fixture
+def mock_memory_env(tmp_path, monkeypatch):
+    monkeypatch.setattr(personal_memory, "CHROMADB_AVAILABLE", False)
+    monkeypatch.setattr(personal_memory, "SENTENCE_TRANSFORMERS_AVAILABLE", False)
+    monkeypatch.setattr(personal_memory, "ONNX_RUNTIME_AVAILABLE", False)
+    monkeypatch.setattr(personal_memory, "USEARCH_AVAILABLE", False)
+    monkeypatch.setenv("VECTOR_DB_PATH", str(tmp_path))
+
+
+class TestWriteQueue:
+    """書き込みキューのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_interactions_are_stored_in_one_batch(self, mock_memory_env, monkeypatch):
+        """連続した会話はまとめて1回でログに追記する"""
+        memory = PersonalMemory()
+        await memory.initialize()
+        persist_calls = []
+        original_persist = memory._persist_mock_memories
+
+        async def counting_persist(memories):
+            persist_calls.append(len(memories))
+            await original_persist(memories)
+
+        monkeypatch.setattr(memory, "_persist_mock_memories", counting_persist)
+
+        assert await memory.store_interaction("こんにちは", "こんにちは！")
+        assert await memory.store_interaction("天気は？", "晴れです")
+        await asyncio.sleep(memory.config["write_flush_interval"] * 3)
+
+        assert [entry["content"] for entry in memory.mock_store.records] == [
+            "こんにちは", "こんにちは！", "天気は？", "晴れです"
+        ]
+        assert persist_calls == [4]
+        await memory.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_cleanup_flushes_pending_entries(self, mock_memory_env):
+        """停止時に書き込み待ちのエントリを保存する"""
+        memory = PersonalMemory()
+        await memory.initialize()
+
+        store = memory.mock_store
+        await memory.store_interaction("おやすみ", "おやすみなさい")
+        await memory.cleanup()
+
+        assert store.count() == 2
+
+
+class TestHNSWMemoryStore:
+    """HNSWMemoryStore のテスト"""
+
+    def test_search_and_reload(self, tmp_path):
+        """追加したエントリを近い順に検索でき、保存後に読み込み直しても同じ結果になる"""
+        pytest.importorskip("usearch")
+        store = HNSWMemoryStore(str(tmp_path))
+        store.add(
+            ["a" * 32, "b" * 32],
+            [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]],
+            ["りんご", "みかん"],
+            [{"category": "conversation"}, {"category": "preference"}]
+        )
+        store.save()
+
+        reloaded = HNSWMemoryStore(str(tmp_path))
+        reloaded.load()
+        entry, distance = reloaded.search([0.9, 0.1, 0.0], 1)[0]
+
+        assert entry == {"content": "りんご", "category": "conversation"}
+        assert distance < 0.05
+        assert [e["content"] for e in reloaded.find("preference")] == ["みかん"]
+
+
+class StubEncoder:
+    """文字ごとの出現を次元とするスタブエンコーダー（正規化済み）"""
+
+    def encode(self, texts, **kwargs):
+        vectors = np.array([[text.count(c) for c in "abc"] for text in texts], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class StubChromaCollection:
+    """保存済みのメモリを返すスタブのChromaDBコレクション"""
+
+    def get(self, include=None):
+        return {
+            "ids": ["a" * 32, "b" * 32],
+            "documents": ["aaa", "bbb"],
+            "metadatas": [{"category": "conversation"}, {"category": "preference"}]
+        }
+
+
+class StubChromaClient:
+    def __init__(self, path, settings=None):
+        pass
+
+    def get_collection(self, name):
+        return StubChromaCollection()
+
+
+class TestChromaDBImport:
+    """ChromaDBからHNSW索引への移行のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_existing_collection_is_imported(self, mock_memory_env, tmp_path, monkeypatch):
+        """HNSW索引が空で既存のChromaDBがある場合は、保存済みのメモリを取り込む"""
+        pytest.importorskip("usearch")
+        (tmp_path / "chroma.sqlite3").write_bytes(b"")
+        monkeypatch.setattr(personal_memory, "USEARCH_AVAILABLE", True)
+        monkeypatch.setattr(personal_memory, "CHROMADB_AVAILABLE", True)
+        monkeypatch.setattr(personal_memory, "SENTENCE_TRANSFORMERS_AVAILABLE", True)
+        monkeypatch.setattr(personal_memory, "chromadb", type("chromadb", (), {"PersistentClient": StubChromaClient}), raising=False)
+        monkeypatch.setattr(personal_memory, "Settings", lambda **kwargs: None, raising=False)
+        memory = PersonalMemory()
+
+        async def initialize_stub_encoder():
+            memory.encoder = StubEncoder()
+
+        monkeypatch.setattr(memory, "_initialize_encoder", initialize_stub_encoder)
+        await memory.initialize()
+
+        assert memory.hnsw_store.count() == 2
+        assert [entry["content"] for entry in memory.hnsw_store.find("preference")] == ["bbb"]
+        assert (tmp_path / "usearch.bin").exists()
+        await memory.cleanup()
+
+
+class TestMockMatrixSearch:
+    """モックDBの埋め込み行列による検索のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_search_returns_most_similar_first(self, mock_memory_env, monkeypatch):
+        """エンコーダーがある場合は類似度の高い順に返し、しきい値未満は返さない"""
+        memory = PersonalMemory()
+
+        async def initialize_stub_encoder():
+            memory.encoder = StubEncoder()
+
+        monkeypatch.setattr(memory, "_initialize_encoder", initialize_stub_encoder)
+        monkeypatch.setattr(personal_memory, "SENTENCE_TRANSFORMERS_AVAILABLE", True)
+        memory.config["mock_matrix_chunk_rows"] = 2
+        await memory.initialize()
+
+        await memory.store_interaction("aab", "ccc")
+        await memory.store_interaction("aaa", "bbb")
+        await asyncio.sleep(memory.config["write_flush_interval"] * 3)
+
+        results = await memory.search_relevant("a", limit=3)
+
+        assert [result["content"] for result in results] == ["aaa", "aab"]
+        await memory.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_stored_memories_invalidate_cached_results(self, mock_memory_env, monkeypatch):
+        """キャッシュ済みのクエリでも、保存後の検索には新しいメモリが含まれる"""
+        memory = PersonalMemory()
+
+        async def initialize_stub_encoder():
+            memory.encoder = StubEncoder()
+
+        monkeypatch.setattr(memory, "_initialize_encoder", initialize_stub_encoder)
+        monkeypatch.setattr(personal_memory, "SENTENCE_TRANSFORMERS_AVAILABLE", True)
+        await memory.initialize()
+
+        assert await memory.search_relevant("aaa") == []
+
+        await memory.store_interaction("aaa", "bbb")
+        await asyncio.sleep(memory.config["write_flush_interval"] * 3)
+
+        assert [result["content"] for result in await memory.search_relevant("aaa")] == ["aaa"]
+        await memory.cleanup()
+
+
+class TestMockMemoryStore:
+    """MockMemoryStore のテスト"""
+
+    def test_prune_keeps_columns_aligned(self, tmp_path):
+        """古いエントリを削除しても、カテゴリ・埋め込みの列がエントリと対応したままになる"""
+        store = MockMemoryStore(str(tmp_path), chunk_rows=2)
+        store.set_embeddings([])
+        store.add([
+            {"content": "old", "category": "preference", "timestamp": "2020-01-01T00:00:00"},
+            {"content": "new", "category": "preference", "timestamp": "2030-01-01T00:00:00"},
+            {"content": "chat", "category": "conversation", "timestamp": "2030-01-01T00:00:00"},
+        ], [[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]])
+
+        assert store.prune_before(datetime(2025, 1, 1)) == 1
+        assert [memory["content"] for memory in store.find("preference")] == ["new"]
+        assert [memory["content"] for memory, _ in store.search_embedding([0.0, 1.0], 2)] == ["new", "chat"]
+
+    def test_prune_unsorted_timestamps(self, tmp_path):
+        """時系列順でない・不正なタイムスタンプを含む場合も、cutoff より古いエントリだけを削除する"""
+        store = MockMemoryStore(str(tmp_path))
+        store.add([
+            {"content": "new", "category": "fact", "timestamp": "2030-01-01T00:00:00"},
+            {"content": "old", "category": "fact", "timestamp": "2020-01-01T00:00:00"},
+            {"content": "broken", "category": "fact", "timestamp": "invalid"},
+            {"content": "newer", "category": "fact", "timestamp": "2031-01-01T00:00:00"},
+        ])
+
+        assert store.prune_before(datetime(2025, 1, 1)) == 2
+        assert [memory["content"] for memory in store.records] == ["new", "newer"]
+        # 残りが昇順になったため、次回は二分探索で削除する
+        store.add([{"content": "latest", "category": "fact", "timestamp": "2032-01-01T00:00:00"}])
+        assert store.prune_before(datetime(2030, 6, 1)) == 1
+        assert [memory["content"] for memory in store.records] == ["newer", "latest"]
+
+    def test_embeddings_are_reloaded_from_file(self, tmp_path):
+        """保存した埋め込みは次回の読み込み時に再計算せずに使える"""
+        store = MockMemoryStore(str(tmp_path))
+        store.set_embeddings([])
+        store.add([{"content": "a", "category": "fact", "timestamp": "2030-01-01T00:00:00"}], [[1.0, 0.0]])
+        store.append_log(store.records)
+        store.save_embeddings()
+
+        reloaded = MockMemoryStore(str(tmp_path))
+        reloaded.load()
+
+        assert reloaded.load_embeddings()
+        assert reloaded.search_embedding([1.0, 0.0], 1)[0][1] == pytest.approx(1.0)
+
+    def test_shifted_embeddings_are_not_reloaded(self, tmp_path):
+        """保存後に追記・削除されてエントリ数だけが一致する場合は、保存済みの埋め込みを使わない"""
+        store = MockMemoryStore(str(tmp_path))
+        store.set_embeddings([])
+        store.add([
+            {"id": "a", "content": "a", "category": "fact", "timestamp": "2020-01-01T00:00:00"},
+            {"id": "b", "content": "b", "category": "fact", "timestamp": "2030-01-01T00:00:00"},
+        ], [[1.0, 0.0], [0.0, 1.0]])
+        store.append_log(store.records)
+        store.save_embeddings()
+        # 埋め込みを保存しないまま1件追記して終了した後、起動時の削除で古い1件が消えた状態
+        store.append_log([{"id": "c", "content": "c", "category": "fact", "timestamp": "2030-01-02T00:00:00"}])
+
+        reloaded = MockMemoryStore(str(tmp_path))
+        reloaded.load()
+        reloaded.prune_before(datetime(2025, 1, 1))
+
+        assert reloaded.count() == 2
+        assert not reloaded.load_embeddings()
+
+    def test_legacy_json_is_converted_to_log(self, tmp_path):
+        """以前の形式のJSONファイルは読み込み時に追記ログに変換する"""
+        (tmp_path / "mock_memories.json").write_text(
+            '[{"content": "a", "category": "fact", "timestamp": "2030-01-01T00:00:00"}]', encoding="utf-8"
+        )
+        store = MockMemoryStore(str(tmp_path))
+        store.load()
+        store.add([{"content": "b", "category": "fact", "timestamp": "2030-01-01T00:00:00"}])
+        store.append_log(store.records[1:])
+
+        reloaded = MockMemoryStore(str(tmp_path))
+        reloaded.load()
+
+        assert [memory["content"] for memory in reloaded.records] == ["a", "b"]
+
+
+class TestQueryResultCache:
+    """QueryResultCache のテスト"""
+
+    def test_similar_query_hits_and_expires(self, monkeypatch):
+        """ほぼ同じクエリ埋め込みはキャッシュから返し、期限切れ・件数違いは返さない"""
+        now = [100.0]
+        monkeypatch.setattr("src.memory.query_cache.time.monotonic", lambda: now[0])
+        cache = QueryResultCache(max_entries=2, threshold=0.95, ttl=10.0)
+        results = [{"content": "りんご"}]
+        cache.put("りんごが好き", 5, np.array([1.0, 0.0], dtype=np.float32), results)
+
+        assert cache.get_exact(" りんごが好き", 5) == results
+        assert cache.get_similar(np.array([0.99, 0.141], dtype=np.float32), 5) == results
+        assert cache.get_similar(np.array([0.99, 0.141], dtype=np.float32), 3) is None
+
+        now[0] += 11.0
+        assert cache.get_exact("りんごが好き", 5) is None
+        assert cache.get_similar(np.array([1.0, 0.0], dtype=np.float32), 5) is None
@@ -0,0 +1,68 @@
+"""
+ResponseCache Tests - エージェント応答キャッシュのユニットテスト
+"""
+
+import pytest
+import os
+import sys
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.response_cache import ResponseCache
+
+
+class StubEncoder:
+    """文字種ごとの出現数をベクトル化する簡易エンコーダー"""
+
+    def encode(self, text, normalize_embeddings=False):
+        vector = np.array([text.count(c) for c in "abc"], dtype=np.float32) + 0.01
+        return vector / np.linalg.norm(vector)
+
+
+class TestResponseCache:
+    """ResponseCache のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_exact_hit_requires_same_context(self):
+        """同じ問い合わせでも直前の応答が異なればヒットしない"""
+        cache = ResponseCache()
+        await cache.put("こんにちは", "こんにちは！", previous_response=None)
+
+        assert await cache.get("こんにちは ", previous_response=None) == "こんにちは！"
+        assert await cache.get("こんにちは", previous_response="別の話題") is None
+        assert cache.get_stats()["exact_hits"] == 1
+        assert cache.get_stats()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_exact_hit_requires_same_state(self):
+        """個人情報・記憶・AIモード等の状態が変われば、同じ問い合わせでもヒットしない"""
+        cache = ResponseCache()
+        await cache.put("私の名前は？", "太郎さんです", state="assist\x00名前: 太郎")
+
+        assert await cache.get("私の名前は？", state="assist\x00名前: 太郎") == "太郎さんです"
+        assert await cache.get("私の名前は？", state="assist\x00名前: 花子") is None
+        assert await cache.get("私の名前は？") is None
+
+    @pytest.mark.asyncio
+    async def test_semantic_hit_searches_rows_of_current_context(self):
+        """同じ問い合わせが別の文脈で先に保存されていても、現在の文脈のエントリにヒットする"""
+        cache = ResponseCache(threshold=0.99)
+        await cache.initialize(encoder=StubEncoder())
+        await cache.put("aaa", "最初の応答", previous_response=None)
+        await cache.put("aaa", "2回目の応答", previous_response="最初の応答")
+
+        assert await cache.get("aaa!", previous_response="最初の応答") == "2回目の応答"
+        assert cache.get_stats()["semantic_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_oldest_entry_is_evicted(self):
+        """上限を超えると最も古いエントリから破棄する"""
+        cache = ResponseCache(max_entries=2)
+        for text in ("a", "b", "c"):
+            await cache.put(text, text.upper())
+
+        assert await cache.get("a") is None
+        assert await cache.get("c") == "C"
@@ -0,0 +1,213 @@
+"""
+WebSocketManager Tests - WebSocket接続管理のユニットテスト
+
+実際のソケットを使わないスタブWebSocketで送信キューの動作をテストする
+"""
+
+import pytest
+import asyncio
+import json
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi import WebSocketDisconnect
+
+from src.core.websocket_manager import (
+    WebSocketManager, MAX_DROPPED_MESSAGES, OP_STATUS, OP_USER, SEND_QUEUE_SIZE,
+    compact_message, receive_bytes, receive_json
+)
+
+
+class StubWebSocket:
+    """送信されたフレームを記録するスタブWebSocket"""
+
+    def __init__(self, incoming=None, query_params=None):
+        self.frames = []
+        self.closed = False
+        self.incoming = list(incoming or [])
+        self.query_params = query_params or {}
+
+    async def accept(self):
+        pass
+
+    async def send(self, message):
+        if "bytes" in message:
+            self.frames.append(message["bytes"])
+        else:
+            self.frames.append(json.loads(message["text"]))
+
+    async def close(self):
+        self.closed = True
+
+    async def receive(self):
+        return self.incoming.pop(0)
+
+
+class TestSendQueue:
+    """送信キューのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_adjacent_messages_are_coalesced(self):
+        """連続して追加されたメッセージは1フレームの配列にまとめて送る"""
+        manager = WebSocketManager()
+        websocket = StubWebSocket()
+        await manager.connect(websocket)
+
+        manager.enqueue_json({"type": "user_message"}, websocket)
+        manager.enqueue_json({"type": "assistant_message"}, websocket)
+        await asyncio.sleep(0.01)
+
+        assert websocket.frames == [[{"type": "user_message"}, {"type": "assistant_message"}]]
+        manager.disconnect(websocket)
+
+    @pytest.mark.asyncio
+    async def test_single_message_is_sent_as_object(self):
+        """1件だけのメッセージは配列にせずそのまま送る"""
+        manager = WebSocketManager()
+        websocket = StubWebSocket()
+        await manager.connect(websocket)
+
+        manager.enqueue_json({"type": "status", "message": "processing"}, websocket)
+        await asyncio.sleep(0.01)
+
+        assert websocket.frames == [{"type": "status", "message": "processing"}]
+        manager.disconnect(websocket)
+
+    @pytest.mark.asyncio
+    async def test_preserialized_messages_are_sent_as_is(self):
+        """シリアライズ済みの文字列は辞書と混在しても正しい配列として送る"""
+        manager = WebSocketManager()
+        websocket = StubWebSocket()
+        await manager.connect(websocket)
+
+        manager.enqueue_json('{"type":"user_message","content":"\\u3042"}', websocket)
+        manager.enqueue_json({"type": "status"}, websocket)
+        await asyncio.sleep(0.01)
+
+        assert websocket.frames == [[{"type": "user_message", "content": "あ"}, {"type": "status"}]]
+        manager.disconnect(websocket)
+
+    @pytest.mark.asyncio
+    async def test_msgpack_client_receives_binary_frames(self):
+        """?fmt=msgpack で接続したクライアントには短縮スキーマのMessagePackバイナリフレームで送る"""
+        ormsgpack = pytest.importorskip("ormsgpack")
+        manager = WebSocketManager()
+        websocket = StubWebSocket(query_params={"fmt": "msgpack"})
+        await manager.connect(websocket)
+
+        manager.enqueue_json('{"type":"user_message"}', websocket)
+        manager.enqueue_json({"type": "status"}, websocket)
+        await asyncio.sleep(0.01)
+
+        assert [ormsgpack.unpackb(frame) for frame in websocket.frames] == [
+            [{"t": OP_USER}, {"t": OP_STATUS}]
+        ]
+        manager.disconnect(websocket)
+
+    @pytest.mark.asyncio
+    async def test_oldest_message_is_dropped_when_queue_is_full(self):
+        """キューが満杯の場合は最も古いメッセージを破棄し、gap メッセージで通知する"""
+        manager = WebSocketManager()
+        websocket = StubWebSocket()
+        await manager.connect(websocket)
+
+        for seq in range(SEND_QUEUE_SIZE + 2):
+            assert manager.enqueue_json({"type": "status", "seq": seq}, websocket)
+        while manager.send_queues[websocket].qsize():
+            await asyncio.sleep(0.01)
+
+        messages = [message for frame in websocket.frames for message in frame]
+        assert messages[0] == {"type": "gap", "dropped": 2}
+        assert [message["seq"] for message in messages[1:]] == list(range(2, SEND_QUEUE_SIZE + 2))
+        assert manager.get_connection_count() == 1
+        manager.disconnect(websocket)
+
+    @pytest.mark.asyncio
+    async def test_terminal_messages_are_never_dropped(self):
+        """満杯でも assistant_done・turn は破棄せず、ストリーミングの断片から破棄する"""
+        manager = WebSocketManager()
+        websocket = StubWebSocket()
+        await manager.connect(websocket)
+
+        manager.enqueue_json({"type": "turn", "seq": 0}, websocket)
+        for seq in range(1, SEND_QUEUE_SIZE):
+            manager.enqueue_json('{"type":"assistant_delta","seq":%d}' % seq, websocket)
+        assert manager.enqueue_json({"type": "assistant_done", "seq": SEND_QUEUE_SIZE}, websocket)
+        while manager.send_queues[websocket].qsize():
+            await asyncio.sleep(0.01)
+
+        messages = [message for frame in websocket.frames for message in frame]
+        assert messages[0] == {"type": "gap", "dropped": 1}
+        assert [message["seq"] for message in messages[1:]] == [0] + list(range(2, SEND_QUEUE_SIZE + 1))
+        manager.disconnect(websocket)
+
+    @pytest.mark.asyncio
+    async def test_terminal_messages_exceed_the_queue_size(self):
+        """破棄できるメッセージがない場合は、破棄しないメッセージを上限を超えて追加する"""
+        manager = WebSocketManager()
+        websocket = StubWebSocket()
+        await manager.connect(websocket)
+
+        for _ in range(SEND_QUEUE_SIZE):
+            manager.enqueue_json({"type": "assistant_done"}, websocket)
+        assert not manager.enqueue_json({"type": "status"}, websocket)
+        assert manager.enqueue_json({"type": "turn"}, websocket)
+
+        assert manager.send_queues[websocket].qsize() == SEND_QUEUE_SIZE + 1
+        assert manager.dropped_counts[websocket] == 1
+        manager.disconnect(websocket)
+
+    @pytest.mark.asyncio
+    async def test_stalled_client_is_disconnected(self):
+        """送信が進まないまま MAX_DROPPED_MESSAGES を超えて破棄したクライアントは切断する"""
+        manager = WebSocketManager()
+        websocket = StubWebSocket()
+        await manager.connect(websocket)
+
+        for _ in range(SEND_QUEUE_SIZE + MAX_DROPPED_MESSAGES):
+            assert manager.enqueue_json({"type": "status"}, websocket)
+        assert not manager.enqueue_json({"type": "status"}, websocket)
+        await asyncio.sleep(0)
+
+        assert manager.get_connection_count() == 0
+        assert websocket.closed
+
+
+class TestCompactSchema:
+    """短縮スキーマのテスト"""
+
+    def test_known_types_and_keys_are_shortened(self):
+        """既知の type はオペコード、既知のキーは短縮キーに変換し、それ以外はそのまま残す"""
+        message = {"type": "status", "message": "processing", "status": {"llm": True}}
+
+        assert compact_message(message) == {"t": OP_STATUS, "m": "processing", "status": {"llm": True}}
+        assert compact_message({"type": "custom"}) == {"t": "custom"}
+
+
+class TestReceive:
+    """受信ヘルパーのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_receive_bytes_skips_text_frames(self):
+        """音声ソケットに届いたテキストフレームは読み飛ばす"""
+        websocket = StubWebSocket(incoming=[
+            {"type": "websocket.receive", "text": "ping"},
+            {"type": "websocket.receive", "bytes": b"audio"},
+        ])
+
+        assert await receive_bytes(websocket) == b"audio"
+
+    @pytest.mark.asyncio
+    async def test_receive_json_raises_on_disconnect(self):
+        """切断メッセージは WebSocketDisconnect として送出する"""
+        websocket = StubWebSocket(incoming=[
+            {"type": "websocket.receive", "text": '{"type": "reset"}'},
+            {"type": "websocket.disconnect", "code": 1001},
+        ])
+
+        assert await receive_json(websocket) == {"type": "reset"}
+        with pytest.raises(WebSocketDisconnect):
+            await receive_json(websocket)